@@ -0,0 +1,346 @@
+# attachments.py
+"""
+Content-addressed archive of media attachments.
+Attachments of media posts are downloaded in the background (a few worker
+tasks sharing one pooled aiohttp session) while their CDN URLs are still
+valid, so the delete log can still link the image/video after Discord has
+removed it. Files are stored as <sha256>.<ext> (identical uploads are kept
+once), the directory has a total size cap enforced with LRU eviction, and
+the message -> file mapping is kept in a small SQLite file next to them
+(the most recent `max_messages` messages), so media deleted after a
+restart can still be linked. The directory belongs to one process: the
+size accounting and the LRU are not shared, so every worker needs its own.
+Files are only handed out (`path_for`) with an HMAC signature of their name
+made with `url_secret`; without a secret nothing is served.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+logger = logging.getLogger("bovary_bot.attachments")
+
+DISCORD_CDN_HOSTS = frozenset({"cdn.discordapp.com", "media.discordapp.net"})
+CHUNK_SIZE = 64 * 1024
+INDEX_NAME = "index.db"
+
+_BLOB_NAME_RE = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]{1,8})?$")
+_EXT_RE = re.compile(r"\.([A-Za-z0-9]{1,8})$")
+
+
+class StoredAttachment(NamedTuple):
+    filename: str   # original filename, for display
+    name: str       # blob name in the archive directory: <sha256>.<ext>
+    size: int
+
+
+class _Download(NamedTuple):
+    message_id: int
+    url: str
+    filename: str
+
+
+def blob_name(digest: str, filename: str) -> str:
+    match = _EXT_RE.search(filename)
+    return f"{digest}.{match.group(1).lower()}" if match else digest
+
+
+def is_blob_name(name: str) -> bool:
+    return bool(_BLOB_NAME_RE.match(name))
+
+
+class AttachmentArchiver:
+    def __init__(
+        self,
+        root: str,
+        *,
+        max_bytes: int = 2 * 1024 ** 3,
+        max_file_bytes: int = 25 * 1024 ** 2,
+        concurrency: int = 4,
+        max_queue: int = 500,
+        max_messages: int = 100000,
+        timeout: float = 60.0,
+        allowed_hosts: Optional[Iterable[str]] = DISCORD_CDN_HOSTS,
+        url_secret: Optional[str] = None,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.concurrency = concurrency
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.allowed_hosts = frozenset(allowed_hosts) if allowed_hosts is not None else None
+        self._url_key = url_secret.encode("utf-8") if url_secret else None
+        self._queue: asyncio.Queue[_Download] = asyncio.Queue(maxsize=max_queue)
+        self._blobs: "OrderedDict[str, int]" = OrderedDict()  # blob name -> size, least recently used first
+        self._files_lock = asyncio.Lock()  # adding and evicting blobs, so the two never interleave
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._workers: List[asyncio.Task] = []
+        self.total_bytes = 0
+        self.active = 0
+
+        # Counters
+        self.downloaded = 0
+        self.deduplicated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    # -------- producer side --------
+    def submit(self, message_id: int, attachments: Sequence[Tuple[str, str, int]]) -> int:
+        """Queue (url, filename, size) attachments of a message. Returns how many were queued."""
+        queued = 0
+        for url, filename, size in attachments:
+            if size > self.max_file_bytes or not self._allowed(url):
+                self.skipped += 1
+                continue
+            try:
+                self._queue.put_nowait(_Download(message_id, url, filename))
+            except asyncio.QueueFull:
+                self.dropped += 1
+                continue
+            queued += 1
+        return queued
+
+    def _allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            return False
+        return self.allowed_hosts is None or parts.hostname in self.allowed_hosts
+
+    async def pop(self, message_id: int) -> List[StoredAttachment]:
+        """Archived attachments of a deleted message (and forget the mapping)."""
+        if self._db is None:
+            return []
+        try:
+            stored = await asyncio.to_thread(self._pop_sync, message_id)
+        except sqlite3.Error:
+            logger.exception("Could not read the attachment index")
+            return []
+        for item in stored:
+            if item.name in self._blobs:
+                self._blobs.move_to_end(item.name)
+        return [item for item in stored if item.name in self._blobs]
+
+    def signature(self, name: str) -> Optional[str]:
+        """Signature that `path_for` expects for `name`; None if serving is not configured."""
+        if self._url_key is None:
+            return None
+        return hmac.new(self._url_key, name.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def path_for(self, name: str, signature: str) -> Optional[str]:
+        expected = self.signature(name)
+        if expected is None or not hmac.compare_digest(expected, signature):
+            return None
+        if not is_blob_name(name) or name not in self._blobs:
+            return None
+        return os.path.join(self.root, name)
+
+    # -------- lifecycle --------
+    async def start(self) -> None:
+        if self._workers:
+            return
+        await asyncio.to_thread(self._scan)
+        try:
+            await asyncio.to_thread(self._open_index)
+        except sqlite3.Error:
+            logger.exception("Could not open the attachment index in %s", self.root)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"attachment-archiver-{i}")
+            for i in range(self.concurrency)
+        ]
+        logger.info(
+            "Attachment archive: %d files, %.1f MB in %s",
+            len(self._blobs), self.total_bytes / 1024 ** 2, self.root
+        )
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _scan(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and is_blob_name(entry.name):
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.name, st.st_size))
+            elif entry.name.endswith(".part"):
+                os.remove(entry.path)  # interrupted download
+        for _, name, size in sorted(entries):
+            self._blobs[name] = size
+            self.total_bytes += size
+
+    # -------- worker --------
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            self.active += 1
+            try:
+                stored = await self._download(item)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                self.failed += 1
+                logger.debug("Could not archive %s: %s", item.url, e)
+                continue
+            except Exception:
+                self.failed += 1
+                logger.exception("Unexpected error archiving %s", item.url)
+                continue
+            finally:
+                self.active -= 1
+            if stored is not None:
+                await self._remember(item.message_id, stored)
+
+    async def _download(self, item: _Download) -> Optional[StoredAttachment]:
+        assert self._session is not None
+        tmp = os.path.join(self.root, f"{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with self._session.get(item.url) as response:
+                if response.status != 200:
+                    self.failed += 1
+                    return None
+                if (response.content_length or 0) > self.max_file_bytes:
+                    self.skipped += 1
+                    return None
+                with open(tmp, "wb") as f:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_file_bytes:
+                            self.skipped += 1
+                            return None
+                        digest.update(chunk)
+                        await asyncio.to_thread(f.write, chunk)
+
+            name = blob_name(digest.hexdigest(), item.filename)
+            async with self._files_lock:
+                if name in self._blobs:
+                    self.deduplicated += 1
+                    self._blobs.move_to_end(name)
+                    await asyncio.to_thread(os.utime, os.path.join(self.root, name))
+                else:
+                    await asyncio.to_thread(os.replace, tmp, os.path.join(self.root, name))
+                    self._blobs[name] = size
+                    self.total_bytes += size
+                    self.downloaded += 1
+                    await self._evict()
+            return StoredAttachment(item.filename, name, size)
+        finally:
+            if os.path.exists(tmp):
+                await asyncio.to_thread(os.remove, tmp)
+
+    async def _remember(self, message_id: int, stored: StoredAttachment) -> None:
+        if self._db is None:
+            return
+        try:
+            await asyncio.to_thread(self._insert_sync, message_id, stored)
+        except sqlite3.Error:
+            logger.exception("Could not write the attachment index")
+
+    # -------- message index (worker threads) --------
+    def _open_index(self) -> None:
+        with self._db_lock:
+            db = sqlite3.connect(
+                os.path.join(self.root, INDEX_NAME), timeout=10, isolation_level=None, check_same_thread=False
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(
+                "CREATE TABLE IF NOT EXISTS message_attachments ("
+                " message_id INTEGER NOT NULL, filename TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS message_attachments_message ON message_attachments (message_id);"
+            )
+            self._db = db
+
+    def _insert_sync(self, message_id: int, stored: StoredAttachment) -> None:
+        with self._db_lock:
+            if self._db is None:
+                return
+            cursor = self._db.execute(
+                "INSERT INTO message_attachments VALUES (?, ?, ?, ?)",
+                (message_id, stored.filename, stored.name, stored.size)
+            )
+            # keep roughly the newest max_messages messages (a few attachments each)
+            if cursor.lastrowid % 1000 == 0:
+                self._db.execute(
+                    "DELETE FROM message_attachments WHERE message_id < ("
+                    " SELECT message_id FROM (SELECT DISTINCT message_id FROM message_attachments"
+                    " ORDER BY message_id DESC LIMIT 1 OFFSET ?))",
+                    (self.max_messages - 1,)
+                )
+
+    def _pop_sync(self, message_id: int) -> List[StoredAttachment]:
+        with self._db_lock:
+            if self._db is None:
+                return []
+            rows = self._db.execute(
+                "SELECT filename, name, size FROM message_attachments WHERE message_id = ? ORDER BY rowid",
+                (message_id,)
+            ).fetchall()
+            if rows:
+                self._db.execute("DELETE FROM message_attachments WHERE message_id = ?", (message_id,))
+        return [StoredAttachment(*row) for row in rows]
+
+    async def _evict(self) -> None:
+        # under _files_lock: a re-download of a victim waits until its file is gone
+        victims = []
+        while self.total_bytes > self.max_bytes and len(self._blobs) > 1:
+            name, size = self._blobs.popitem(last=False)
+            self.total_bytes -= size
+            self.evicted += 1
+            victims.append(os.path.join(self.root, name))
+        if victims:
+            await asyncio.to_thread(_remove_files, victims)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queued": self._queue.qsize(),
+            "active": self.active,
+            "files": len(self._blobs),
+            "bytes": self.total_bytes,
+            "downloaded": self.downloaded,
+            "deduplicated": self.deduplicated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+        }
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
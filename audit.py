@@ -0,0 +1,330 @@
+# audit.py
+"""
+Searchable archive of logged message edits and deletes.
+Every entry that goes to the message-log channel is also queued here and
+written to a local SQLite (WAL) file in batched transactions from a worker
+thread, so gateway handlers never touch the disk. An FTS5 index over the
+content (before and after edits) and author name backs `/logsearch`;
+results are paginated by row ID (keyset), so every page is an index range
+scan regardless of how deep the moderator pages. Entries older than
+`max_age` are pruned by the same worker about once every `prune_interval`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("bovary_bot.audit")
+
+_RELATIVE_RE = re.compile(r"^\s*(\d+)\s*([mhdw])\s*$", re.IGNORECASE)
+_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+_COLUMNS = (
+    "id", "kind", "guild_id", "channel_id", "message_id",
+    "author_id", "author_name", "content", "before", "attachments", "logged_at",
+)
+
+
+class AuditRecord(NamedTuple):
+    id: int
+    kind: str                   # "delete" | "bulk_delete" | "edit"
+    guild_id: Optional[int]
+    channel_id: int
+    message_id: int
+    author_id: Optional[int]
+    author_name: Optional[str]
+    content: str                # deleted content, or the content after an edit
+    before: Optional[str]       # content before an edit
+    attachments: str            # attachment URLs, newline-separated
+    logged_at: float
+
+
+class AuditQuery(NamedTuple):
+    guild_id: Optional[int] = None
+    author_id: Optional[int] = None
+    channel_id: Optional[int] = None
+    since: Optional[float] = None
+    until: Optional[float] = None
+    text: Optional[str] = None
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """'30m' / '12h' / '7d' / '2w' ago, or an ISO date/datetime (UTC if no offset)."""
+    now = time.time() if now is None else now
+    match = _RELATIVE_RE.match(value)
+    if match:
+        return now - int(match.group(1)) * _UNITS[match.group(2).lower()]
+    when = datetime.fromisoformat(value.strip())
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def fts_query(text: str) -> str:
+    """User text -> FTS5 query: every word must match, the last one as a prefix.
+    Words without a letter or digit tokenize to nothing and are left out, so
+    this is "" when there is nothing the index can match."""
+    words = [w.replace('"', '""') for w in text.split() if any(c.isalnum() for c in w)]
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class AuditArchive:
+    def __init__(
+        self,
+        path: str,
+        *,
+        flush_interval: float = 1.0,
+        batch_size: int = 500,
+        max_pending: int = 20000,
+        max_age: float = 90 * 86400.0,
+        prune_interval: float = 3600.0,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self.fts = True
+        self._pending: Deque[Tuple] = deque(maxlen=max_pending)
+        self._next_prune = 0.0
+        self._wake = asyncio.Event()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.pruned = 0
+        self.last_flush_ms = 0.0
+
+    # -------- writes --------
+    def record(
+        self,
+        kind: str,
+        *,
+        guild_id: Optional[int],
+        channel_id: int,
+        message_id: int,
+        author_id: Optional[int] = None,
+        author_name: Optional[str] = None,
+        content: str = "",
+        before: Optional[str] = None,
+        attachments: Iterable[str] = (),
+    ) -> None:
+        """Queue one entry (non-blocking; written by the flush task)."""
+        if len(self._pending) == self.max_pending:
+            self.dropped += 1  # the append below evicts the oldest
+        self._pending.append((
+            kind, guild_id, channel_id, message_id, author_id, author_name,
+            content or "", before, "\n".join(attachments), time.time(),
+        ))
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # autocommit mode: transactions are opened explicitly below
+            self._db = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None, check_same_thread=False
+            )
+            db = self._db
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(
+                "CREATE TABLE IF NOT EXISTS audit_log ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " kind TEXT NOT NULL, guild_id INTEGER, channel_id INTEGER NOT NULL,"
+                " message_id INTEGER NOT NULL, author_id INTEGER, author_name TEXT,"
+                " content TEXT NOT NULL, before TEXT, attachments TEXT NOT NULL,"
+                " logged_at REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS audit_guild ON audit_log (guild_id, id);"
+                "CREATE INDEX IF NOT EXISTS audit_author ON audit_log (author_id, id);"
+                "CREATE INDEX IF NOT EXISTS audit_channel ON audit_log (channel_id, id);"
+            )
+            try:
+                db.executescript(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS audit_fts USING fts5("
+                    " content, before, author_name,"
+                    " content='audit_log', content_rowid='id', tokenize='unicode61 remove_diacritics 2');"
+                    "CREATE TRIGGER IF NOT EXISTS audit_fts_insert AFTER INSERT ON audit_log BEGIN"
+                    " INSERT INTO audit_fts (rowid, content, before, author_name)"
+                    " VALUES (new.id, new.content, new.before, new.author_name); END;"
+                    "CREATE TRIGGER IF NOT EXISTS audit_fts_delete AFTER DELETE ON audit_log BEGIN"
+                    " INSERT INTO audit_fts (audit_fts, rowid, content, before, author_name)"
+                    " VALUES ('delete', old.id, old.content, old.before, old.author_name); END;"
+                )
+            except sqlite3.OperationalError:
+                logger.warning("SQLite has no FTS5, /logsearch text filters fall back to LIKE")
+                self.fts = False
+        return self._db
+
+    def _write_sync(self, rows: List[Tuple]) -> None:
+        with self._db_lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "INSERT INTO audit_log (kind, guild_id, channel_id, message_id, author_id,"
+                    " author_name, content, before, attachments, logged_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _prune_sync(self, cutoff: float) -> int:
+        # rows are appended in time order: everything below the first recent ID has
+        # expired, and finding it walks the rowid from the oldest row only
+        with self._db_lock:
+            cursor = self._connect().execute(
+                "DELETE FROM audit_log WHERE id < coalesce("
+                " (SELECT id FROM audit_log WHERE logged_at >= ? ORDER BY id LIMIT 1),"
+                " (SELECT max(id) + 1 FROM audit_log))",
+                (cutoff,),
+            )
+            return cursor.rowcount
+
+    async def prune(self) -> None:
+        """Delete entries older than `max_age`."""
+        try:
+            removed = await asyncio.to_thread(self._prune_sync, time.time() - self.max_age)
+        except sqlite3.Error:
+            logger.exception("Could not prune the audit archive")
+            return
+        if removed:
+            self.pruned += removed
+            logger.info("Pruned %d audit entries older than %.0f days", removed, self.max_age / 86400)
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        rows = list(self._pending)
+        self._pending.clear()
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write_sync, rows)
+        except sqlite3.Error:
+            logger.exception("Could not archive %d log entries", len(rows))
+            # keep them for the next attempt, dropping the oldest beyond max_pending
+            rows.extend(self._pending)
+            self.dropped += max(0, len(rows) - self.max_pending)
+            self._pending = deque(rows, maxlen=self.max_pending)
+            return
+        self.written += len(rows)
+        self.batches += 1
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    # -------- search --------
+    def _search_sync(self, query: AuditQuery, before_id: Optional[int], limit: int) -> List[AuditRecord]:
+        where: List[str] = []
+        params: List[object] = []
+        source = "audit_log a"
+        text = query.text.strip() if query.text else ""
+        if text:
+            match = fts_query(text) if self.fts else ""
+            if match:
+                source = "audit_fts JOIN audit_log a ON a.id = audit_fts.rowid"
+                where.append("audit_fts MATCH ?")
+                params.append(match)
+            else:  # no FTS5, or only punctuation the index cannot match
+                where.append("(a.content LIKE ? OR a.before LIKE ?)")
+                params.extend([f"%{text}%"] * 2)
+        for column, value in (
+            ("a.guild_id = ?", query.guild_id),
+            ("a.author_id = ?", query.author_id),
+            ("a.channel_id = ?", query.channel_id),
+            ("a.logged_at >= ?", query.since),
+            ("a.logged_at < ?", query.until),
+            ("a.id < ?", before_id),
+        ):
+            if value is not None:
+                where.append(column)
+                params.append(value)
+        sql = (
+            f"SELECT {', '.join('a.' + c for c in _COLUMNS)} FROM {source}"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY a.id DESC LIMIT ?"
+        )
+        params.append(limit)
+        with self._db_lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [AuditRecord(*row) for row in rows]
+
+    async def search(
+        self, query: AuditQuery, *, before_id: Optional[int] = None, limit: int = 10
+    ) -> List[AuditRecord]:
+        """Newest first; pass the last record's ID as `before_id` for the next page."""
+        await self.flush()  # include entries still waiting for the batch
+        return await asyncio.to_thread(self._search_sync, query, before_id, limit)
+
+    # -------- lifecycle --------
+    async def open(self) -> None:
+        if self._task is not None:
+            return
+        try:
+            await asyncio.to_thread(self._connect_locked)
+        except sqlite3.Error:
+            logger.exception("Could not open the audit archive at %s", self.path)
+            return
+        self._task = asyncio.create_task(self._run(), name="audit-flush")
+
+    def _connect_locked(self) -> None:
+        with self._db_lock:
+            self._connect()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            if self.max_age and time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + self.prune_interval
+                await self.prune()
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "pruned": self.pruned,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
@@ -0,0 +1,223 @@
+# backfill.py
+"""
+Auto-reaction backfill for media posted while the bot was offline.
+How far each media channel has been handled is kept as a checkpoint in a
+small JSON file. On READY the channels are scanned from their checkpoint
+(`history(after=...)`, a few channels at a time) and media that is missing
+some of the auto-reactions is handed to the reaction scheduler with only the
+missing emojis. The scan waits while a channel's reaction queue is busy, so
+live messages keep priority. Reactions already added by the bot
+(`reaction.me`) are skipped, so running it again is harmless.
+Live messages only move a separate high-water mark. It becomes the
+checkpoint once the channel's backlog has been scanned to the end, so a
+live post can never skip over messages the scan has not reached yet (or
+that a truncated scan left for the next run). The saved checkpoint also
+never passes a message still queued for reactions: if the bot stops before
+reacting to it, the next scan picks it up again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import discord
+
+from reaction_scheduler import ReactionScheduler
+from state_file import JsonState
+
+logger = logging.getLogger("bovary_bot.backfill")
+
+
+def _missing_reactions(message: discord.Message, emojis: Tuple[str, ...]) -> List[str]:
+    mine = {str(r.emoji) for r in message.reactions if r.me}
+    return [e for e in emojis if e not in mine]
+
+
+class ReactionBackfill(JsonState):
+    label = "reaction checkpoints"
+    task_name = "reaction-checkpoints"
+
+    def __init__(
+        self,
+        path: Optional[str],
+        *,
+        scheduler: ReactionScheduler,
+        is_media: Callable[[discord.Message], bool],
+        concurrency: int = 3,
+        max_messages: int = 500,
+        max_age: float = 86400.0,
+        queue_limit: int = 50,
+        save_interval: float = 30.0,
+    ):
+        super().__init__(path, save_interval=save_interval)
+        self._scheduler = scheduler
+        self._is_media = is_media
+        self.concurrency = concurrency
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.queue_limit = queue_limit
+        self._checkpoints: Dict[int, int] = {}   # history up to here has been handled
+        self._live: Dict[int, int] = {}          # newest message seen by on_message
+        self._complete: Set[int] = set()         # backlog scanned to the end: the live mark counts
+        self._saved: Dict[str, int] = {}         # the checkpoints as last written
+        self._scan: Optional[asyncio.Task] = None
+
+        # Counters
+        self.runs = 0
+        self.scanned = 0
+        self.media = 0
+        self.already_reacted = 0
+        self.scheduled = 0
+        self.truncated = 0
+        self.errors = 0
+        self.last_run_seconds = 0.0
+
+    # -------- checkpoints --------
+    def seen(self, channel_id: int, message_id: int) -> None:
+        """Record a live message (IDs only grow, older messages are ignored)."""
+        if message_id > self._live.get(channel_id, 0):
+            self._live[channel_id] = message_id
+
+    def _position(self, channel_id: int) -> int:
+        checkpoint = self._checkpoints.get(channel_id, 0)
+        if channel_id in self._complete:
+            return max(checkpoint, self._live.get(channel_id, 0))
+        return checkpoint
+
+    def _safe_checkpoints(self) -> Dict[int, int]:
+        # stop just before the oldest message still waiting for its reactions
+        result = {}
+        for channel_id in self._checkpoints:
+            message_id = self._position(channel_id)
+            pending = self._scheduler.pending_ids(channel_id)
+            result[channel_id] = min(message_id, min(pending) - 1) if pending else message_id
+        return result
+
+    # -------- scan --------
+    def run(self, channels: Iterable[discord.abc.Messageable]) -> bool:
+        """Start a scan in the background. Returns False if one is already running."""
+        if self._scan is not None and not self._scan.done():
+            return False
+        channels = list(channels)
+        # where each scan starts, fixed now: live messages arriving meanwhile must not move it
+        starts = {c.id: self._position(c.id) for c in channels}
+        for channel_id, position in starts.items():
+            self._complete.discard(channel_id)
+            if position:
+                self._checkpoints[channel_id] = position
+        self._scan = asyncio.create_task(self._scan_all(channels, starts), name="reaction-backfill")
+        return True
+
+    async def _scan_all(self, channels: List[discord.abc.Messageable], starts: Dict[int, int]) -> None:
+        start = time.perf_counter()
+        scheduled = self.scheduled
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def scan(channel: discord.abc.Messageable) -> None:
+            async with semaphore:
+                await self._scan_channel(channel, starts[channel.id])
+
+        await asyncio.gather(*(scan(c) for c in channels))
+        self.runs += 1
+        self.last_run_seconds = time.perf_counter() - start
+        logger.info(
+            "Reaction backfill: %d channels in %.1fs, %d messages queued",
+            len(channels), self.last_run_seconds, self.scheduled - scheduled
+        )
+        await self._save()
+
+    async def _scan_channel(self, channel: discord.abc.Messageable, start: int) -> None:
+        lookback = discord.utils.time_snowflake(
+            datetime.now(timezone.utc) - timedelta(seconds=self.max_age)
+        )
+        after = last = max(start, lookback)
+        emojis = self._scheduler.emojis
+        count = 0
+        finished = False
+        try:
+            async for message in channel.history(
+                limit=self.max_messages, after=discord.Object(after), oldest_first=True
+            ):
+                count += 1
+                if not message.author.bot and self._is_media(message):
+                    self.media += 1
+                    missing = _missing_reactions(message, emojis)
+                    if not missing:
+                        self.already_reacted += 1
+                    else:
+                        # leave room in the channel's queue for live messages
+                        while self._scheduler.depth(channel.id) >= self.queue_limit:
+                            await asyncio.sleep(1.0)
+                        if self._scheduler.schedule(message, missing):
+                            self.scheduled += 1
+                last = message.id
+            finished = count < self.max_messages
+        except discord.Forbidden:
+            self.errors += 1
+            logger.warning("Reaction backfill: no access to the history of channel %s", channel.id)
+        except discord.HTTPException as e:
+            self.errors += 1
+            logger.warning("Reaction backfill of channel %s stopped: %s", channel.id, e)
+        finally:
+            self.scanned += count
+
+        # the checkpoint only moves once the channel's scan is over
+        if last > after or finished:
+            self._checkpoints[channel.id] = last
+        if finished:
+            self._complete.add(channel.id)
+        elif count >= self.max_messages:
+            self.truncated += 1
+            logger.warning(
+                "Reaction backfill of channel %s stopped at %d messages; the rest waits for the next run",
+                channel.id, count
+            )
+
+    # -------- lifecycle --------
+    async def close(self) -> None:
+        if self._scan and not self._scan.done():
+            self._scan.cancel()
+            try:
+                await self._scan
+            except asyncio.CancelledError:
+                pass
+        self._scan = None
+        await super().close()
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        return {
+            "channels": len(self._checkpoints),
+            "running": int(self._scan is not None and not self._scan.done()),
+            "runs": self.runs,
+            "scanned": self.scanned,
+            "media": self.media,
+            "already_reacted": self.already_reacted,
+            "scheduled": self.scheduled,
+            "truncated": self.truncated,
+            "errors": self.errors,
+            "last_run_seconds": round(self.last_run_seconds, 3),
+        }
+
+    # -------- persistence --------
+    def _load(self, data: Dict[str, Any]) -> None:
+        self._checkpoints = {int(cid): int(mid) for cid, mid in data.items()}
+        self._saved = self._dump()
+
+    def _dump(self) -> Dict[str, int]:
+        return {str(k): v for k, v in self._safe_checkpoints().items()}
+
+    async def _save(self) -> None:
+        # no `_changed` flag to rely on: the safe checkpoints also move when the
+        # scheduler's queue drains, so compare with what was last written
+        data = self._dump()
+        if data == self._saved:
+            return
+        self._changed = True
+        await super()._save()
+        if not self._changed:
+            self._saved = data
@@ -0,0 +1,173 @@
+# benchmarks/bench_cache_profiles.py
+"""
+Memory / startup comparison of the cache profiles on a synthetic guild.
+For each profile a fresh discord.py ConnectionState is built with the
+profile's options, then the guild is "started" the way the gateway would:
+members are chunked (full profile only), a share of members join while the
+bot is online, and a stream of messages goes through the message cache.
+Reports retained memory (tracemalloc) and CPU time spent in startup.
+
+Usage: python benchmarks/bench_cache_profiles.py [--members 50000] [--joins 500] [--messages 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord  # noqa: E402
+from discord.state import ConnectionState  # noqa: E402
+
+from cache_profiles import PROFILES, bot_cache_options  # noqa: E402
+
+GUILD_ID = 1_000_000
+CHANNEL_ID = 2_000_000
+CHUNK_SIZE = 1000  # members per GUILD_MEMBERS_CHUNK payload
+JOINED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat()
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+def make_state(profile_name: str, intents: discord.Intents) -> ConnectionState:
+    options = bot_cache_options(profile_name, intents)
+    return ConnectionState(
+        dispatch=_noop,
+        handlers={},
+        hooks={},
+        http=None,
+        intents=intents,
+        **options,
+    )
+
+
+def user_payload(i: int) -> dict:
+    return {
+        "id": str(10_000_000 + i),
+        "username": f"member{i}",
+        "global_name": f"Member {i}",
+        "discriminator": "0",
+        "avatar": None,
+    }
+
+
+def member_payload(i: int) -> dict:
+    return {
+        "user": user_payload(i),
+        "roles": [],
+        "joined_at": JOINED_AT,
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def message_payload(i: int, members: int) -> dict:
+    return {
+        "id": str(30_000_000 + i),
+        "channel_id": str(CHANNEL_ID),
+        "guild_id": str(GUILD_ID),
+        "author": user_payload(i % members),
+        "content": f"synthetic message {i} " * 4,
+        "timestamp": JOINED_AT,
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "flags": 0,
+    }
+
+
+def run_profile(name: str, args) -> dict:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+
+    state = make_state(name, intents)
+    guild = discord.Guild(
+        data={"id": str(GUILD_ID), "name": "Synthetic", "member_count": args.members, "roles": []},
+        state=state,
+    )
+    state._add_guild(guild)
+    channel = discord.TextChannel(
+        state=state,
+        guild=guild,
+        data={"id": str(CHANNEL_ID), "name": "media", "type": 0, "position": 0, "permission_overwrites": []},
+    )
+    guild._add_channel(channel)
+
+    chunks = 0
+    if state._chunk_guilds:
+        # full profile: every member arrives in GUILD_MEMBERS_CHUNK payloads and is cached
+        for offset in range(0, args.members, CHUNK_SIZE):
+            chunks += 1
+            for i in range(offset, min(offset + CHUNK_SIZE, args.members)):
+                guild._add_member(discord.Member(data=member_payload(i), guild=guild, state=state))
+    startup = time.perf_counter() - start
+
+    # members joining while online (cached depending on member_cache_flags.joined)
+    for i in range(args.members, args.members + args.joins):
+        member = discord.Member(data=member_payload(i), guild=guild, state=state)
+        if state.member_cache_flags.joined:
+            guild._add_member(member)
+
+    # message traffic through discord.py's own message cache
+    for i in range(args.messages):
+        message = discord.Message(state=state, channel=channel, data=message_payload(i, args.members))
+        if state._messages is not None:
+            state._messages.append(message)
+
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "profile": name,
+        "cached_members": len(guild._members),
+        "cached_messages": len(state._messages) if state._messages is not None else 0,
+        "chunks": chunks,
+        "startup_ms": startup * 1000,
+        "retained_mb": (current - base) / 1024 / 1024,
+        "peak_mb": (peak - base) / 1024 / 1024,
+    }
+    del state, guild, channel
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=50_000)
+    parser.add_argument("--joins", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=5_000)
+    args = parser.parse_args()
+
+    print(f"synthetic guild: {args.members} members, {args.joins} joins, {args.messages} messages")
+    print(f"{'profile':<10} {'members':>8} {'messages':>9} {'chunks':>7} {'startup ms':>11} {'retained MB':>12} {'peak MB':>8}")
+    for name in PROFILES:
+        r = run_profile(name, args)
+        print(
+            f"{r['profile']:<10} {r['cached_members']:>8} {r['cached_messages']:>9} {r['chunks']:>7} "
+            f"{r['startup_ms']:>11.1f} {r['retained_mb']:>12.2f} {r['peak_mb']:>8.2f}"
+        )
+    print("startup ms is CPU time only; chunking also costs one gateway round-trip per chunk.")
+
+
+if __name__ == "__main__":
+    main()
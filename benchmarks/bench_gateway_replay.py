@@ -0,0 +1,423 @@
+# benchmarks/bench_gateway_replay.py
+"""
+Offline gateway-replay load test of bot.py.
+The real bot module is imported and logged in against a local stub of the
+REST API (benchmarks/stub_discord.py: simulated latency and 429 buckets).
+A synthetic guild is installed in discord.py's ConnectionState, then
+MESSAGE_CREATE / MESSAGE_UPDATE / MESSAGE_DELETE / GUILD_MEMBER_ADD and
+INTERACTION_CREATE (invite button) payloads are fed to the state's gateway
+parsers at the configured rates, so every event goes through discord.py's
+parsing and dispatch into the bot's handlers exactly as in production.
+
+Reports events/sec, p50/p99 handler latency, how long the background
+workers (reactions, log batches) need to drain, and the outbound REST
+volume per route including 429s.
+
+Usage: python benchmarks/bench_gateway_replay.py [--duration 10] [--messages 50] [--edits 5]
+       [--deletes 5] [--joins 2] [--invites 1] [--latency-ms 50] [--json results.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord  # noqa: E402
+
+from stub_discord import STUB_EPOCH, StubDiscordAPI  # noqa: E402
+
+GUILD_ID = 800_000_000_000_000_001
+USER_ID_BASE = 810_000_000_000_000_000
+MESSAGE_ID_BASE = 820_000_000_000_000_000
+INTERACTION_ID_BASE = 830_000_000_000_000_000
+PLAIN_CHANNEL_ID = 840_000_000_000_000_001
+PANEL_MESSAGE_ID = 840_000_000_000_000_002
+MEDIA_FILENAMES = ("clip.mp4", "photo.png", "screenshot.jpg", "meme.gif", "render.webp")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def user_payload(user_id: int) -> Dict[str, Any]:
+    return {
+        "id": str(user_id),
+        "username": f"user{user_id % 100_000}",
+        "global_name": None,
+        "discriminator": "0",
+        "avatar": None,
+    }
+
+
+def member_payload(user_id: int) -> Dict[str, Any]:
+    return {
+        "user": user_payload(user_id),
+        "roles": [],
+        "joined_at": STUB_EPOCH,
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+        "permissions": "0",
+    }
+
+
+class SyntheticGuild:
+    """A guild installed straight into the ConnectionState plus payload factories."""
+
+    def __init__(self, app: Any, *, users: int, media_ratio: float, seed: int, cdn_url: str):
+        self.state = app.bot._connection
+        self.app = app
+        self.random = random.Random(seed)
+        self.media_ratio = media_ratio
+        self.cdn_url = cdn_url
+        self.users = [USER_ID_BASE + i for i in range(users)]
+        self.media_channels = list(app.CHANNEL_IDS)
+        self.text_channels = self.media_channels + [PLAIN_CHANNEL_ID]
+        self.invite_channel = app.REQUIRED_INVITE_CHANNEL
+        self._message_ids = itertools.count(MESSAGE_ID_BASE)
+        self._interaction_ids = itertools.count(INTERACTION_ID_BASE)
+        self._joins = itertools.count(USER_ID_BASE + users)
+        # (channel_id, message_id, author_id, content) of messages that can still be edited/deleted
+        self.recent: Deque[Tuple[int, int, int, str]] = collections.deque(maxlen=5000)
+
+        log_channels = {app.LOG_CHANNEL_ID, app.MESSAGE_LOG_CHANNEL_ID, app.STAFF_LOG_CHANNEL, app.IGNORE_CHANNEL_ID}
+        channel_ids = sorted({*self.text_channels, self.invite_channel, *(c for c in log_channels if c)})
+        guild = discord.Guild(
+            data={
+                "id": str(GUILD_ID),
+                "name": "Synthetic",
+                "member_count": users,
+                "roles": [
+                    {"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0},
+                    {"id": str(app.CREW_LEADER_ROLE_ID), "name": "Crew Leader", "permissions": "0", "position": 1},
+                ],
+                "channels": [
+                    {"id": str(cid), "name": f"channel-{i}", "type": 0, "position": i, "permission_overwrites": []}
+                    for i, cid in enumerate(channel_ids)
+                ],
+            },
+            state=self.state,
+        )
+        self.state._add_guild(guild)
+        self.guild = guild
+
+    # -------- payloads --------
+    def _content(self) -> str:
+        words = self.random.randint(3, 25)
+        text = " ".join(self.random.choice(("lol", "nice", "car", "race", "gg", "ok", "bovary", "drift")) for _ in range(words))
+        if self.random.random() < 0.05:
+            text += " https://example.com/page"
+        return text
+
+    def message_create(self) -> Dict[str, Any]:
+        channel_id = self.random.choice(self.text_channels)
+        author = self.random.choice(self.users)
+        message_id = next(self._message_ids)
+        content = self._content()
+        attachments = []
+        if self.random.random() < self.media_ratio:
+            filename = self.random.choice(MEDIA_FILENAMES)
+            attachments.append({
+                "id": str(message_id + 1),
+                "filename": filename,
+                "size": self.random.randint(50_000, 8_000_000),
+                "url": f"{self.cdn_url}/attachments/{channel_id}/{message_id}/{filename}",
+                "proxy_url": f"https://media.discordapp.net/attachments/{channel_id}/{message_id}/{filename}",
+            })
+        self.recent.append((channel_id, message_id, author, content))
+        return self._message(channel_id, message_id, author, content, attachments)
+
+    def _message(
+        self, channel_id: int, message_id: int, author: int, content: str,
+        attachments: List[Dict[str, Any]], edited: bool = False,
+    ) -> Dict[str, Any]:
+        return {
+            "id": str(message_id),
+            "channel_id": str(channel_id),
+            "guild_id": str(GUILD_ID),
+            "author": user_payload(author),
+            "member": {k: v for k, v in member_payload(author).items() if k != "user"},
+            "content": content,
+            "timestamp": STUB_EPOCH,
+            "edited_timestamp": STUB_EPOCH if edited else None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": attachments,
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+            "flags": 0,
+        }
+
+    def message_update(self) -> Dict[str, Any]:
+        if not self.recent:
+            return self.message_create()
+        channel_id, message_id, author, content = self.random.choice(self.recent)
+        return self._message(channel_id, message_id, author, content + " (edited)", [], edited=True)
+
+    def message_delete(self) -> Dict[str, Any]:
+        if self.recent and self.random.random() < 0.9:
+            channel_id, message_id, _, _ = self.recent.popleft()
+        else:
+            channel_id, message_id = self.random.choice(self.text_channels), next(self._message_ids)
+        return {"id": str(message_id), "channel_id": str(channel_id), "guild_id": str(GUILD_ID)}
+
+    def member_add(self) -> Dict[str, Any]:
+        return {**member_payload(next(self._joins)), "guild_id": str(GUILD_ID)}
+
+    def invite_interaction(self) -> Dict[str, Any]:
+        user_id = self.random.choice(self.users)
+        interaction_id = next(self._interaction_ids)
+        panel = self._message(self.invite_channel, PANEL_MESSAGE_ID, int(self.state.self_id), "", [])
+        panel["author"] = self.state.user._to_minimal_user_json()
+        panel["components"] = [{
+            "type": 1,
+            "components": [{"type": 2, "style": 1, "label": "Request Invite", "custom_id": "invite_request_button"}],
+        }]
+        return {
+            "id": str(interaction_id),
+            "application_id": str(self.state.application_id),
+            "type": 3,
+            "token": f"stub-interaction-token-{interaction_id}",
+            "version": 1,
+            "attachment_size_limit": 8 * 1024 * 1024,
+            "guild_id": str(GUILD_ID),
+            "channel_id": str(self.invite_channel),
+            "channel": {"id": str(self.invite_channel), "type": 0},
+            "member": member_payload(user_id),
+            "message": panel,
+            "data": {"custom_id": "invite_request_button", "component_type": 2},
+            "locale": "en-US",
+            "guild_locale": "en-US",
+            "app_permissions": "0",
+            "entitlements": [],
+            "authorizing_integration_owners": {},
+            "context": 0,
+        }
+
+
+def record_handler_latencies(registry: Any) -> Dict[str, List[float]]:
+    """Keep every raw handler latency sample (the registry itself only keeps histogram buckets)."""
+    samples: Dict[str, List[float]] = collections.defaultdict(list)
+    observe = registry.observe
+
+    def recording_observe(metric: str, value: float, /, **labels: str) -> None:
+        if metric == "bovary_handler_latency_seconds":
+            samples[f"{labels['kind']}:{labels['name']}"].append(value)
+        observe(metric, value, **labels)
+
+    registry.observe = recording_observe
+    return samples
+
+
+async def drive(rate: float, duration: float, emit: Callable[[], None]) -> int:
+    """Open-loop generator: emit at `rate`/s regardless of how fast handlers finish."""
+    if rate <= 0:
+        return 0
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    interval = 1.0 / rate
+    sent = 0
+    while sent * interval < duration:
+        delay = start + sent * interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        emit()
+        sent += 1
+    return sent
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stub = StubDiscordAPI(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        bucket_limit=args.bucket_limit,
+        bucket_window=args.bucket_window,
+        seed=args.seed,
+    )
+    await stub.start()
+    discord.http.Route.BASE = stub.base_url
+
+    import bot as app  # config is read at import; the environment was prepared in main()
+    from metrics import metrics
+
+    samples = record_handler_latencies(metrics)
+    client = app.bot
+    await client.login("stub-token")
+    cdn_url = stub.cdn_url if args.archive else "https://cdn.discordapp.com"
+    world = SyntheticGuild(app, users=args.users, media_ratio=args.media_ratio, seed=args.seed, cdn_url=cdn_url)
+    state = world.state
+    stub.reset_counters()
+
+    streams = [
+        ("MESSAGE_CREATE", args.messages, lambda: state.parse_message_create(world.message_create())),
+        ("MESSAGE_UPDATE", args.edits, lambda: state.parse_message_update(world.message_update())),
+        ("MESSAGE_DELETE", args.deletes, lambda: state.parse_message_delete(world.message_delete())),
+        ("GUILD_MEMBER_ADD", args.joins, lambda: state.parse_guild_member_add(world.member_add())),
+        ("INTERACTION_CREATE", args.invites, lambda: state.parse_interaction_create(world.invite_interaction())),
+    ]
+    start = time.perf_counter()
+    sent = await asyncio.gather(*(drive(rate, args.duration, emit) for _, rate, emit in streams))
+    emitted = time.perf_counter() - start
+    total = sum(sent)
+
+    handled = lambda: sum(len(v) for v in samples.values()) >= total  # noqa: E731
+    await wait_until(handled, args.drain_timeout)
+    handlers_done = time.perf_counter() - start
+
+    def drained() -> bool:
+        reactions = app.reaction_scheduler.stats
+        logs = app.log_dispatcher.stats
+        archive = app.attachment_archiver.stats if app.attachment_archiver else {}
+        return not (
+            reactions["queue_depth"] or reactions["active_channels"] or logs["queued"] or logs["pending"]
+            or archive.get("queued") or archive.get("active")
+        )
+
+    drained_ok = await wait_until(drained, args.drain_timeout)
+    drain = time.perf_counter() - start
+    reaction_stats = app.reaction_scheduler.stats
+    log_stats = app.log_dispatcher.stats
+    archive_stats = app.attachment_archiver.stats if app.attachment_archiver else None
+    await client.close()
+    await stub.close()
+
+    return {
+        "config": vars(args),
+        "events": dict(zip((name for name, _, _ in streams), sent)),
+        "events_total": total,
+        "emit_seconds": round(emitted, 3),
+        "handled_seconds": round(handlers_done, 3),
+        "drain_seconds": round(drain, 3),
+        "drained": drained_ok,
+        "events_per_sec": round(total / handlers_done, 1) if handlers_done else 0.0,
+        "handlers": {
+            name: {
+                "calls": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                "max_ms": round(max(values) * 1000, 3),
+            }
+            for name, values in sorted(samples.items())
+        },
+        "rest": {
+            "total": stub.total_requests,
+            "rate_limited": sum(stub.rate_limited.values()),
+            "per_event": round(stub.total_requests / total, 3) if total else 0.0,
+            "routes": {
+                route: {"requests": n, "429": stub.rate_limited[route]}
+                for route, n in stub.requests.most_common()
+            },
+        },
+        "reactions": reaction_stats,
+        "logs": log_stats,
+        "attachments": archive_stats,
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    events = ", ".join(f"{name}={n}" for name, n in result["events"].items() if n)
+    print(f"replayed {result['events_total']} events ({events})")
+    print(
+        f"emitted in {result['emit_seconds']:.2f}s, handled by {result['handled_seconds']:.2f}s "
+        f"-> {result['events_per_sec']:.1f} events/sec; background drained by {result['drain_seconds']:.2f}s"
+        + ("" if result["drained"] else " (TIMED OUT)")
+    )
+    print()
+    print(f"{'handler':<32} {'calls':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, h in result["handlers"].items():
+        print(f"{name:<32} {h['calls']:>7} {h['p50_ms']:>9.3f} {h['p99_ms']:>9.3f} {h['max_ms']:>9.3f}")
+    print()
+    rest = result["rest"]
+    print(f"REST: {rest['total']} requests ({rest['per_event']:.2f}/event), {rest['rate_limited']} answered 429")
+    for route, r in rest["routes"].items():
+        print(f"  {route:<60} {r['requests']:>6} {r['429']:>6} x429")
+    reactions, logs = result["reactions"], result["logs"]
+    print()
+    print(
+        f"reactions: {reactions['reactions_added']} added, {reactions['coalesced']} coalesced, "
+        f"{reactions['dropped']} dropped, p50/p99 schedule->done "
+        f"{reactions['latency_p50_ms']}/{reactions['latency_p99_ms']} ms"
+    )
+    print(
+        f"log embeds: {logs['submitted']} submitted, {logs['sent_embeds']} sent in "
+        f"{logs['sent_messages']} messages, {logs['dropped']} dropped"
+    )
+    archive = result["attachments"]
+    if archive:
+        print(
+            f"attachments: {archive['downloaded']} downloaded, {archive['deduplicated']} deduplicated, "
+            f"{archive['failed']} failed, {archive['dropped']} dropped, {archive['bytes'] / 1024 ** 2:.1f} MB stored"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of traffic to replay")
+    parser.add_argument("--messages", type=float, default=50.0, help="MESSAGE_CREATE per second")
+    parser.add_argument("--edits", type=float, default=5.0, help="MESSAGE_UPDATE per second")
+    parser.add_argument("--deletes", type=float, default=5.0, help="MESSAGE_DELETE per second")
+    parser.add_argument("--joins", type=float, default=2.0, help="GUILD_MEMBER_ADD per second")
+    parser.add_argument("--invites", type=float, default=1.0, help="invite button clicks per second")
+    parser.add_argument("--users", type=int, default=500, help="distinct message authors / invite requesters")
+    parser.add_argument("--media-ratio", type=float, default=0.3, help="share of messages carrying an image/video")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub REST latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="extra random REST latency")
+    parser.add_argument("--bucket-limit", type=int, default=5, help="requests per bucket window (reactions: 1/0.25s)")
+    parser.add_argument("--bucket-window", type=float, default=5.0, help="bucket window in seconds")
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--cache-profile", default="minimal")
+    parser.add_argument("--archive", action="store_true", help="enable the attachment archiver (stub serves the CDN)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON (to diff runs)")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's INFO logging")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="bovary-replay-")
+    os.environ.update({
+        "DATA_DIR": data_dir,
+        "ROUTING_CONFIG": os.path.join(data_dir, "routing.json"),
+        "SYNC_COMMANDS": "0",
+        "PORT": "0",
+        "CACHE_PROFILE": args.cache_profile,
+        "ARCHIVE_ATTACHMENTS": "1" if args.archive else "0",
+        "ATTACHMENT_HOSTS": "127.0.0.1",
+    })
+    if not args.verbose:
+        logging.disable(logging.WARNING)  # rate-limit warnings are expected here
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# benchmarks/bench_help_view.py
+"""
+Memory / task / CPU comparison of the /help panel implementations.
+"legacy" replays the old panel: a new HelpView (180s timeout) per /help,
+stored by discord.py for its message, and every page rebuilt with
+`make_embed` on each click. "persistent" uses the bot's current code: the
+prerendered pages (`help_page`) and the shared, stopped layout view
+(`help_layout`), with clicks routed by custom_id to the one registered view.
+Both go through the same store_view condition discord.py applies when a
+view is sent. Reports live tasks, view store size, retained memory and the
+time per /help and per click.
+
+Usage: python benchmarks/bench_help_view.py [--calls 5000] [--clicks 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord  # noqa: E402
+
+MESSAGE_ID_BASE = 40_000_000
+
+
+class LegacyHelpView(discord.ui.View):
+    """The pre-change panel: per-call instance, no custom_ids, 180s timeout."""
+
+    def __init__(self, app: Any):
+        super().__init__(timeout=180)
+        self.app = app
+
+    @discord.ui.button(label="Moderation 🧹", style=discord.ButtonStyle.red)
+    async def mod_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(label="Utilities ⚙️", style=discord.ButtonStyle.green)
+    async def util_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(label="Back ⬅️", style=discord.ButtonStyle.grey)
+    async def back_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+
+def legacy_page(app: Any, name: str) -> discord.Embed:
+    """Page built from scratch the way the old callbacks did."""
+    if name == "moderation":
+        embed = app.make_embed(title="🧹 Moderation", color=discord.Color.red())
+        embed.description = "Restricted tools for environment control.\nSilent actions. Precise execution. Logged results."
+        embed.add_field(name="🧹 Actions", value="`/apagar <channel> <id>` — Anonymous message removal", inline=False)
+        embed.set_footer(text="Bovary Club Society • Moderation Layer")
+    elif name == "utilities":
+        embed = app.make_embed(title="⚙️ Utilities", color=discord.Color.green())
+        embed.description = "Essential internal utilities.\nTime, system status, and contextual information."
+        embed.add_field(name="🧠 System", value="`/ping` — System response verification", inline=False)
+        embed.set_footer(text="Bovary Club Society • Utility Layer")
+    else:
+        embed = app.make_embed(
+            title="📘 Control Panel — " + app.BOT_NAME,
+            description=(
+                "Internal interface of the **Bovary Club Society**.\n"
+                "A curated space for control, access, and identity.\n\n"
+                "Select a category to continue."
+            ),
+            color=discord.Color.blue(),
+        )
+        embed.set_footer(text="Bovary Club Society • Internal System")
+    return embed
+
+
+def send(state: Any, view: discord.ui.View, message_id: int) -> None:
+    """What InteractionResponse.send_message does with the view after the API call."""
+    if not view.is_finished():
+        state.store_view(view, message_id)
+
+
+async def run_variant(
+    name: str,
+    app: Any,
+    args: argparse.Namespace,
+    make_view: Callable[[], discord.ui.View],
+    page: Callable[[str], discord.Embed],
+) -> Dict[str, Any]:
+    state = app.bot._connection
+    store = state._view_store
+
+    # CPU per /help (page + view + wire payload) and per click (page + payload)
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        page("home").to_dict(), make_view().to_components()
+    help_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for click in range(args.calls * args.clicks):
+        page(("moderation", "utilities", "home")[click % 3]).to_dict()
+    click_time = time.perf_counter() - start
+
+    # what stays alive after the /help calls have been answered
+    gc.collect()
+    tasks_before = len(asyncio.all_tasks())
+    views_before = len(store._views)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for i in range(args.calls):
+        view = make_view()
+        page("home").to_dict(), view.to_components()
+        send(state, view, MESSAGE_ID_BASE + i)
+    del view
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "variant": name,
+        "tasks": len(asyncio.all_tasks()) - tasks_before,
+        "stored_views": len(store._views) - views_before,
+        "retained_kb": (current - base) / 1024,
+        "help_us": help_time / args.calls * 1e6,
+        "click_us": click_time / max(1, args.calls * args.clicks) * 1e6,
+    }
+
+    # drop what the legacy run left behind so it does not skew the next variant
+    for key in [k for k in store._views if k is not None and k >= MESSAGE_ID_BASE]:
+        store._views.pop(key)
+        view = store._synced_message_views.pop(key, None)
+        if view is not None:
+            view.stop()  # cancels its timeout task
+    await asyncio.sleep(0)
+    return result
+
+
+async def run(args: argparse.Namespace) -> None:
+    import bot as app  # config is read at import; the environment was prepared in main()
+
+    app.bot.add_view(app.HelpView())  # as in setup_hook
+    variants = {
+        "legacy": (lambda: LegacyHelpView(app), lambda name: legacy_page(app, name)),
+        "persistent": (app.help_layout, app.help_page),
+    }
+    print(f"{args.calls} /help calls, {args.clicks} button clicks each")
+    print(f"{'variant':<11} {'live tasks':>10} {'stored views':>13} {'retained KB':>12} {'µs/help':>9} {'µs/click':>9}")
+    for name in args.variants or variants:
+        make_view, page = variants[name]
+        r = await run_variant(name, app, args, make_view, page)
+        print(
+            f"{r['variant']:<11} {r['tasks']:>10} {r['stored_views']:>13} {r['retained_kb']:>12.1f} "
+            f"{r['help_us']:>9.1f} {r['click_us']:>9.1f}"
+        )
+    print("live tasks / stored views / retained KB are what is still held after the calls (legacy: until the 180s timeouts).")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--clicks", type=int, default=3)
+    parser.add_argument("--variants", nargs="*", choices=("legacy", "persistent"))
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="bovary-help-")
+    os.environ.update({
+        "DATA_DIR": data_dir,
+        "ROUTING_CONFIG": os.path.join(data_dir, "routing.json"),
+        "SYNC_COMMANDS": "0",
+        "PORT": "0",
+    })
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
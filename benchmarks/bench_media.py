@@ -0,0 +1,151 @@
+# benchmarks/bench_media.py
+"""
+Micro-benchmark: legacy `is_media_in_message` vs `MediaClassifier.is_media`.
+Builds a synthetic corpus of plain-text, link, attachment and embed messages
+and times both over the same messages, per kind. The legacy function has no
+bare-link detection, so for messages with text only the classifier's extra
+coverage and its cost are reported.
+
+Usage: python benchmarks/bench_media.py [--messages 100000] [--seed 1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media import MediaClassifier  # noqa: E402
+
+
+def legacy_is_media_in_message(message) -> bool:
+    """The original implementation from bot.py, kept verbatim for comparison."""
+    for a in message.attachments:
+        if a.content_type and a.content_type.startswith(("image/", "video/")):
+            return True
+        if a.filename.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp4", ".mov", ".webm", ".mkv", ".gifv")):
+            return True
+
+    for e in message.embeds:
+        if getattr(e, "type", None) in ("image", "video", "gifv"):
+            return True
+        if getattr(e, "image", None) and getattr(e.image, "url", None):
+            return True
+        if getattr(e, "thumbnail", None) and getattr(e.thumbnail, "url", None):
+            return True
+
+    return False
+
+
+class _Embed:
+    """Mimics discord.Embed: `image`/`thumbnail` build a new proxy on every access."""
+
+    __slots__ = ("type", "_image", "_thumbnail")
+
+    def __init__(self, type: str, image=None, thumbnail=None):
+        self.type = type
+        self._image = image
+        self._thumbnail = thumbnail
+
+    @property
+    def image(self):
+        return SimpleNamespace(url=self._image)
+
+    @property
+    def thumbnail(self):
+        return SimpleNamespace(url=self._thumbnail)
+
+
+WORDS = "car night shot neon light frame motion color art design shadow tone".split()
+
+
+def _attachment(rng: random.Random):
+    kind = rng.random()
+    if kind < 0.6:
+        return SimpleNamespace(content_type="image/png", filename=f"IMG_{rng.randint(0, 9999)}.PNG")
+    if kind < 0.8:
+        return SimpleNamespace(content_type=None, filename=f"clip_{rng.randint(0, 9999)}.mp4")
+    return SimpleNamespace(content_type="application/pdf", filename="doc.pdf")
+
+
+def _embed(rng: random.Random):
+    kind = rng.random()
+    if kind < 0.5:
+        return _Embed("image", thumbnail="https://x/y.png")
+    if kind < 0.7:
+        return _Embed("article", thumbnail="https://x/preview.jpg")
+    return _Embed("rich")
+
+
+def _content(rng: random.Random) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+    kind = rng.random()
+    if kind < 0.10:
+        text += f" https://i.imgur.com/{rng.randint(0, 10**6):x}"
+    elif kind < 0.20:
+        text += f" https://cdn.discordapp.com/attachments/1/2/photo_{rng.randint(0, 999)}.jpg?ex=abc"
+    elif kind < 0.30:
+        text += " https://example.com/article/some-post"
+    return text
+
+
+def build_corpus(n: int, seed: int):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        kind = rng.random()
+        attachments = [_attachment(rng)] if kind < 0.25 else []
+        embeds = [_embed(rng)] if 0.25 <= kind < 0.35 else []
+        corpus.append(SimpleNamespace(content=_content(rng), attachments=attachments, embeds=embeds))
+    return corpus
+
+
+def bench(name, fn, corpus, repeat: int = 7):
+    best = float("inf")
+    hits = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = sum(1 for m in corpus if fn(m))
+        best = min(best, time.perf_counter() - start)
+    per_msg = best / len(corpus) * 1e9
+    print(f"{name:<12} {best * 1000:8.1f} ms  {per_msg:7.0f} ns/msg  media={hits}")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, args.seed)
+    classifier = MediaClassifier()
+
+    print(f"corpus: {len(corpus)} synthetic messages")
+    no_text = [SimpleNamespace(content="", attachments=m.attachments, embeds=m.embeds) for m in corpus]
+    groups = [
+        ("no attachments/embeds", [m for m in no_text if not m.attachments and not m.embeds]),
+        ("attachments", [m for m in no_text if m.attachments]),
+        ("embeds", [m for m in no_text if m.embeds]),
+    ]
+    for title, messages in groups:
+        print(f"-- {title}: {len(messages)} messages (same coverage as the legacy function)")
+        legacy = bench("legacy", legacy_is_media_in_message, messages)
+        new = bench("classifier", classifier.is_media, messages)
+        print(f"legacy/classifier time: {legacy / new:.2f}x")
+
+    print("-- full messages, including bare links in the text")
+    legacy_hits = sum(1 for m in corpus if legacy_is_media_in_message(m))
+    bench("legacy", legacy_is_media_in_message, corpus)
+    bench("classifier", classifier.is_media, corpus)
+    new_hits = sum(1 for m in corpus if classifier.is_media(m))
+    print(f"media only found through bare links: {new_hits - legacy_hits}")
+    print(f"host rule cache: {classifier.host_rule.cache_info()}")
+
+if __name__ == "__main__":
+    main()
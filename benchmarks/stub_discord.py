@@ -0,0 +1,257 @@
+# benchmarks/stub_discord.py
+"""
+Local stand-in for Discord's REST API, for offline load tests.
+An aiohttp server on 127.0.0.1 that answers the routes the bot uses with
+plausible payloads, adds a configurable latency to every response and
+enforces per-route rate-limit buckets the way Discord does: X-RateLimit-*
+headers on every response and a 429 with `retry_after` once a bucket is
+exhausted. discord.py's real HTTPClient talks to it once `Route.BASE` is
+pointed at `StubDiscordAPI.base_url`, so bucket handling, retries and the
+REST metrics are all exercised. GET /attachments/... stands in for the CDN
+and returns deterministic bytes per filename (so identical uploads dedupe).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web
+
+# Discord keys buckets by route + major parameter; reactions are famously 1 per 0.25s
+_MAJOR_RE = re.compile(r"/(channels|guilds|webhooks|interactions)/(\d+)")
+_SNOWFLAKE_RE = re.compile(r"/\d{6,21}(?=/|$)")
+_TOKEN_RE = re.compile(r"/(webhooks|interactions)/\{id\}/[^/]+")
+_REACTION_RE = re.compile(r"/reactions/[^/]+")
+
+STUB_EPOCH = "2024-01-01T00:00:00+00:00"
+
+
+def _json(payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    # discord.py only decodes bodies whose content-type is exactly "application/json"
+    response = web.Response(body=json.dumps(payload).encode(), status=status, headers=headers)
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+def route_template(method: str, path: str) -> str:
+    """POST /api/v10/channels/123/messages -> POST /channels/{id}/messages"""
+    if path.startswith("/api/v"):
+        path = path[path.find("/", 5):]
+    path = _REACTION_RE.sub("/reactions/{emoji}", path)
+    path = _SNOWFLAKE_RE.sub("/{id}", path)
+    path = _TOKEN_RE.sub(r"/\1/{id}/{token}", path)
+    return f"{method} {path}"
+
+
+class _Bucket:
+    __slots__ = ("limit", "window", "remaining", "reset_at")
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = 0.0
+
+
+class StubDiscordAPI:
+    def __init__(
+        self,
+        *,
+        latency: float = 0.05,
+        jitter: float = 0.02,
+        bucket_limit: int = 5,
+        bucket_window: float = 5.0,
+        reaction_limit: int = 1,
+        reaction_window: float = 0.25,
+        attachment_bytes: int = 256 * 1024,
+        bot_user_id: int = 900_000_000_000_000_001,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.reaction_limit = reaction_limit
+        self.reaction_window = reaction_window
+        self.attachment_bytes = attachment_bytes
+        self.bot_user = {
+            "id": str(bot_user_id),
+            "username": "bovary-stub",
+            "global_name": "Bovary Stub",
+            "discriminator": "0",
+            "avatar": None,
+            "bot": True,
+        }
+        self.requests: Counter = Counter()  # route template -> requests answered (429s included)
+        self.rate_limited: Counter = Counter()  # route template -> 429s returned
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._ids = itertools.count(950_000_000_000_000_000)
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+        self.app = web.Application()
+        self.app.router.add_route("*", "/{tail:.*}", self.handle)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api/v10"
+
+    @property
+    def cdn_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def reset_counters(self) -> None:
+        self.requests.clear()
+        self.rate_limited.clear()
+
+    # -------- rate limits --------
+    def _bucket(self, template: str, path: str) -> _Bucket:
+        match = _MAJOR_RE.search(path)
+        key = (template, match.group(0) if match else "")
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if "/reactions/" in template:
+                bucket = _Bucket(self.reaction_limit, self.reaction_window)
+            else:
+                bucket = _Bucket(self.bucket_limit, self.bucket_window)
+            self._buckets[key] = bucket
+        return bucket
+
+    @staticmethod
+    def _bucket_hash(template: str) -> str:
+        return hashlib.sha1(template.encode()).hexdigest()[:16]
+
+    # -------- handler --------
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.path
+        template = route_template(request.method, path)
+        self.requests[template] += 1
+
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if path.startswith("/attachments/"):
+            seed = hashlib.sha256(path.rsplit("/", 1)[-1].encode()).digest()
+            body = (seed * (self.attachment_bytes // len(seed) + 1))[:self.attachment_bytes]
+            return web.Response(body=body, content_type="application/octet-stream")
+
+        # interaction callbacks and webhook tokens are not rate limited like bot routes
+        limited = not template.startswith(("POST /interactions/", "GET /users/@me", "GET /oauth2/"))
+        headers: Dict[str, str] = {}
+        if limited:
+            bucket = self._bucket(template, path)
+            now = time.monotonic()
+            if now >= bucket.reset_at:
+                bucket.remaining = bucket.limit
+                bucket.reset_at = now + bucket.window
+            reset_after = max(bucket.reset_at - now, 0.001)
+            if bucket.remaining <= 0:
+                self.rate_limited[template] += 1
+                return _json(
+                    {"message": "You are being rate limited.", "retry_after": round(reset_after, 3), "global": False},
+                    status=429,
+                    headers={"Retry-After": f"{reset_after:.3f}", "X-RateLimit-Scope": "user"},
+                )
+            bucket.remaining -= 1
+            headers = {
+                "X-RateLimit-Limit": str(bucket.limit),
+                "X-RateLimit-Remaining": str(bucket.remaining),
+                "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+                "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+                "X-RateLimit-Bucket": self._bucket_hash(template),
+            }
+
+        body = await self._body(request)
+        status, payload = self._respond(request.method, template, path, body)
+        if payload is None:
+            return web.Response(status=status, headers=headers)
+        return _json(payload, status, headers)
+
+    @staticmethod
+    async def _body(request: web.Request) -> Dict[str, Any]:
+        if not request.can_read_body:
+            return {}
+        if request.content_type == "application/json":
+            try:
+                return await request.json()
+            except ValueError:
+                return {}
+        if request.content_type.startswith("multipart/"):
+            data = await request.post()
+            payload = data.get("payload_json")
+            if isinstance(payload, str):
+                return json.loads(payload)
+        await request.read()
+        return {}
+
+    def _message(self, channel_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": str(next(self._ids)),
+            "channel_id": channel_id,
+            "author": self.bot_user,
+            "content": body.get("content") or "",
+            "timestamp": STUB_EPOCH,
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": body.get("embeds") or [],
+            "components": body.get("components") or [],
+            "pinned": False,
+            "type": 0,
+            "flags": body.get("flags", 0),
+        }
+
+    def _respond(self, method: str, template: str, path: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        ids = re.findall(r"/(\d{6,21})(?=/|$)", path)
+        if template == "GET /users/@me":
+            return 200, self.bot_user
+        if template == "GET /oauth2/applications/@me":
+            return 200, {
+                "id": self.bot_user["id"],
+                "name": "Bovary Stub",
+                "description": "",
+                "icon": None,
+                "bot_public": False,
+                "bot_require_code_grant": False,
+                "owner": self.bot_user,
+                "verify_key": "0" * 64,
+                "flags": 0,
+            }
+        if template == "POST /interactions/{id}/{token}/callback":
+            return 200, {"interaction": {"id": ids[0] if ids else "0", "type": body.get("type", 4)}}
+        if template in ("POST /channels/{id}/messages", "PATCH /channels/{id}/messages/{id}"):
+            return 200, self._message(ids[0], body)
+        if template.startswith(("POST /webhooks/", "PATCH /webhooks/")):
+            return 200, self._message("0", body)
+        if method in ("PUT", "DELETE"):
+            return 204, None
+        return 200, {}
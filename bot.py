@@ -12,23 +12,58 @@ Features:
 
 from __future__ import annotations
 
+# first, so the startup clock includes the imports below
+from startup_trace import startup
+startup.begin("imports")
+
+import asyncio
+import io
+import json
 import os
 import logging
+import re
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Tuple
 
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands
 from discord import app_commands
 
-# Keep-alive import (if you use Replit or similar). If not needed, you can remove.
-try:
-    from keep_alive import keep_alive  # type: ignore
-except Exception:
-    # keep_alive is optional — swallow if not present
-    def keep_alive():
-        return None
+from attachments import AttachmentArchiver, DISCORD_CDN_HOSTS, StoredAttachment
+from audit import AuditArchive, AuditQuery, AuditRecord, parse_time
+from backfill import ReactionBackfill
+from cache_profiles import bot_cache_options
+from cooldowns import CooldownStore
+from diagnostics import MemoryTracker, profile_loop, task_report
+from invites import (
+    ACCEPTED as INVITE_ACCEPTED, DENIED as INVITE_DENIED, GuildInvites, InviteQueue,
+    InviteRequest, MessageRef
+)
+from keep_alive import HealthServer
+from leaderboard import ReactionLeaderboard, week_start
+from log_dispatcher import LogDispatcher
+from log_format import add_chunked_fields, chunk_text, pack_chunks, render_diff
+from media import MediaClassifier
+from member_flow import (
+    ACCOUNT_AGE_BUCKETS, Burst, JOIN as MEMBER_JOIN, LEAVE as MEMBER_LEAVE, MemberFlowMonitor
+)
+from message_cache import CachedMessage, MessageContentCache
+from metrics import (
+    instrument_event, instrument_http_request, instrumented, make_http_trace,
+    metrics, summary_lines, timed_command
+)
+from reaction_scheduler import ReactionScheduler
+from reposts import MediaFile, Post, RepostIndex
+from routing import RoutingConfig
+from sharding import ShardStats, run_shard_reporter
+from spool import LogSpool
+from tree_sync import sync_if_changed
+
+startup.end("imports")
+startup.begin("module_init")
 
 # -------------------------
 # ========== CONFIG ========
@@ -38,6 +73,62 @@ load_dotenv()
 # Token
 TOKEN: Optional[str] = os.getenv("TOKEN")
 
+# Local state (cooldowns, caches) survives restarts in this directory
+DATA_DIR = os.getenv("DATA_DIR", "data")
+STATE_DB_PATH = os.path.join(DATA_DIR, "state.db")
+TREE_SYNC_STATE_PATH = os.path.join(DATA_DIR, "tree_sync.json")
+AUDIT_DB_PATH = os.path.join(DATA_DIR, "audit.db")
+
+# Set STARTUP_TRACE=path.json to write a Chrome trace of the startup phases
+# (open in chrome://tracing or ui.perfetto.dev); sharded workers add -<index>
+STARTUP_TRACE_PATH: Optional[str] = os.getenv("STARTUP_TRACE") or None
+
+# Sharding (set by launcher.py). SHARD_COUNT unset = one process, one shard;
+# SHARD_COUNT=auto = AutoShardedBot with Discord's recommended shard count.
+_shard_count_env = os.getenv("SHARD_COUNT", "").strip().lower()
+SHARDED = bool(_shard_count_env)
+SHARD_COUNT: Optional[int] = int(_shard_count_env) if _shard_count_env.isdigit() else None
+SHARD_IDS: Optional[List[int]] = [
+    int(s) for s in os.getenv("SHARD_IDS", "").split(",") if s.strip()
+] or None
+WORKER_INDEX = int(os.getenv("WORKER_INDEX", "0"))
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "1"))
+SHARD_REPORT_INTERVAL_SECONDS = 60
+SHARD_REPORT_PATH = os.path.join(DATA_DIR, "shards", f"worker-{WORKER_INDEX}.json")
+if STARTUP_TRACE_PATH and SHARDED:
+    _trace_root, _trace_ext = os.path.splitext(STARTUP_TRACE_PATH)
+    STARTUP_TRACE_PATH = f"{_trace_root}-{WORKER_INDEX}{_trace_ext}"
+# Outbound log messages not yet accepted by Discord (one spool per worker process)
+LOG_SPOOL_PATH = os.path.join(DATA_DIR, f"log_spool-{WORKER_INDEX}.jsonl")
+# Newest message seen per media channel, for the auto-reaction backfill after downtime
+REACTION_CHECKPOINT_PATH = os.path.join(DATA_DIR, f"reaction_checkpoints-{WORKER_INDEX}.json")
+# Reaction counts of media posts behind /top
+LEADERBOARD_PATH = os.path.join(DATA_DIR, f"leaderboard-{WORKER_INDEX}.json")
+# Fingerprints of media already posted, for repost detection
+REPOST_INDEX_PATH = os.path.join(DATA_DIR, f"reposts-{WORKER_INDEX}.json")
+# Pending invite requests and dashboard message IDs of the guilds this worker serves
+INVITE_QUEUE_PATH = os.path.join(DATA_DIR, f"invites-{WORKER_INDEX}.json")
+_LEGACY_INVITE_QUEUE_PATH = os.path.join(DATA_DIR, "invites.json")
+# Archived media and its message index; size cap and LRU are per process, so per worker
+ATTACHMENT_ARCHIVE_DIR = os.path.join(DATA_DIR, f"attachments-{WORKER_INDEX}")
+_LEGACY_ATTACHMENT_ARCHIVE_DIR = os.path.join(DATA_DIR, "attachments")
+
+# Health server (/healthz, /readyz, /metrics) on the bot's loop; each shard worker gets its own port.
+# Local only unless HEALTH_HOST says otherwise (e.g. 0.0.0.0 for an external uptime pinger);
+# METRICS_TOKEN then keeps /metrics behind "Authorization: Bearer <token>".
+HEALTH_HOST = os.getenv("HEALTH_HOST", "127.0.0.1")
+HEALTH_PORT = int(os.getenv("PORT", "8080")) + WORKER_INDEX
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+# Only one process should push slash commands; the launcher disables it for the others
+SYNC_COMMANDS = os.getenv("SYNC_COMMANDS", "1") == "1"
+
+# Check cooldowns in the shared database (set by the launcher with several workers)
+COOLDOWN_SHARED = os.getenv("COOLDOWN_SHARED", "") == "1"
+
+# Set FORCE_TREE_SYNC=1 to push slash commands even if the fingerprint matches
+FORCE_TREE_SYNC = os.getenv("FORCE_TREE_SYNC", "") == "1"
+
 # Bot identity & presentation
 BOT_NAME = "Bovary Bot"
 FOOTER_TEXT = "Bovary Club Society"
@@ -45,6 +136,32 @@ FOOTER_TEXT = "Bovary Club Society"
 # Auto-reactions
 AUTO_REACTIONS: List[str] = ["❤️", "🔥", "💯", "💥", "🎀"]
 
+# Fixed spacing between two reactions in the same channel (429s add their Retry-After)
+REACTION_MIN_INTERVAL_SECONDS = 0.25
+
+# Backfill on READY: channels scanned in parallel, messages per channel and how far
+# back to look when a channel has no checkpoint (or a very old one)
+REACTION_BACKFILL_CONCURRENCY = 3
+REACTION_BACKFILL_MAX_MESSAGES = 500
+REACTION_BACKFILL_MAX_AGE_SECONDS = 24 * 3600
+# The backfill waits while a channel has this many reactions queued (live messages first)
+REACTION_BACKFILL_QUEUE_LIMIT = 50
+
+# /top: weeks kept in the leaderboard, entries shown, save interval
+LEADERBOARD_RETENTION_WEEKS = 8
+LEADERBOARD_TOP = 10
+LEADERBOARD_SAVE_SECONDS = 60.0
+TOP_COOLDOWN_SECONDS = 30  # per channel: /top posts a public message
+
+# Repost detection: fingerprints kept, what to do with a repost, and the optional
+# perceptual hash (REPOST_PHASH=1, needs Pillow) computed in a process pool
+REPOST_INDEX_MAX_ENTRIES = 50000
+REPOST_SKIP_REACTIONS = True
+REPOST_NOTIFY_STAFF = True
+REPOST_PERCEPTUAL_HASH = os.getenv("REPOST_PHASH", "") == "1"
+REPOST_HASH_PROCESSES = 1
+REPOST_HASH_MAX_DISTANCE = 3
+
 # Channels where bot auto-reacts to media messages
 CHANNEL_IDS: List[int] = [
     1384173879295213689,
@@ -65,11 +182,55 @@ LOG_CHANNEL_ID: Optional[int] = 1441663299065217114         # join/leave/channel
 MESSAGE_LOG_CHANNEL_ID: Optional[int] = 1432715549116207248 # message delete/edit logs
 IGNORE_CHANNEL_ID: Optional[int] = 1384173137985540233      # ignored for message logs
 
+# Log batching (embeds packed up to 10 per message, text lines joined) and its on-disk spool
+LOG_FLUSH_INTERVAL_SECONDS = 2.0
+LOG_QUEUE_SIZE = 1000
+LOG_SPOOL_FSYNC_SECONDS = 0.5
+
+# Join/leave bursts: more than MEMBER_BURST_THRESHOLD in the window are summarized
+# in one message (edited every MEMBER_BURST_EDIT_SECONDS) instead of one line each
+MEMBER_BURST_WINDOW_SECONDS = 60.0
+MEMBER_BURST_THRESHOLD = 10
+MEMBER_BURST_EDIT_SECONDS = 10.0
+RAID_YOUNG_ACCOUNT_SHARE = 0.5   # join burst flagged as a raid when this share of accounts is < 1 week old
+
+# Content cache backing the raw delete/edit logs (evicts by total size, not count)
+MESSAGE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+# Recent bot-authored message IDs remembered to skip their delete logs
+BOT_MESSAGE_IDS_MAX = 20000
+
+# Searchable archive of every logged edit/delete (/logsearch)
+AUDIT_FLUSH_INTERVAL_SECONDS = 1.0
+AUDIT_RETENTION_DAYS = 90
+LOGSEARCH_PAGE_SIZE = 8
+
+# Optional archive of media-channel attachments, linked from the delete log.
+# Links point at the health server's /attachments/ route under ATTACHMENT_PUBLIC_URL;
+# the route only exists with ATTACHMENT_URL_SECRET set, and every link carries its HMAC.
+ARCHIVE_ATTACHMENTS = os.getenv("ARCHIVE_ATTACHMENTS", "") == "1"
+# ATTACHMENT_ARCHIVE_MAX_MB is the total budget, split between the launcher's workers
+ATTACHMENT_ARCHIVE_MAX_BYTES = int(os.getenv("ATTACHMENT_ARCHIVE_MAX_MB", "2048")) * 1024 * 1024 // WORKER_COUNT
+ATTACHMENT_ARCHIVE_CONCURRENCY = 4
+ATTACHMENT_PUBLIC_URL = os.getenv("ATTACHMENT_PUBLIC_URL", "").rstrip("/")
+ATTACHMENT_URL_SECRET = os.getenv("ATTACHMENT_URL_SECRET") or None
+ATTACHMENT_HOSTS = [
+    h.strip() for h in os.getenv("ATTACHMENT_HOSTS", ",".join(DISCORD_CDN_HOSTS)).split(",") if h.strip()
+]
+
+# Routing file (per-guild channels/roles, hot-reloaded). The constants above and
+# below are the defaults used when the file does not exist.
+ROUTING_CONFIG_PATH = os.getenv("ROUTING_CONFIG", "routing.json")
+ROUTING_RELOAD_SECONDS = 5.0
+
 # Invite system constants
 INVITE_COOLDOWN_SECONDS = 5 * 60   # 5 minutes
 STAFF_LOG_CHANNEL = 1444186478157500508
 CREW_LEADER_ROLE_ID = 1384173136177791048
 REQUIRED_INVITE_CHANNEL = 1444094610157600859
+INVITE_DASHBOARD_DEBOUNCE_SECONDS = 5.0     # min spacing between two dashboard edits
+INVITE_PING_WINDOW_SECONDS = 5 * 60         # one role ping per window for all new requests
+INVITE_DASHBOARD_LISTED = 20                # requests listed in the dashboard embed
+INVITE_DASHBOARD_BUTTON_ROWS = 5            # oldest requests with accept/deny buttons (max 5 rows)
 
 # Server timezone assumption for `/timestamp` parsing (Brazil - São Paulo = UTC-3)
 SERVER_TZ = timezone(timedelta(hours=-3))
@@ -80,6 +241,22 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 
+# Member/message caching: "minimal", "standard" or "full" (see cache_profiles.py).
+# Members are only needed for join/leave logs, which come with the event payload.
+CACHE_PROFILE = os.getenv("CACHE_PROFILE", "minimal")
+
+# Longest /debug profile run
+PROFILE_MAX_SECONDS = 60
+
+# /apagar bulk mode: IDs above the cap are ignored, history scans stop at the scan limit
+APAGAR_MAX_MESSAGES = 1000
+APAGAR_SCAN_LIMIT = 5000
+APAGAR_PROGRESS_SECONDS = 2.0
+APAGAR_SUPPRESS_SECONDS = 60.0
+APAGAR_CONFIRM_SECONDS = 5.0
+# The bulk-delete endpoint refuses messages older than 14 days (margin for clock skew)
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+
 # Command prefix for legacy on_message processing (slash commands are preferred)
 COMMAND_PREFIX = "|"
 
@@ -100,6 +277,8 @@ class MESSAGES:
     # Invite system
     INVITE_REQUEST_SENT = "📨 Invite request sent to staff."
     INVITE_COOLDOWN = "Please wait before requesting another invite."
+    INVITE_ALREADY_PENDING = "📨 Your invite request is already waiting for staff."
+    INVITE_ALREADY_HANDLED = "This request was already handled."
 
     # Access
     ACCESS_RESTRICTED = "🚫 Access restricted."
@@ -116,11 +295,273 @@ logger = logging.getLogger("bovary_bot")
 # -------------------------
 # ====== BOT INSTANCE ======
 # -------------------------
-bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents)
+_BotBase = commands.AutoShardedBot if SHARDED else commands.Bot
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    async def _call(self, interaction: discord.Interaction) -> None:
+        # every slash command passes through here; time it as a whole
+        name = (interaction.data or {}).get("name", "unknown")
+        await timed_command(name, super()._call, interaction)
+
+class BovaryBot(_BotBase):
+    def dispatch(self, event_name: str, /, *args, **kwargs) -> None:
+        shard_stats.record(event_name, args)
+        super().dispatch(event_name, *args, **kwargs)
+
+    async def _run_event(self, coro, event_name: str, *args, **kwargs) -> None:
+        # latency histogram + error counter for every event handler
+        await super()._run_event(instrument_event(coro, event_name), event_name, *args, **kwargs)
+
+    async def login(self, token: str) -> None:
+        # token check + setup_hook; from here the gateway phase runs until READY
+        with startup.phase("login"):
+            await super().login(token)
+        startup.begin("gateway_connect")
+
+    async def setup_hook(self) -> None:
+        # One-time setup: runs once per process, not on every gateway reconnect
+        startup.begin("setup_hook")
+        self.http.request = instrument_http_request(self.http.request)
+        with startup.phase("health_server"):
+            try:
+                await health_server.start()
+            except OSError as e:
+                logger.warning("Health server not started on port %d: %s", HEALTH_PORT, e)
+        with startup.phase("open_state_db"):
+            await cooldown_store.open()
+        with startup.phase("open_audit_db"):
+            await audit_archive.open()
+        if attachment_archiver:
+            with startup.phase("scan_attachment_archive"):
+                await attachment_archiver.start()
+        with startup.phase("log_spool_replay"):
+            await log_dispatcher.start()
+        routing.start(ROUTING_RELOAD_SECONDS)
+        invite_queue.start()
+        member_flow.start()
+        reaction_backfill.start()
+        leaderboard.start()
+        repost_index.start()
+        rotate_status.start()
+        self.loop.create_task(
+            run_shard_reporter(
+                self, shard_stats, SHARD_REPORT_INTERVAL_SECONDS,
+                SHARD_REPORT_PATH if SHARDED else None
+            ),
+            name="shard-reporter"
+        )
+
+        with startup.phase("persistent_views"):
+            try:
+                self.add_view(InviteView())
+                self.add_dynamic_items(InviteDecisionButton)
+                self.add_view(HelpView())
+            except Exception:
+                logger.warning("Could not add persistent views on startup")
+
+        if SYNC_COMMANDS:
+            with startup.phase("tree_sync"):
+                try:
+                    await sync_if_changed(
+                        self.tree, self.application_id, TREE_SYNC_STATE_PATH, force=FORCE_TREE_SYNC
+                    )
+                except Exception as e:
+                    logger.exception("❌ Error syncing commands: %s", e)
+        startup.end("setup_hook")
+
+    async def close(self) -> None:
+        # flush pending log embeds before the connection goes away
+        await log_dispatcher.close()
+        await invite_queue.close()
+        await member_flow.close()
+        await audit_archive.close()
+        if attachment_archiver:
+            await attachment_archiver.close()
+        await reaction_backfill.close()
+        await leaderboard.close()
+        await repost_index.close()
+        await reaction_scheduler.close()
+        await cooldown_store.close()
+        await routing.close()
+        await health_server.close()
+        await super().close()
+
+_shard_options = {"shard_count": SHARD_COUNT, "shard_ids": SHARD_IDS} if SHARDED else {}
+
+bot = BovaryBot(
+    command_prefix=COMMAND_PREFIX,
+    intents=intents,
+    tree_cls=InstrumentedCommandTree,
+    http_trace=make_http_trace(),
+    **bot_cache_options(CACHE_PROFILE, intents),
+    **_shard_options
+)
+
+# Event throughput per shard handled by this process
+shard_stats = ShardStats(SHARD_COUNT or 1)
+
+health_server = HealthServer(
+    bot,
+    host=HEALTH_HOST,
+    port=HEALTH_PORT,
+    last_event=lambda: shard_stats.last_event_at,
+    metrics_text=metrics.render,
+    metrics_token=METRICS_TOKEN,
+    attachment_path=(
+        (lambda name, sig: attachment_archiver.path_for(name, sig))
+        if ARCHIVE_ATTACHMENTS and ATTACHMENT_URL_SECRET else None
+    )
+)
 bot.remove_command("help")  # we'll use a slash help
 
-# Keep cooldown map for invite requests
-last_invite_request: Dict[int, datetime] = {}
+# Batched sender for all log channels (never awaited from gateway handlers).
+# Entries are spooled to LOG_SPOOL_PATH until Discord accepts them and resent
+# after a restart; partial messageables let the replay run before READY.
+log_dispatcher = LogDispatcher(
+    lambda channel_id: bot.get_channel(channel_id) or bot.get_partial_messageable(channel_id),
+    max_queue=LOG_QUEUE_SIZE,
+    flush_interval=LOG_FLUSH_INTERVAL_SECONDS,
+    spool=LogSpool(LOG_SPOOL_PATH, fsync_interval=LOG_SPOOL_FSYNC_SECONDS),
+)
+
+# Auto-reactions run per channel in the background, off the gateway handler
+reaction_scheduler = ReactionScheduler(
+    AUTO_REACTIONS,
+    min_interval=REACTION_MIN_INTERVAL_SECONDS,
+)
+
+# Precompiled media detection (extensions, MIME types, known image hosts)
+media_classifier = MediaClassifier()
+
+# Media fingerprints (O(1) lookups) for repost detection, optionally with perceptual hashes
+repost_index = RepostIndex(
+    REPOST_INDEX_PATH,
+    on_repost=lambda post, original, distance: on_perceptual_repost(post, original, distance),
+    max_entries=REPOST_INDEX_MAX_ENTRIES,
+    perceptual=REPOST_PERCEPTUAL_HASH,
+    processes=REPOST_HASH_PROCESSES,
+    max_distance=REPOST_HASH_MAX_DISTANCE,
+    allowed_hosts=ATTACHMENT_HOSTS,
+)
+repost_index.load()
+
+# Per-channel checkpoints; on READY, media posted while offline gets its missing reactions
+reaction_backfill = ReactionBackfill(
+    REACTION_CHECKPOINT_PATH,
+    scheduler=reaction_scheduler,
+    is_media=lambda message: is_media_in_message(message) and not check_repost(message),
+    concurrency=REACTION_BACKFILL_CONCURRENCY,
+    max_messages=REACTION_BACKFILL_MAX_MESSAGES,
+    max_age=REACTION_BACKFILL_MAX_AGE_SECONDS,
+    queue_limit=REACTION_BACKFILL_QUEUE_LIMIT,
+)
+reaction_backfill.load()
+
+# Reactions per media post and creator, by week and channel (fed by gateway events)
+leaderboard = ReactionLeaderboard(
+    LEADERBOARD_PATH,
+    retention_weeks=LEADERBOARD_RETENTION_WEEKS,
+    save_interval=LEADERBOARD_SAVE_SECONDS,
+)
+leaderboard.load()
+
+# Channel/guild routing compiled to O(1) lookup tables; `routing.table` is
+# swapped atomically when ROUTING_CONFIG_PATH changes
+routing = RoutingConfig(ROUTING_CONFIG_PATH, defaults={
+    "default": {
+        "media_channels": CHANNEL_IDS,
+        "ignore_channels": [IGNORE_CHANNEL_ID] if IGNORE_CHANNEL_ID else [],
+        "log_channel": LOG_CHANNEL_ID,
+        "message_log_channel": MESSAGE_LOG_CHANNEL_ID,
+        "staff_log_channel": STAFF_LOG_CHANNEL,
+        "invite_channel": REQUIRED_INVITE_CHANNEL,
+        "crew_leader_role": CREW_LEADER_ROLE_ID,
+    }
+})
+routing.load()
+
+# Our own copy of recent message contents, so deletes/edits of messages that
+# discord.py already evicted can still be logged through the raw events
+message_cache = MessageContentCache(MESSAGE_CACHE_MAX_BYTES)
+
+# IDs of recent bot-authored messages (ours and other bots'); their deletes are not logged
+_bot_messages: "OrderedDict[int, None]" = OrderedDict()
+
+def _apply_routing(table) -> None:
+    message_cache.ignored_channels = table.ignored_channels
+
+routing.on_reload(_apply_routing)
+
+# Cooldowns (invite requests, slash commands) persisted in STATE_DB_PATH
+cooldown_store = CooldownStore(STATE_DB_PATH, shared=COOLDOWN_SHARED)
+
+# Edit/delete log archive (SQLite WAL + FTS5), written in batches off the event loop
+audit_archive = AuditArchive(
+    AUDIT_DB_PATH, flush_interval=AUDIT_FLUSH_INTERVAL_SECONDS, max_age=AUDIT_RETENTION_DAYS * 86400.0
+)
+
+if (
+    ARCHIVE_ATTACHMENTS and not SHARDED
+    and os.path.isdir(_LEGACY_ATTACHMENT_ARCHIVE_DIR) and not os.path.exists(ATTACHMENT_ARCHIVE_DIR)
+):
+    os.replace(_LEGACY_ATTACHMENT_ARCHIVE_DIR, ATTACHMENT_ARCHIVE_DIR)  # shared directory from before
+
+# Downloads media attachments while their CDN URLs are valid (content-addressed, size-capped)
+attachment_archiver: Optional[AttachmentArchiver] = AttachmentArchiver(
+    ATTACHMENT_ARCHIVE_DIR,
+    max_bytes=ATTACHMENT_ARCHIVE_MAX_BYTES,
+    concurrency=ATTACHMENT_ARCHIVE_CONCURRENCY,
+    allowed_hosts=ATTACHMENT_HOSTS,
+    url_secret=ATTACHMENT_URL_SECRET,
+) if ARCHIVE_ATTACHMENTS else None
+if attachment_archiver and ATTACHMENT_PUBLIC_URL and not ATTACHMENT_URL_SECRET:
+    logger.warning("ATTACHMENT_PUBLIC_URL is set without ATTACHMENT_URL_SECRET: archived media is not served")
+
+# Pending invite requests behind the staff dashboard (debounced edits, collapsed pings)
+invite_queue = InviteQueue(
+    INVITE_QUEUE_PATH,
+    publish=lambda guild_id, state: publish_invite_dashboard(guild_id, state),
+    ping=lambda guild_id, state, count: ping_invite_staff(guild_id, state, count),
+    debounce=INVITE_DASHBOARD_DEBOUNCE_SECONDS,
+    ping_window=INVITE_PING_WINDOW_SECONDS,
+)
+if not SHARDED and os.path.exists(_LEGACY_INVITE_QUEUE_PATH) and not os.path.exists(INVITE_QUEUE_PATH):
+    os.replace(_LEGACY_INVITE_QUEUE_PATH, INVITE_QUEUE_PATH)  # single-process file from before the rename
+invite_queue.load()
+
+# Sliding-window join/leave counters; bursts become one edited summary message
+member_flow = MemberFlowMonitor(
+    lambda guild_id, burst, rate: publish_member_burst(guild_id, burst, rate),
+    window=MEMBER_BURST_WINDOW_SECONDS,
+    threshold=MEMBER_BURST_THRESHOLD,
+    edit_interval=MEMBER_BURST_EDIT_SECONDS,
+)
+
+# Component stats exported as gauges on /metrics
+metrics.add_collector("bovary_log_dispatcher", lambda: log_dispatcher.stats)
+metrics.add_collector("bovary_log_spool", lambda: log_dispatcher.spool.stats)
+metrics.add_collector("bovary_invites", lambda: invite_queue.stats)
+metrics.add_collector("bovary_member_flow", lambda: member_flow.stats)
+metrics.add_collector("bovary_startup_seconds", startup.summary)
+metrics.add_collector("bovary_reactions", lambda: reaction_scheduler.stats)
+metrics.add_collector("bovary_reaction_backfill", lambda: reaction_backfill.stats)
+metrics.add_collector("bovary_leaderboard", lambda: leaderboard.stats)
+metrics.add_collector("bovary_reposts", lambda: repost_index.stats)
+metrics.add_collector("bovary_message_cache", lambda: {
+    "entries": len(message_cache),
+    "bytes": message_cache.total_bytes,
+    "evictions": message_cache.evictions,
+    "hits": message_cache.hits,
+    "misses": message_cache.misses,
+})
+metrics.add_collector("bovary_cooldowns", lambda: {"active": len(cooldown_store)})
+metrics.add_collector("bovary_audit", lambda: audit_archive.stats)
+if attachment_archiver:
+    metrics.add_collector("bovary_attachments", lambda: attachment_archiver.stats)
+metrics.add_collector("bovary_gateway", lambda: {
+    "latency_seconds": bot.latency,
+    "events": shard_stats.gateway_events,
+})
 
 # -------------------------
 # ====== STATUS ROTATION ===
@@ -173,22 +614,57 @@ def safe_get_channel(
     return bot_instance.get_channel(channel_id)
 
 def is_media_in_message(message: discord.Message) -> bool:
-    """Detect if a message contains image or video media."""
-    for a in message.attachments:
-        if a.content_type and a.content_type.startswith(("image/", "video/")):
-            return True
-        if a.filename.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp4", ".mov", ".webm", ".mkv", ".gifv")):
-            return True
+    """Detect if a message contains image or video media (attachments, embeds or bare links)."""
+    return media_classifier.is_media(message)
+
+def _media_files(message: discord.Message) -> Tuple[List[MediaFile], List[str]]:
+    """Attachment metadata and linked media URLs of a message, for the repost index."""
+    files = [
+        MediaFile(a.filename, a.size, a.width, a.height, a.proxy_url if a.width else None)
+        for a in message.attachments
+        if a.width or media_classifier.is_media_filename(a.filename)
+    ]
+    urls = [e.url for e in message.embeds if e.url and e.type in ("image", "video", "gifv")]
+    return files, urls
+
+def check_repost(message: discord.Message) -> bool:
+    """Look a media message up in the repost index. True if its auto-reactions should be skipped."""
+    if repost_index.flagged(message.id):
+        return REPOST_SKIP_REACTIONS
+    post = Post(message.id, message.channel.id, message.guild.id if message.guild else 0, message.author.id)
+    files, urls = _media_files(message)
+    original = repost_index.check(post, files, urls)
+    if original is None:
+        repost_index.submit_hash(post, files)
+        return False
+    report_repost(post, original, "Same file")
+    return REPOST_SKIP_REACTIONS
+
+async def on_perceptual_repost(post: Post, original: Post, distance: int) -> None:
+    # the hash arrives after on_message: drop the reactions that have not been added yet
+    if REPOST_SKIP_REACTIONS:
+        reaction_scheduler.discard(post.channel_id, post.message_id)
+    report_repost(post, original, f"Similar image (distance {distance}/64)")
+
+def report_repost(post: Post, original: Post, match: str) -> None:
+    if not REPOST_NOTIFY_STAFF:
+        return
 
-    for e in message.embeds:
-        if getattr(e, "type", None) in ("image", "video", "gifv"):
-            return True
-        if getattr(e, "image", None) and getattr(e.image, "url", None):
-            return True
-        if getattr(e, "thumbnail", None) and getattr(e.thumbnail, "url", None):
-            return True
+    def link(p: Post) -> str:
+        return f"[message](https://discord.com/channels/{p.guild_id}/{p.channel_id}/{p.message_id}) by <@{p.author_id}>"
+
+    posted_at = int(discord.utils.snowflake_time(original.message_id).timestamp())
+    embed = make_embed(title="♻️ Possible repost", color=discord.Color.orange())
+    embed.add_field(name="Repost", value=f"{link(post)} in <#{post.channel_id}>", inline=False)
+    embed.add_field(
+        name="Original",
+        value=f"{link(original)} in <#{original.channel_id}>, <t:{posted_at}:R>",
+        inline=False
+    )
+    embed.add_field(name="Match", value=match, inline=True)
+    embed.add_field(name="Reactions", value="Skipped" if REPOST_SKIP_REACTIONS else "Added", inline=True)
+    log_dispatcher.submit(routing.table.staff_log_channel(post.guild_id), embed)
 
-    return False
 import itertools
 from discord.ext import tasks
 
@@ -198,6 +674,10 @@ status_cycle = itertools.cycle(STATUS_ROTATION)
 async def rotate_status():
     await bot.change_presence(activity=next(status_cycle))
 
+@rotate_status.before_loop
+async def before_rotate_status():
+    await bot.wait_until_ready()
+
 # -------------------------
 # ====== SLASH COMMANDS ====
 # -------------------------
@@ -260,59 +740,517 @@ async def info(interaction: discord.Interaction):
     embed.set_footer(text=FOOTER_TEXT)
     await interaction.response.send_message(embed=embed)
 
-# delete message by ID (anonymous)
-@bot.tree.command(name="apagar", description="Delete a message by ID (anonymous)")
-@app_commands.describe(canal="Channel where the message is located", mensagem_id="ID of the message to delete")
-async def apagar(interaction: discord.Interaction, canal: discord.TextChannel, mensagem_id: str):
-    if not interaction.user.guild_permissions.manage_messages:
+@bot.tree.command(name="metrics", description="Export runtime metrics (admin)")
+@app_commands.default_permissions(administrator=True)
+async def metrics_command(interaction: discord.Interaction):
+    if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message(
             MESSAGES.NO_PERMISSION,
             ephemeral=True
         )
         return
 
-    await interaction.response.defer(ephemeral=True)
-    try:
-        mensagem = await canal.fetch_message(int(mensagem_id))
-        await mensagem.delete()
-        await interaction.followup.send(
-            MESSAGES.MESSAGE_REMOVED,
-            ephemeral=True
-        )
+    summary = "\n".join(summary_lines()) or "No handler samples yet."
+    embed = make_embed(
+        title="📊 Metrics",
+        description=f"```\n{summary}\n```",
+        color=discord.Color.dark_teal()
+    )
+    export = discord.File(io.BytesIO(metrics.render().encode("utf-8")), filename="metrics.prom")
+    await interaction.response.send_message(embed=embed, file=export, ephemeral=True)
+
+# on-demand diagnostics (admin): CPU profile of the event loop, memory snapshots, task counts
+debug_group = app_commands.Group(
+    name="debug",
+    description="Runtime diagnostics (admin)",
+    default_permissions=discord.Permissions(administrator=True)
+)
+memory_tracker = MemoryTracker()
+_profile_lock = asyncio.Lock()
 
-        msg_log = safe_get_channel(bot, MESSAGE_LOG_CHANNEL_ID)
-        if msg_log:
-            embed = make_embed(
-                title="🧹 Message deleted via command",
-                description=(
-                    f"Channel: {canal.mention}\n"
-                    f"Message ID: `{mensagem_id}`"
-                ),
-                color=discord.Color.blurple()
-            )
-            embed.set_footer(text="Action executed anonymously")
-            await msg_log.send(embed=embed)
+def _text_file(text: str, filename: str) -> discord.File:
+    return discord.File(io.BytesIO(text.encode("utf-8")), filename=filename)
 
-    except discord.NotFound:
-        await interaction.followup.send(
-            "⚠️ Message not found.",
+async def _require_admin(interaction: discord.Interaction) -> bool:
+    if interaction.user.guild_permissions.administrator:
+        return True
+    await interaction.response.send_message(MESSAGES.NO_PERMISSION, ephemeral=True)
+    return False
+
+@debug_group.command(name="profile", description="Sample the event loop for N seconds")
+@app_commands.describe(seconds=f"Duration (1-{PROFILE_MAX_SECONDS} seconds)")
+async def debug_profile(interaction: discord.Interaction, seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS] = 10):
+    if not await _require_admin(interaction):
+        return
+    if _profile_lock.locked():
+        await interaction.response.send_message("⏳ A profile is already running.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    async with _profile_lock:
+        result = await profile_loop(seconds)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    busy = result.samples - result.idle
+    embed = make_embed(
+        title="🔥 Event loop profile",
+        description=(
+            f"{result.seconds:.1f}s, {result.samples} samples, "
+            f"loop busy **{busy / result.samples:.0%}**" if result.samples else "No samples."
+        ),
+        color=discord.Color.dark_teal()
+    )
+    hottest = "\n".join(f"{n:>5}  {label}" for label, n in result.self_counts.most_common(8))
+    if hottest:
+        embed.add_field(name="Hottest (self samples)", value=f"```\n{_truncate(hottest, 1000)}\n```", inline=False)
+    await interaction.followup.send(
+        embed=embed,
+        files=[
+            _text_file(result.report(), f"profile-{stamp}.txt"),
+            _text_file(result.collapsed(), f"profile-{stamp}.collapsed"),
+        ],
+        ephemeral=True
+    )
+
+@debug_group.command(name="memory", description="tracemalloc snapshot and diff against the previous one")
+@app_commands.describe(action="snapshot (starts tracing if needed), or stop tracing")
+@app_commands.choices(action=[
+    app_commands.Choice(name="snapshot", value="snapshot"),
+    app_commands.Choice(name="stop", value="stop"),
+])
+async def debug_memory(interaction: discord.Interaction, action: str = "snapshot"):
+    if not await _require_admin(interaction):
+        return
+    if action == "stop":
+        memory_tracker.stop()
+        await interaction.response.send_message("🧹 tracemalloc stopped.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    started = not memory_tracker.tracing
+    # take_snapshot walks every traced block; keep it off the event loop
+    top, diff = await asyncio.to_thread(memory_tracker.snapshot)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    files = [_text_file(top, f"memory-{stamp}.txt")]
+    if diff:
+        files.append(_text_file(diff, f"memory-diff-{stamp}.txt"))
+    note = (
+        "tracemalloc started now: only allocations from here on are traced. Run it again later for a diff."
+        if started else ("Diff against the previous snapshot attached." if diff else "")
+    )
+    await interaction.followup.send(
+        f"🧠 {top.splitlines()[0]}\n{note}".strip(),
+        files=files,
+        ephemeral=True
+    )
+
+@debug_group.command(name="tasks", description="Live asyncio tasks grouped by coroutine")
+async def debug_tasks(interaction: discord.Interaction):
+    if not await _require_admin(interaction):
+        return
+    report, by_coro = task_report()
+    top = "\n".join(f"{n:>5}  {name}" for name, n in sorted(by_coro.items(), key=lambda kv: -kv[1])[:10])
+    embed = make_embed(
+        title=f"🧵 {sum(by_coro.values())} asyncio tasks",
+        description=f"```\n{_truncate(top, 4000)}\n```",
+        color=discord.Color.dark_teal()
+    )
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    await interaction.response.send_message(
+        embed=embed, file=_text_file(report, f"tasks-{stamp}.txt"), ephemeral=True
+    )
+
+bot.tree.add_command(debug_group)
+
+# delete messages by ID, ID range or "last N from user" (anonymous)
+_ID_RE = re.compile(r"\d{15,21}")
+_ID_RANGE_RE = re.compile(r"^\s*(\d{15,21})\s*(?:-|\.\.)\s*(\d{15,21})\s*$")
+
+# IDs being deleted by /apagar -> whether the gateway echoed their deletion. The raw delete
+# events skip them (one consolidated log instead) and only mark them as confirmed.
+_command_deletes: Dict[int, bool] = {}
+_command_delete_echo = asyncio.Event()
+
+def _confirm_command_deletes(message_ids: Iterable[int]) -> bool:
+    """Mark /apagar deletions echoed by the gateway. Returns True if all of them were ours."""
+    ours = True
+    for message_id in message_ids:
+        if message_id in _command_deletes:
+            _command_deletes[message_id] = True
+            _command_delete_echo.set()
+        else:
+            ours = False
+    return ours
+
+def _forget_command_deletes(message_ids: Iterable[int]) -> None:
+    for message_id in message_ids:
+        _command_deletes.pop(message_id, None)
+
+async def _wait_delete_echoes(message_ids: List[int]) -> List[int]:
+    """IDs of `message_ids` the gateway confirmed as deleted within APAGAR_CONFIRM_SECONDS."""
+    # the bulk endpoint skips unknown IDs silently; its gateway event lists only what it deleted
+    deadline = time.monotonic() + APAGAR_CONFIRM_SECONDS
+    while True:
+        _command_delete_echo.clear()
+        confirmed = [i for i in message_ids if _command_deletes.get(i)]
+        remaining = deadline - time.monotonic()
+        if len(confirmed) == len(message_ids) or remaining <= 0:
+            return confirmed
+        try:
+            await asyncio.wait_for(_command_delete_echo.wait(), remaining)
+        except asyncio.TimeoutError:
+            pass
+
+def _bulk_deletable(message_id: int, now: datetime) -> bool:
+    return now - discord.utils.snowflake_time(message_id) < BULK_DELETE_MAX_AGE
+
+async def _collect_targets(
+    canal: discord.TextChannel,
+    mensagem_id: Optional[str],
+    usuario: Optional[discord.User],
+    quantidade: int,
+    progress
+) -> Tuple[List[int], List[discord.Message], str]:
+    """(message IDs, messages fetched while scanning, description of the selection)."""
+    id_range = _ID_RANGE_RE.match(mensagem_id or "")
+    if mensagem_id and not id_range:
+        # explicit IDs: deleted as partial messages, nothing is fetched
+        ids = sorted({int(i) for i in _ID_RE.findall(mensagem_id)})[:APAGAR_MAX_MESSAGES]
+        return ids, [], f"{len(ids)} message ID(s)"
+
+    found: List[discord.Message] = []
+    scanned = 0
+    if id_range:
+        first, last = sorted(int(i) for i in id_range.groups())
+        history = canal.history(
+            limit=APAGAR_SCAN_LIMIT, after=discord.Object(first - 1), before=discord.Object(last + 1),
+            oldest_first=True
+        )
+        selection = f"range `{first}` – `{last}`"
+        limit = APAGAR_MAX_MESSAGES
+    else:
+        history = canal.history(limit=APAGAR_SCAN_LIMIT)
+        selection = f"last {quantidade} from {usuario.mention}"
+        limit = quantidade
+    if usuario and id_range:
+        selection += f" by {usuario.mention}"
+
+    async for message in history:
+        scanned += 1
+        if usuario is None or message.author.id == usuario.id:
+            found.append(message)
+            if len(found) >= limit:
+                break
+        if scanned % 500 == 0:
+            await progress(f"🔎 Scanned {scanned} messages, {len(found)} selected…")
+    return [m.id for m in found], found, selection
+
+@bot.tree.command(name="apagar", description="Delete messages by ID, ID range or last N from a user (anonymous)")
+@app_commands.describe(
+    canal="Channel where the messages are located",
+    mensagem_id="One or more message IDs (space/comma separated), or a range: first_id-last_id",
+    usuario="Only messages from this user (with a range), or the user whose last messages are deleted",
+    quantidade=f"How many of the user's last messages to delete (1-{APAGAR_MAX_MESSAGES})"
+)
+async def apagar(
+    interaction: discord.Interaction,
+    canal: discord.TextChannel,
+    mensagem_id: Optional[str] = None,
+    usuario: Optional[discord.User] = None,
+    quantidade: app_commands.Range[int, 1, APAGAR_MAX_MESSAGES] = 10
+):
+    if not interaction.user.guild_permissions.manage_messages:
+        await interaction.response.send_message(
+            MESSAGES.NO_PERMISSION,
+            ephemeral=True
+        )
+        return
+    if not mensagem_id and usuario is None:
+        await interaction.response.send_message(
+            "⚠️ Give message IDs, an ID range (`first-last`) or a user.",
             ephemeral=True
         )
+        return
+    if mensagem_id and usuario is not None and not _ID_RANGE_RE.match(mensagem_id):
+        await interaction.response.send_message(
+            "⚠️ `usuario` filters an ID range or selects a user's last messages; it cannot be combined with a list of IDs.",
+            ephemeral=True
+        )
+        return
+
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    last_progress = 0.0
+
+    async def progress(text: str) -> None:
+        # large jobs: edit the ephemeral reply at most every APAGAR_PROGRESS_SECONDS
+        nonlocal last_progress
+        now = time.monotonic()
+        if now - last_progress >= APAGAR_PROGRESS_SECONDS:
+            last_progress = now
+            try:
+                await interaction.edit_original_response(content=text)
+            except discord.HTTPException:
+                pass
+
+    try:
+        ids, fetched, selection = await _collect_targets(canal, mensagem_id, usuario, quantidade, progress)
+    except discord.Forbidden:
+        await interaction.followup.send("🚫 I cannot read the history of this channel.", ephemeral=True)
+        return
+    if not ids:
+        await interaction.followup.send("⚠️ No matching messages found.", ephemeral=True)
+        return
+
+    # contents for the log come from our cache or the scan; nothing is fetched for explicit IDs
+    cached = {c.id: c for c in message_cache.pop_many(ids)}
+    for message in fetched:
+        if message.id not in cached:
+            entry = _cached_from_discord(message)
+            if entry:
+                cached[message.id] = entry
+
+    now = datetime.now(timezone.utc)
+    recent = [i for i in ids if _bulk_deletable(i, now)]
+    old = [i for i in ids if not _bulk_deletable(i, now)]
+    deleted: List[int] = []
+    unconfirmed: List[int] = []  # explicit IDs sent to the bulk endpoint, never seen by us
+    missing = failed = 0
+    _command_deletes.update(dict.fromkeys(ids, False))
+    try:
+        for start in range(0, len(recent), 100):
+            batch = recent[start:start + 100]
+            try:
+                await canal.delete_messages([discord.Object(i) for i in batch])
+                (deleted if fetched else unconfirmed).extend(batch)
+            except discord.NotFound:
+                missing += len(batch)  # a single ID that no longer exists
+            except discord.HTTPException:
+                failed += len(batch)
+                logger.exception("Bulk delete of %d messages in %s failed", len(batch), canal.id)
+            if len(ids) > 100:
+                await progress(f"🧹 Deleting… {len(deleted) + len(unconfirmed)}/{len(ids)}")
+
+        # older than 14 days: the bulk endpoint refuses them, one DELETE each (still no fetch)
+        for index, message_id in enumerate(old, 1):
+            try:
+                await canal.get_partial_message(message_id).delete()
+                deleted.append(message_id)
+            except discord.NotFound:
+                missing += 1
+            except discord.Forbidden:
+                raise
+            except discord.HTTPException:
+                failed += 1
+            if len(ids) > 100 or len(old) > 10:
+                await progress(f"🧹 Deleting older messages… {len(deleted) + len(unconfirmed)}/{len(ids)}")
+
+        if unconfirmed:
+            confirmed = await _wait_delete_echoes(unconfirmed)
+            missing += len(unconfirmed) - len(confirmed)
+            deleted = sorted(deleted + confirmed)
     except discord.Forbidden:
         await interaction.followup.send(
             "🚫 I do not have permission to delete messages in this channel.",
             ephemeral=True
         )
-    except Exception as e:
-        logger.exception("Error deleting message")
-        await interaction.followup.send(
-            f"❌ An error occurred: `{e}`",
+        return
+    finally:
+        # the gateway echoes arrive right after the REST calls; forget the rest later
+        asyncio.get_running_loop().call_later(APAGAR_SUPPRESS_SECONDS, _forget_command_deletes, ids)
+
+    summary = f"✅ Deleted **{len(deleted)}** message(s) in {canal.mention}"
+    if missing:
+        summary += f", {missing} not found"
+    if failed:
+        summary += f", {failed} failed"
+    await interaction.edit_original_response(content=summary + ".")
+
+    if not deleted or _is_message_log_ignored(canal.id):
+        return
+    entries = sorted((cached[i] for i in deleted if i in cached), key=lambda c: c.id)
+    embed = make_embed(
+        title="🧹 Messages deleted via command",
+        description=_deleted_summary(len(deleted), entries),
+        color=discord.Color.blurple()
+    )
+    embed.add_field(name="Channel", value=canal.mention, inline=True)
+    embed.add_field(name="Selection", value=selection, inline=True)
+    embed.add_field(name="Method", value=f"{len(recent)} bulk, {len(old)} single", inline=True)
+    embed.set_footer(text="Action executed anonymously")
+    log_dispatcher.submit(routing.table.message_log_channel(interaction.guild_id), embed)
+    for message_id in deleted:
+        _archive("bulk_delete", interaction.guild_id, canal.id, message_id, cached.get(message_id))
+
+# search the edit/delete archive
+_AUDIT_KIND_LABELS = {"delete": "🗑️ Deleted", "bulk_delete": "🧨 Bulk deleted", "edit": "✏️ Edited"}
+
+def make_audit_page_embed(records: List[AuditRecord], page: int, elapsed_ms: float) -> discord.Embed:
+    lines = []
+    for r in records:
+        author = f"**{r.author_name}** (`{r.author_id}`)" if r.author_id else "Unknown author"
+        header = f"{_AUDIT_KIND_LABELS.get(r.kind, r.kind)} <t:{int(r.logged_at)}:f> · <#{r.channel_id}> · {author}"
+        if r.kind == "edit":
+            body = f"> {_truncate(r.before or '[not cached]', 150)}\n> → {_truncate(r.content or '[no text]', 150)}"
+        else:
+            body = f"> {_truncate(r.content or '[no text]', 300)}"
+        if r.attachments:
+            body += f"\n> 📎 {len(r.attachments.splitlines())} attachment(s)"
+        lines.append(f"{header}\n{body.replace(chr(10) * 2, chr(10))}")
+    embed = make_embed(
+        title="🔎 Log Search",
+        description="\n\n".join(lines) or "No matching entries.",
+        color=discord.Color.dark_gold()
+    )
+    embed.set_footer(text=f"{FOOTER_TEXT} | Page {page + 1} | {elapsed_ms:.1f} ms")
+    return embed
+
+class LogSearchView(discord.ui.View):
+    """Prev/next buttons over keyset pages (cursor = ID of the last row shown)."""
+
+    def __init__(self, owner_id: int, query: AuditQuery):
+        super().__init__(timeout=300)
+        self.owner_id = owner_id
+        self.query = query
+        self.cursors: List[Optional[int]] = [None]
+        self.page = 0
+        self.has_next = False
+
+    async def fetch(self) -> discord.Embed:
+        start = time.perf_counter()
+        records = await audit_archive.search(
+            self.query, before_id=self.cursors[self.page], limit=LOGSEARCH_PAGE_SIZE + 1
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.has_next = len(records) > LOGSEARCH_PAGE_SIZE
+        records = records[:LOGSEARCH_PAGE_SIZE]
+        if self.has_next:
+            del self.cursors[self.page + 1:]
+            self.cursors.append(records[-1].id)
+        self.prev_button.disabled = self.page == 0
+        self.next_button.disabled = not self.has_next
+        return make_audit_page_embed(records, self.page, elapsed_ms)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.owner_id
+
+    @discord.ui.button(label="◀️", style=discord.ButtonStyle.secondary)
+    @instrumented("logsearch_prev")
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await interaction.response.edit_message(embed=await self.fetch(), view=self)
+
+    @discord.ui.button(label="▶️", style=discord.ButtonStyle.secondary)
+    @instrumented("logsearch_next")
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.has_next:
+            self.page += 1
+        await interaction.response.edit_message(embed=await self.fetch(), view=self)
+
+@bot.tree.command(name="logsearch", description="Search deleted and edited messages")
+@app_commands.describe(
+    text="Words in the content (before or after an edit)",
+    author="Author of the message",
+    channel="Channel of the message",
+    since="Start: YYYY-MM-DD[ HH:MM] (UTC) or relative like 30m, 12h, 7d",
+    until="End: YYYY-MM-DD[ HH:MM] (UTC) or relative like 1d"
+)
+@app_commands.default_permissions(manage_messages=True)
+async def logsearch(
+    interaction: discord.Interaction,
+    text: Optional[str] = None,
+    author: Optional[discord.User] = None,
+    channel: Optional[discord.TextChannel] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    if not interaction.user.guild_permissions.manage_messages:
+        await interaction.response.send_message(
+            MESSAGES.NO_PERMISSION,
+            ephemeral=True
+        )
+        return
+
+    try:
+        query = AuditQuery(
+            guild_id=interaction.guild_id,
+            author_id=author.id if author else None,
+            channel_id=channel.id if channel else None,
+            since=parse_time(since) if since else None,
+            until=parse_time(until) if until else None,
+            text=text
+        )
+    except ValueError:
+        await interaction.response.send_message(
+            "⚠️ Invalid date. Use `YYYY-MM-DD`, `YYYY-MM-DD HH:MM` or `30m` / `12h` / `7d`.",
             ephemeral=True
         )
+        return
+
+    view = LogSearchView(interaction.user.id, query)
+    embed = await view.fetch()
+    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+@bot.tree.command(name="top", description="Most-reacted media posts and creators of the week")
+@app_commands.describe(
+    canal="Media channel (default: all media channels of the server)",
+    semana=f"Weeks ago (0 = this week, up to {LEADERBOARD_RETENTION_WEEKS - 1})"
+)
+@cooldown_store.check("top", TOP_COOLDOWN_SECONDS, key=lambda i: i.channel_id)
+async def top(
+    interaction: discord.Interaction,
+    canal: Optional[discord.TextChannel] = None,
+    semana: app_commands.Range[int, 0, LEADERBOARD_RETENTION_WEEKS - 1] = 0
+):
+    if canal is not None:
+        if not routing.table.is_media_channel(canal.id):
+            await interaction.response.send_message(
+                f"⚠️ {canal.mention} is not a media channel.",
+                ephemeral=True
+            )
+            return
+        channel_ids = [canal.id]
+    else:
+        channel_ids = [
+            cid for cid in routing.table.media_channels
+            if getattr(bot.get_channel(cid), "guild", None) == interaction.guild
+        ]
+
+    week = leaderboard.current_week() - semana
+    posts, creators = leaderboard.top(channel_ids, week, LEADERBOARD_TOP)
+    start = int(week_start(week))
+    embed = make_embed(
+        title="🏆 Top media" + (f" — #{canal.name}" if canal else ""),
+        description=f"Week of <t:{start}:D> – <t:{start + 6 * 86400}:D>",
+        color=discord.Color.gold()
+    )
+    medals = ("🥇", "🥈", "🥉")
+
+    def rank(i: int) -> str:
+        return medals[i] if i < 3 else f"`{i + 1}.`"
+
+    # ~130 characters per post line: pack them into fields of at most 1024
+    post_lines = [
+        f"{rank(i)} [{count} reactions]"
+        f"(https://discord.com/channels/{interaction.guild_id}/{channel_id}/{message_id}) by <@{author_id}>\n"
+        for i, (message_id, channel_id, author_id, count) in enumerate(posts)
+    ]
+    creator_lines = [
+        f"{rank(i)} <@{author_id}> — {count} reactions\n"
+        for i, (author_id, count) in enumerate(creators)
+    ]
+    embeds = [embed]
+    for name, lines in (("Posts", post_lines), ("Creators", creator_lines)):
+        embeds = embeds[:-1] + add_chunked_fields(
+            embeds[-1], name, pack_chunks(lines) or ["No reactions yet."], lambda: make_embed(title="🏆 Top media")
+        )
+    await interaction.response.send_message(embeds=embeds, allowed_mentions=discord.AllowedMentions.none())
 
 @bot.tree.command(name="help", description="Internal control panel")
 async def help_command(interaction: discord.Interaction):
-    embed = make_embed(
+    await interaction.response.send_message(embed=help_page("home"), view=help_layout())
+
+# ===========================
+# ====== HELP PANEL VIEW =====
+# ===========================
+def _build_help_pages() -> Dict[str, dict]:
+    home = make_embed(
         title="📘 Control Panel — " + BOT_NAME,
         description=(
             "Internal interface of the **Bovary Club Society**.\n"
@@ -321,79 +1259,206 @@ async def help_command(interaction: discord.Interaction):
         ),
         color=discord.Color.blue()
     )
+    if bot.user and bot.user.avatar:
+        home.set_thumbnail(url=bot.user.avatar.url)
+    home.set_footer(text="Bovary Club Society • Internal System")
 
-    if interaction.client.user and interaction.client.user.avatar:
-        embed.set_thumbnail(url=interaction.client.user.avatar.url)
+    moderation = make_embed(
+        title="🧹 Moderation",
+        description=(
+            "Restricted tools for environment control.\n"
+            "Silent actions. Precise execution. Logged results."
+        ),
+        color=discord.Color.red()
+    )
+    moderation.add_field(
+        name="🧹 Actions",
+        value="`/apagar <channel> <ids | first-last> [user] [amount]` — Anonymous message removal",
+        inline=False
+    )
+    moderation.set_footer(text="Bovary Club Society • Moderation Layer")
 
-    embed.set_footer(text="Bovary Club Society • Internal System")
+    utilities = make_embed(
+        title="⚙️ Utilities",
+        description=(
+            "Essential internal utilities.\n"
+            "Time, system status, and contextual information."
+        ),
+        color=discord.Color.green()
+    )
+    utilities.add_field(
+        name="🧠 System",
+        value="`/ping` — System response verification\n`/top [channel] [weeks ago]` — Most-reacted media of the week",
+        inline=False
+    )
+    utilities.set_footer(text="Bovary Club Society • Utility Layer")
+
+    pages = {}
+    for name, embed in (("home", home), ("moderation", moderation), ("utilities", utilities)):
+        payload = embed.to_dict()
+        payload.pop("timestamp", None)
+        pages[name] = payload
+    return pages
+
+# Help pages rendered once (on the first /help, when the bot avatar is known)
+_help_pages: Dict[str, dict] = {}
+
+def help_page(name: str) -> discord.Embed:
+    """Prerendered help page; only the timestamp is new."""
+    if not _help_pages:
+        _help_pages.update(_build_help_pages())
+    embed = discord.Embed.from_dict(_help_pages[name])
+    embed.timestamp = datetime.now(timezone.utc)
+    return embed
+
+class HelpView(discord.ui.View):
+    """One persistent instance, registered in setup_hook, answers the buttons of every /help message."""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    # edit_message without view=: the message keeps its buttons and discord.py
+    # does not store a view for it
+    @discord.ui.button(label="Moderation 🧹", style=discord.ButtonStyle.red, custom_id="help:moderation")
+    @instrumented("help_moderation")
+    async def mod_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(embed=help_page("moderation"))
+
+    @discord.ui.button(label="Utilities ⚙️", style=discord.ButtonStyle.green, custom_id="help:utilities")
+    @instrumented("help_utilities")
+    async def util_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(embed=help_page("utilities"))
+
+    @discord.ui.button(label="Back ⬅️", style=discord.ButtonStyle.grey, custom_id="help:home")
+    @instrumented("help_back")
+    async def back_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(embed=help_page("home"))
+
+_help_layout: Optional[HelpView] = None
 
-    view = HelpView()
-    await interaction.response.send_message(embed=embed, view=view)
+def help_layout() -> HelpView:
+    """Stopped HelpView that only renders the buttons into /help messages.
+
+    discord.py stores every unfinished view it sends (one entry per message,
+    plus a timeout task); a finished one is only serialized.
+    """
+    global _help_layout
+    if _help_layout is None:
+        _help_layout = HelpView()
+        _help_layout.stop()
+    return _help_layout
 
 # ===========================
-# ====== HELP PANEL VIEW =====
+# ====== INVITE SYSTEM ======
 # ===========================
-class HelpView(discord.ui.View):
-    def __init__(self, *, timeout: Optional[float] = 180):
-        super().__init__(timeout=timeout)
+def _invite_line(request: InviteRequest) -> str:
+    return f"• <@{request.user_id}> — <t:{int(request.requested_at)}:R>"
 
-    @discord.ui.button(label="Moderation 🧹", style=discord.ButtonStyle.red)
-    async def mod_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = make_embed(
-            title="🧹 Moderation",
-            color=discord.Color.red()
-        )
-        embed.description = (
-            "Restricted tools for environment control.\n"
-            "Silent actions. Precise execution. Logged results."
-        )
+def _invite_history_line(request: InviteRequest) -> str:
+    mark = "✅" if request.status == INVITE_ACCEPTED else "❌"
+    return f"{mark} <@{request.user_id}> by <@{request.handled_by}> <t:{int(request.handled_at or 0)}:R>"
 
+def render_invite_dashboard(state: GuildInvites) -> Tuple[discord.Embed, discord.ui.View]:
+    """Dashboard embed plus accept/deny buttons for the oldest pending requests."""
+    pending = list(state.pending.values())
+    embed = make_embed(
+        title=f"📨 Invite Requests — {len(pending)} pending",
+        color=discord.Color.blue() if pending else discord.Color.dark_grey()
+    )
+    lines = [_invite_line(r) for r in pending[:INVITE_DASHBOARD_LISTED]]
+    if len(pending) > INVITE_DASHBOARD_LISTED:
+        lines.append(f"… and {len(pending) - INVITE_DASHBOARD_LISTED} more")
+    embed.description = "\n".join(lines) or "No pending requests."
+    if state.history:
         embed.add_field(
-            name="🧹 Actions",
-            value="`/apagar <channel> <id>` — Anonymous message removal",
+            name="Recently handled",
+            value="\n".join(_invite_history_line(r) for r in state.history),
             inline=False
         )
-  
-        embed.set_footer(text="Bovary Club Society • Moderation Layer")
-        await interaction.response.edit_message(embed=embed, view=self)
 
-    @discord.ui.button(label="Utilities ⚙️", style=discord.ButtonStyle.green)
-    async def util_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = make_embed(
-            title="⚙️ Utilities",
-            color=discord.Color.green()
-        )
-        embed.description = (
-            "Essential internal utilities.\n"
-            "Time, system status, and contextual information."
-        )
-        
-        embed.add_field(
-            name="🧠 System",
-            value="`/ping` — System response verification",
-            inline=False
-        )
+    view = discord.ui.View(timeout=None)
+    for row, request in enumerate(pending[:INVITE_DASHBOARD_BUTTON_ROWS]):
+        view.add_item(InviteDecisionButton(INVITE_ACCEPTED, request.user_id, request.name, row))
+        view.add_item(InviteDecisionButton(INVITE_DENIED, request.user_id, request.name, row))
+    return embed, view
 
-        embed.set_footer(text="Bovary Club Society • Utility Layer")
-        await interaction.response.edit_message(embed=embed, view=self)
+async def publish_invite_dashboard(guild_id: int, state: GuildInvites) -> Optional[MessageRef]:
+    """Edit the dashboard in place; post a new one if it is gone or the staff channel changed."""
+    channel_id = routing.table.routes_for(guild_id).staff_log_channel
+    if not channel_id:
+        return None
+    embed, view = render_invite_dashboard(state)
+    channel = bot.get_partial_messageable(channel_id)
+    if state.dashboard and state.dashboard[0] == channel_id:
+        try:
+            await channel.get_partial_message(state.dashboard[1]).edit(embed=embed, view=view)
+            return state.dashboard
+        except discord.NotFound:
+            pass
+    message = await channel.send(embed=embed, view=view)
+    return (channel_id, message.id)
 
-    @discord.ui.button(label="Back ⬅️", style=discord.ButtonStyle.grey)
-    async def back_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = make_embed(
-            title="📘 Control Panel — " + BOT_NAME,
-            color=discord.Color.blue()
-        )
-        embed.description = (
-            "Internal interface of the **Bovary Club Society**.\n"
-            "A curated space for control, access, and identity.\n\n"
-            "Select a category to continue."
+async def ping_invite_staff(guild_id: int, state: GuildInvites, count: int) -> None:
+    """One role ping for every request that arrived during the ping window."""
+    routes = routing.table.routes_for(guild_id)
+    if not routes.staff_log_channel or not count:
+        return
+    role = f"<@&{routes.crew_leader_role}> " if routes.crew_leader_role else ""
+    link = (
+        f" — https://discord.com/channels/{guild_id}/{state.dashboard[0]}/{state.dashboard[1]}"
+        if state.dashboard else ""
+    )
+    await bot.get_partial_messageable(routes.staff_log_channel).send(
+        f"{role}📨 **{count}** new invite request{'s' if count != 1 else ''} waiting{link}",
+        allowed_mentions=discord.AllowedMentions(roles=True)
+    )
+
+class InviteDecisionButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"invite:(?P<action>accepted|denied):(?P<user_id>[0-9]+)"
+):
+    """Accept/deny button on the dashboard; all state lives in the custom_id and the queue."""
+
+    def __init__(self, action: str, user_id: int, name: str = "", row: Optional[int] = None):
+        accept = action == INVITE_ACCEPTED
+        super().__init__(
+            discord.ui.Button(
+                label=f"Accept {name}"[:80] if accept else "Deny",
+                style=discord.ButtonStyle.green if accept else discord.ButtonStyle.red,
+                custom_id=f"invite:{action}:{user_id}",
+                row=row
+            )
         )
-        embed.set_footer(text="Bovary Club Society • Internal System")
-        await interaction.response.edit_message(embed=embed, view=self)
+        self.action = action
+        self.user_id = user_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["action"], int(match["user_id"]))
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        member = interaction.user
+        role_id = routing.table.routes_for(interaction.guild_id).crew_leader_role
+        if isinstance(member, discord.Member) and (
+            member.guild_permissions.manage_guild or (role_id and member.get_role(role_id))
+        ):
+            return True
+        await interaction.response.send_message(MESSAGES.NO_PERMISSION, ephemeral=True)
+        return False
+
+    @instrumented("invite_decision")
+    async def callback(self, interaction: discord.Interaction):
+        guild_id = interaction.guild_id
+        request = invite_queue.resolve(guild_id, self.user_id, self.action, interaction.user.id)
+        state = invite_queue.guild(guild_id)
+        if request is None:
+            await interaction.response.send_message(MESSAGES.INVITE_ALREADY_HANDLED, ephemeral=True)
+            return
+        # the click already edits the dashboard, so the debounced edit is not needed
+        embed, view = render_invite_dashboard(state)
+        await interaction.response.edit_message(embed=embed, view=view)
+        invite_queue.published(guild_id, (interaction.channel_id, interaction.message.id))
 
-# ===========================
-# ====== INVITE SYSTEM ======
-# ===========================
 class InviteView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
@@ -403,53 +1468,36 @@ class InviteView(discord.ui.View):
         style=discord.ButtonStyle.blurple,
         custom_id="invite_request_button"
     )
+    @instrumented("invite_request")
     async def request_invite(self, interaction: discord.Interaction, button: discord.ui.Button):
         user = interaction.user
-        now = datetime.now(timezone.utc)
-
-        last = last_invite_request.get(user.id)
-        if last:
-            diff = (now - last).total_seconds()
-            remaining = INVITE_COOLDOWN_SECONDS - diff
-            if remaining > 0:
-                minutes = int(remaining // 60)
-                seconds = int(remaining % 60)
-                await interaction.response.send_message(
-                    f"⏳ Please wait **{minutes}m {seconds}s** before requesting another invite.",
-                    ephemeral=True
-                )
-                return
+        if invite_queue.is_pending(interaction.guild_id, user.id):
+            await interaction.response.send_message(MESSAGES.INVITE_ALREADY_PENDING, ephemeral=True)
+            return
 
-        last_invite_request[user.id] = now
+        remaining = await cooldown_store.acquire("invite_request", user.id, INVITE_COOLDOWN_SECONDS)
+        if remaining > 0:
+            minutes = int(remaining // 60)
+            seconds = int(remaining % 60)
+            await interaction.response.send_message(
+                f"⏳ Please wait **{minutes}m {seconds}s** before requesting another invite.",
+                ephemeral=True
+            )
+            return
+
+        # the dashboard edit and the (collapsed) role ping happen in the background
+        invite_queue.add(interaction.guild_id, user.id, user.display_name)
         await interaction.response.send_message(
             MESSAGES.INVITE_REQUEST_SENT,
             ephemeral=True
         )
 
-        channel = safe_get_channel(bot, STAFF_LOG_CHANNEL)
-        guild = interaction.guild
-        crew_leader_role = guild.get_role(CREW_LEADER_ROLE_ID) if guild else None
-
-        if channel:
-            embed = make_embed(
-                title="📨 New Invite Request",
-                color=discord.Color.blue()
-            )
-            embed.description = (
-                f"👤 **User:** {user.mention}\n"
-                f"⏰ **Time:** <t:{int(now.timestamp())}:R>"
-            )
-            await channel.send(
-                content=f"{crew_leader_role.mention if crew_leader_role else ''} "
-                        f"**{user.display_name}** has requested an invitation.",
-                embed=embed
-            )
-
 @bot.tree.command(name="invitepanel", description="Send the official invite panel")
 async def invitepanel(interaction: discord.Interaction):
-    if interaction.channel_id != REQUIRED_INVITE_CHANNEL:
+    invite_channel = routing.table.routes_for(interaction.guild_id).invite_channel
+    if interaction.channel_id != invite_channel:
         await interaction.response.send_message(
-            f"❌ Use this command only in <#{REQUIRED_INVITE_CHANNEL}>.",
+            f"❌ Use this command only in <#{invite_channel}>.",
             ephemeral=True
         )
         return
@@ -471,178 +1519,392 @@ async def invitepanel(interaction: discord.Interaction):
         embed.set_thumbnail(url=interaction.client.user.avatar.url)
         embed.set_footer(text=FOOTER_TEXT, icon_url=interaction.client.user.avatar.url)
 
-    await interaction.channel.send(embed=embed, view=InviteView())
+    # refresh the existing panel instead of posting another one
+    panel = invite_queue.guild(interaction.guild_id).panel
+    if panel and panel[0] == interaction.channel_id:
+        try:
+            await interaction.channel.get_partial_message(panel[1]).edit(embed=embed, view=InviteView())
+            await interaction.response.send_message("✅ Panel updated.", ephemeral=True)
+            return
+        except discord.NotFound:
+            pass
+
+    message = await interaction.channel.send(embed=embed, view=InviteView())
+    invite_queue.set_panel(interaction.guild_id, (interaction.channel_id, message.id))
     await interaction.response.send_message("✅ Panel sent.", ephemeral=True)
 
-    temp_msg = await interaction.channel.send(
-        f"📨 {interaction.user.mention} requested an invite!"
+def _age_bar(count: int, total: int, width: int = 12) -> str:
+    filled = round(width * count / total) if total else 0
+    return "█" * filled + "░" * (width - filled)
+
+async def publish_member_burst(guild_id: int, burst: Burst, rate: float) -> Optional[MessageRef]:
+    """Post or edit the summary message of a join/leave burst in the log channel."""
+    channel_id = routing.table.log_channel(guild_id)
+    if not channel_id:
+        return None
+    joins = burst.kind == MEMBER_JOIN
+    raid = joins and burst.young_share >= RAID_YOUNG_ACCOUNT_SHARE
+    if burst.ended:
+        title = f"{'🟢 Join' if joins else '🔴 Leave'} burst ended"
+        color = discord.Color.dark_grey()
+    elif raid:
+        title = "🚨 Possible raid — join burst"
+        color = discord.Color.red()
+    else:
+        title = "🟢 Join burst" if joins else "🔴 Mass leave"
+        color = discord.Color.orange()
+    embed = make_embed(title=title, color=color)
+    embed.description = (
+        f"**{burst.count}** members {'joined' if joins else 'left'} since <t:{int(burst.started_at)}:T>\n"
+        f"Rate: **{rate:.0f}/min** now, peak **{burst.peak * 60 / member_flow.window:.0f}/min**"
     )
-    try:
-        await temp_msg.delete(delay=300)
-    except Exception:
-        pass
+    total = sum(burst.ages)
+    if total:
+        embed.add_field(
+            name="Account age",
+            value="\n".join(
+                f"`{label:<9}` `{_age_bar(count, total)}` {count} ({count * 100 // total}%)"
+                for (label, _), count in zip(ACCOUNT_AGE_BUCKETS, burst.ages)
+            ),
+            inline=False
+        )
+    if burst.latest:
+        embed.add_field(
+            name="Latest",
+            value=_truncate(", ".join(discord.utils.escape_markdown(n) for n in burst.latest), 1024),
+            inline=False
+        )
+
+    channel = bot.get_partial_messageable(channel_id)
+    if burst.message and burst.message[0] == channel_id:
+        try:
+            await channel.get_partial_message(burst.message[1]).edit(embed=embed)
+            return burst.message
+        except discord.NotFound:
+            pass
+    message = await channel.send(embed=embed)
+    return (channel_id, message.id)
 
 # -------------------------
 # ====== EVENTS ===========
 # -------------------------
 @bot.event
-async def on_ready():
-    if not rotate_status.is_running():
-        rotate_status.start()
+async def on_connect():
+    # READY received; guilds are streamed in (and chunked) before on_ready
+    startup.end("gateway_connect")
+    startup.begin("guilds_and_chunking")
+    # with SHARD_COUNT=auto the count is only known once Discord has told us
+    shard_stats.shard_count = bot.shard_count or 1
 
-    try:
-        bot.add_view(InviteView())
-    except Exception:
-        logger.warning("Could not add persistent InviteView on startup")
-
-    try:
-        synced = await bot.tree.sync()
-        logger.info("✅ %s is online with %d slash commands!", bot.user, len(synced))
-    except Exception as e:
-        logger.exception("❌ Error syncing commands: %s", e)
+@bot.event
+async def on_ready():
+    # Fires again after every reconnect: keep it cheap (setup lives in setup_hook)
+    logger.info("✅ %s is online with %d slash commands!", bot.user, len(bot.tree.get_commands()))
+    # a fresh session may have missed messages: react to media posted since the checkpoints
+    reaction_backfill.run(
+        channel for channel in map(bot.get_channel, routing.table.media_channels)
+        if isinstance(channel, discord.abc.Messageable)
+    )
+    if not startup.finished:
+        await report_startup()
+
+async def report_startup() -> None:
+    startup.finish()
+    for line in startup.report_lines():
+        logger.info(line)
+    logger.info("startup_phases %s", json.dumps(startup.summary(), sort_keys=True))
+    if STARTUP_TRACE_PATH:
+        try:
+            await asyncio.to_thread(startup.write_chrome_trace, STARTUP_TRACE_PATH)
+            logger.info("Startup trace written to %s", STARTUP_TRACE_PATH)
+        except OSError as e:
+            logger.warning("Could not write startup trace %s: %s", STARTUP_TRACE_PATH, e)
 
 @bot.event
 async def on_member_join(member: discord.Member):
-    channel = safe_get_channel(bot, LOG_CHANNEL_ID)
-    if channel:
-        await channel.send(
+    # during a burst the member is only counted in the summary message
+    if member_flow.record(member.guild.id, MEMBER_JOIN, str(member), member.created_at.timestamp()):
+        log_dispatcher.submit(
+            routing.table.log_channel(member.guild.id),
             f"🟢 **{member}** joined the server! (ID: `{member.id}`)"
         )
 
 @bot.event
-async def on_member_remove(member: discord.Member):
-    channel = safe_get_channel(bot, LOG_CHANNEL_ID)
-    if channel:
-        await channel.send(
+async def on_raw_member_remove(payload: discord.RawMemberRemoveEvent):
+    # raw variant: on_member_remove only fires for members in the member cache
+    member = payload.user
+    if member_flow.record(payload.guild_id, MEMBER_LEAVE, str(member), member.created_at.timestamp()):
+        log_dispatcher.submit(
+            routing.table.log_channel(payload.guild_id),
             f"🔴 **{member}** left the server. (ID: `{member.id}`)"
         )
 
 @bot.event
 async def on_guild_channel_create(channel: discord.abc.GuildChannel):
-    log_channel = safe_get_channel(bot, LOG_CHANNEL_ID)
-    if log_channel:
-        await log_channel.send(
-            f"🆕 Channel created: **{channel.name}** "
-            f"({channel.mention if hasattr(channel, 'mention') else channel.name})"
-        )
+    log_dispatcher.submit(
+        routing.table.log_channel(channel.guild.id),
+        f"🆕 Channel created: **{channel.name}** "
+        f"({channel.mention if hasattr(channel, 'mention') else channel.name})"
+    )
 
 @bot.event
 async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
-    log_channel = safe_get_channel(bot, LOG_CHANNEL_ID)
-    if log_channel:
-        await log_channel.send(
-            f"🗑️ Channel deleted: **{channel.name}**"
-        )
+    log_dispatcher.submit(
+        routing.table.log_channel(channel.guild.id),
+        f"🗑️ Channel deleted: **{channel.name}**"
+    )
+
+def _is_message_log_ignored(channel_id: int) -> bool:
+    """Channels whose deletes/edits are never logged (including the log channels themselves)."""
+    table = routing.table
+    return channel_id in table.ignored_channels or channel_id in table.log_channels
+
+def _cached_from_discord(message: Optional[discord.Message]) -> Optional[CachedMessage]:
+    """Fallback to discord.py's own message cache when ours missed."""
+    if message is None or message.author.bot:
+        return None
+    return CachedMessage.from_message(message)
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+def _archive(
+    kind: str,
+    guild_id: Optional[int],
+    channel_id: int,
+    message_id: int,
+    cached: Optional[CachedMessage],
+    **fields
+) -> None:
+    """Mirror a message-log entry into the searchable archive."""
+    if cached is not None:
+        fields.setdefault("author_id", cached.author_id)
+        fields.setdefault("author_name", cached.author_name)
+        fields.setdefault("content", cached.content)
+        fields.setdefault("attachments", cached.attachments)
+    audit_archive.record(kind, guild_id=guild_id, channel_id=channel_id, message_id=message_id, **fields)
+
+def make_message_log_embed(
+    title: str,
+    color: discord.Color,
+    channel_id: int,
+    cached: Optional[CachedMessage],
+    footer: str
+) -> discord.Embed:
+    """Common header for delete/edit log embeds."""
+    embed = make_embed(title=title, color=color)
+    embed.add_field(name="Channel", value=f"<#{channel_id}>", inline=True)
+    embed.add_field(
+        name="Author",
+        value=cached.author_name if cached else "Unknown (not cached)",
+        inline=True
+    )
+    if cached and cached.avatar_url:
+        embed.set_thumbnail(url=cached.avatar_url)
+    embed.set_footer(text=f"{FOOTER_TEXT} | {footer}")
+    return embed
+
+def _archived_attachment_line(stored: StoredAttachment) -> str:
+    signature = attachment_archiver.signature(stored.name) if attachment_archiver else None
+    if ATTACHMENT_PUBLIC_URL and signature:
+        return f"📦 [{stored.filename}]({ATTACHMENT_PUBLIC_URL}/attachments/{stored.name}?sig={signature})"
+    return f"📦 {stored.filename} archived as `{stored.name}`"
+
+def _deleted_summary(total: int, cached: List[CachedMessage]) -> str:
+    """Embed description for several deleted messages: one short line per cached one."""
+    lines = [
+        f"**{c.author_name}:** {_truncate(c.content.replace(chr(10), ' ') or '[no text]', 120)}"
+        for c in cached
+    ]
+    description = f"**{total}** messages removed, {len(cached)} cached.\n\n"
+    shown = 0
+    for line in lines:
+        if len(description) + len(line) + 40 > 4000:
+            break
+        description += line + "\n"
+        shown += 1
+    if shown < len(lines):
+        description += f"… and {len(lines) - shown} more"
+    return description
+
+def make_log_continuation_embed(title: str, color: discord.Color, footer: str) -> discord.Embed:
+    """Follow-up embed for log entries too long for one embed."""
+    embed = make_embed(title=f"{title} (cont.)", color=color)
+    embed.set_footer(text=f"{FOOTER_TEXT} | {footer}")
+    return embed
 
 @bot.event
-async def on_message_delete(message: discord.Message):
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    reaction_scheduler.discard(payload.channel_id, payload.message_id)
+    leaderboard.discard(payload.message_id)
+    repost_index.discard(payload.message_id)
     try:
-        if message.author and message.author.bot:
-            return
-        if message.channel and message.channel.id == IGNORE_CHANNEL_ID:
+        if _confirm_command_deletes((payload.message_id,)) or _is_message_log_ignored(payload.channel_id):
             return
 
-        msg_log = safe_get_channel(bot, MESSAGE_LOG_CHANNEL_ID)
-        if msg_log:
-            content = message.content or "[no text]"
-            embed = make_embed(
-                title="🗑️ Message Deleted",
-                color=discord.Color.red()
-            )
+        if payload.message_id in _bot_messages:
+            del _bot_messages[payload.message_id]
+            return
+        cached = message_cache.pop(payload.message_id)
+        if cached is None:
+            if payload.cached_message and payload.cached_message.author.bot:
+                return
+            cached = _cached_from_discord(payload.cached_message)
 
-            embed.add_field(
-                name="Channel",
-                value=message.channel.mention if message.channel else "Unknown",
-                inline=True
-            )
+        embed = make_message_log_embed(
+            "🗑️ Message Deleted", discord.Color.red(),
+            payload.channel_id, cached, "Delete log"
+        )
+        if cached:
+            content = cached.content or "[no text]"
+            if cached.attachments:
+                content += "\n" + "\n".join(cached.attachments)
+        else:
+            content = f"[not cached] Message ID: `{payload.message_id}`"
+        if attachment_archiver:
+            archived = await attachment_archiver.pop(payload.message_id)
+            if archived:
+                content += "\n" + "\n".join(_archived_attachment_line(a) for a in archived)
+        log_channel_id = routing.table.message_log_channel(payload.guild_id)
+        continuation = lambda: make_log_continuation_embed("🗑️ Message Deleted", discord.Color.red(), "Delete log")
+        for part in add_chunked_fields(embed, "Content", chunk_text(content), continuation):
+            log_dispatcher.submit(log_channel_id, part)
+        _archive("delete", payload.guild_id, payload.channel_id, payload.message_id, cached)
 
-            author = message.author if message.author else "Unknown"
-            embed.add_field(
-                name="Author",
-                value=str(author),
-                inline=True
-            )
+    except Exception:
+        logger.exception("Error in on_raw_message_delete")
 
-            embed.add_field(
-                name="Content",
-                value=content,
-                inline=False
-            )
+@bot.event
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    for message_id in payload.message_ids:
+        reaction_scheduler.discard(payload.channel_id, message_id)
+        leaderboard.discard(message_id)
+        repost_index.discard(message_id)
+    try:
+        if _confirm_command_deletes(payload.message_ids) or _is_message_log_ignored(payload.channel_id):
+            return
+        if all(message_id in _bot_messages for message_id in payload.message_ids):
+            return
 
-            if message.author and getattr(message.author, "avatar", None):
-                embed.set_thumbnail(url=message.author.avatar.url)
+        cached = message_cache.pop_many(payload.message_ids)
+        seen = {c.id for c in cached}
+        for m in payload.cached_messages:
+            if m.id not in seen:
+                entry = _cached_from_discord(m)
+                if entry:
+                    cached.append(entry)
+        cached.sort(key=lambda c: c.id)
 
-            embed.set_footer(text=f"{FOOTER_TEXT} | Delete log")
-            await msg_log.send(embed=embed)
+        embed = make_embed(
+            title="🧨 Bulk Delete",
+            description=_deleted_summary(len(payload.message_ids), cached),
+            color=discord.Color.dark_red()
+        )
+        embed.add_field(name="Channel", value=f"<#{payload.channel_id}>", inline=True)
+        embed.set_footer(text=f"{FOOTER_TEXT} | Delete log")
+        log_dispatcher.submit(routing.table.message_log_channel(payload.guild_id), embed)
+        by_id = {c.id: c for c in cached}
+        for message_id in sorted(payload.message_ids):
+            _archive("bulk_delete", payload.guild_id, payload.channel_id, message_id, by_id.get(message_id))
 
     except Exception:
-        logger.exception("Error in on_message_delete")
+        logger.exception("Error in on_raw_bulk_message_delete")
 
 @bot.event
-async def on_message_edit(before: discord.Message, after: discord.Message):
+async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
     try:
-        if before.author and before.author.bot:
-            return
-        if before.content == after.content:
+        if _is_message_log_ignored(payload.channel_id):
             return
-        if before.channel and before.channel.id == IGNORE_CHANNEL_ID:
-            return
-
-        msg_log = safe_get_channel(bot, MESSAGE_LOG_CHANNEL_ID)
-        if msg_log:
-            embed = make_embed(
-                title="✏️ Message Edited",
-                color=discord.Color.orange()
-            )
 
-            embed.add_field(
-                name="Channel",
-                value=before.channel.mention if before.channel else "Unknown",
-                inline=True
-            )
-            embed.add_field(
-                name="Author",
-                value=str(before.author),
-                inline=True
-            )
-            embed.add_field(
-                name="Before",
-                value=before.content or "[no text]",
-                inline=False
-            )
-            embed.add_field(
-                name="After",
-                value=after.content or "[no text]",
-                inline=False
-            )
+        data = payload.data
+        if "content" not in data or data.get("edited_timestamp") is None:
+            return  # not an edit: link unfurl, pin, embed refresh
+        author = data.get("author") or {}
+        if author.get("bot"):
+            return
 
-            if before.author and getattr(before.author, "avatar", None):
-                embed.set_thumbnail(url=before.author.avatar.url)
+        after_content = data["content"]
+        cached = message_cache.get(payload.message_id)
+        if cached is None:
+            cached = _cached_from_discord(payload.cached_message)
+        if cached is not None and cached.content == after_content:
+            return
+        message_cache.update_content(payload.message_id, after_content)
 
-            embed.set_footer(text=f"{FOOTER_TEXT} | Edit log")
-            await msg_log.send(embed=embed)
+        embed = make_message_log_embed(
+            "✏️ Message Edited", discord.Color.orange(),
+            payload.channel_id, cached, "Edit log"
+        )
+        if cached is None and author:
+            embed.set_field_at(1, name="Author", value=author.get("username", "Unknown"), inline=True)
+        continuation = lambda: make_log_continuation_embed("✏️ Message Edited", discord.Color.orange(), "Edit log")
+        if cached is not None:
+            # only the changed words, with a little context; long diffs spill into more fields/embeds
+            chunks = pack_chunks(render_diff(cached.content, after_content))
+            embeds = add_chunked_fields(embed, "Changes", chunks, continuation)
+        else:
+            embed.add_field(name="Before", value="[not cached]", inline=False)
+            embeds = add_chunked_fields(embed, "After", chunk_text(after_content or "[no text]"), continuation)
+        log_channel_id = routing.table.message_log_channel(payload.guild_id)
+        for part in embeds:
+            log_dispatcher.submit(log_channel_id, part)
+        fields = {"content": after_content, "before": cached.content if cached else None}
+        if cached is None and "id" in author:
+            fields.update(author_id=int(author["id"]), author_name=author.get("username"))
+        _archive("edit", payload.guild_id, payload.channel_id, payload.message_id, cached, **fields)
 
     except Exception:
-        logger.exception("Error in on_message_edit")
+        logger.exception("Error in on_raw_message_edit")
 
 @bot.event
 async def on_message(message: discord.Message):
     if message.author and message.author.bot:
+        # message_cache skips bots: remember the ID so deleting it is not logged as "[not cached]"
+        _bot_messages[message.id] = None
+        if len(_bot_messages) > BOT_MESSAGE_IDS_MAX:
+            _bot_messages.popitem(last=False)
         return
 
+    message_cache.store(message)
+
     try:
-        if message.channel and message.channel.id in CHANNEL_IDS:
+        if message.channel and routing.table.is_media_channel(message.channel.id):
+            reaction_backfill.seen(message.channel.id, message.id)
             if is_media_in_message(message):
-                for emoji in AUTO_REACTIONS:
-                    try:
-                        await message.add_reaction(emoji)
-                    except discord.HTTPException:
-                        continue
+                if not check_repost(message):
+                    reaction_scheduler.schedule(message)
+                leaderboard.track(message.id, message.channel.id, message.author.id)
+                if attachment_archiver and message.attachments:
+                    attachment_archiver.submit(message.id, [
+                        (a.url, a.filename, a.size) for a in message.attachments
+                        if media_classifier.is_media_filename(a.filename)
+                    ])
     except Exception:
         logger.exception("Error processing on_message (auto reactions)")
 
     await bot.process_commands(message)
 
+# Leaderboard counters; the bot's own auto-reactions are not counted
+@bot.event
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
+    if payload.user_id != bot.user.id and routing.table.is_media_channel(payload.channel_id):
+        leaderboard.add(payload.message_id, str(payload.emoji))
+
+@bot.event
+async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
+    if payload.user_id != bot.user.id and routing.table.is_media_channel(payload.channel_id):
+        leaderboard.add(payload.message_id, str(payload.emoji), -1)
+
+@bot.event
+async def on_raw_reaction_clear(payload: discord.RawReactionClearEvent):
+    if routing.table.is_media_channel(payload.channel_id):
+        leaderboard.clear(payload.message_id)
+
+@bot.event
+async def on_raw_reaction_clear_emoji(payload: discord.RawReactionClearEmojiEvent):
+    if routing.table.is_media_channel(payload.channel_id):
+        leaderboard.clear(payload.message_id, str(payload.emoji))
+
 # -------------------------
 # ====== ERRORS HANDLING ==
 # -------------------------
@@ -651,9 +1913,14 @@ async def on_app_command_error(
     interaction: discord.Interaction,
     error: app_commands.AppCommandError
 ):
-    logger.exception("Slash command error: %s", error)
-
-    if isinstance(error, app_commands.MissingPermissions):
+    if not isinstance(error, app_commands.CommandOnCooldown):
+        logger.exception("Slash command error: %s", error)
+        command_name = interaction.command.qualified_name if interaction.command else "unknown"
+        metrics.inc("bovary_handler_errors_total", kind="command", name=command_name)
+
+    if isinstance(error, app_commands.CommandOnCooldown):
+        message = f"⏳ {MESSAGES.COOLDOWN} (`{int(error.retry_after)}s`)"
+    elif isinstance(error, app_commands.MissingPermissions):
         message = MESSAGES.NO_PERMISSION
     else:
         message = MESSAGES.GENERIC_ERROR
@@ -683,9 +1950,9 @@ async def on_command_error(ctx: commands.Context, error: commands.CommandError):
 # -------------------------
 # ====== STARTUP ==========
 # -------------------------
-if __name__ == "__main__":
-    keep_alive()
+startup.end("module_init")
 
+def main() -> None:
     if not TOKEN:
         logger.critical("TOKEN not found. Configure it in your environment (.env).")
         print("❌ ERROR: TOKEN not found. Configure it in the environment (.env)")
@@ -694,3 +1961,7 @@ if __name__ == "__main__":
             bot.run(TOKEN)
         except Exception as e:
             logger.exception("Failed to start bot: %s", e)
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
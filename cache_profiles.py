@@ -0,0 +1,56 @@
+# cache_profiles.py
+"""
+Member/message cache profiles.
+One name picks the member cache flags, guild chunking at startup and the
+size of discord.py's message cache together:
+
+- minimal:  no member cache, no chunking, no message cache
+            (the bot keeps its own byte-bounded content cache for logs)
+- standard: only members seen joining while online, no chunking, small message cache
+- full:     discord.py defaults — every member chunked and cached
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, NamedTuple, Optional
+
+import discord
+
+
+class CacheProfile(NamedTuple):
+    name: str
+    member_cache: str              # "none" | "joined" | "intents"
+    chunk_guilds_at_startup: bool
+    max_messages: Optional[int]
+
+
+PROFILES: Dict[str, CacheProfile] = {
+    "minimal": CacheProfile("minimal", "none", False, None),
+    "standard": CacheProfile("standard", "joined", False, 250),
+    "full": CacheProfile("full", "intents", True, 1000),
+}
+
+
+def member_cache_flags(profile: CacheProfile, intents: discord.Intents) -> discord.MemberCacheFlags:
+    if profile.member_cache == "none":
+        return discord.MemberCacheFlags.none()
+    if profile.member_cache == "joined":
+        return discord.MemberCacheFlags(joined=True, voice=False)
+    return discord.MemberCacheFlags.from_intents(intents)
+
+
+def get_profile(name: str) -> CacheProfile:
+    try:
+        return PROFILES[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown cache profile {name!r} (expected one of {', '.join(PROFILES)})") from None
+
+
+def bot_cache_options(name: str, intents: discord.Intents) -> Dict[str, Any]:
+    """Keyword arguments for `commands.Bot(...)` implementing the profile."""
+    profile = get_profile(name)
+    return {
+        "member_cache_flags": member_cache_flags(profile, intents),
+        "chunk_guilds_at_startup": profile.chunk_guilds_at_startup,
+        "max_messages": profile.max_messages,
+    }
@@ -0,0 +1,239 @@
+# cooldowns.py
+"""
+Persistent cooldown store.
+Cooldowns live in a dict for O(1) checks, a min-heap of expiry times evicts
+old entries, and changes are written behind to a local SQLite (WAL) file in
+batches so a redeploy does not reset anyone's cooldown.
+With `shared=True` (several bot processes on one machine) `acquire` checks
+and starts cooldowns atomically in the database instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import discord
+from discord import app_commands
+
+logger = logging.getLogger("bovary_bot.cooldowns")
+
+Key = Tuple[str, int]
+
+
+class CooldownStore:
+    """Named cooldown buckets keyed by an ID (user, channel, guild...)."""
+
+    def __init__(self, path: Optional[str], *, flush_interval: float = 5.0, shared: bool = False):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.shared = shared and path is not None
+        self._expires: Dict[Key, float] = {}
+        self._heap: List[Tuple[float, str, int]] = []
+        self._dirty: Dict[Key, float] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # -------- checks --------
+    def remaining(self, bucket: str, key: int, now: Optional[float] = None) -> float:
+        """Seconds left on the cooldown, 0 if not on cooldown."""
+        expires = self._expires.get((bucket, key))
+        if expires is None:
+            return 0.0
+        left = expires - (time.time() if now is None else now)
+        return left if left > 0 else 0.0
+
+    def trigger(self, bucket: str, key: int, seconds: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        expires = now + seconds
+        self._expires[(bucket, key)] = expires
+        self._dirty[(bucket, key)] = expires
+        heapq.heappush(self._heap, (expires, bucket, key))
+        self._evict(now)
+
+    def hit(self, bucket: str, key: int, seconds: float) -> float:
+        """Start the cooldown unless already running. Returns the seconds left (0 = allowed)."""
+        now = time.time()
+        left = self.remaining(bucket, key, now)
+        if left:
+            return left
+        self.trigger(bucket, key, seconds, now)
+        return 0.0
+
+    async def acquire(self, bucket: str, key: int, seconds: float) -> float:
+        """Like `hit`, but consistent across processes when the store is shared."""
+        if not self.shared:
+            return self.hit(bucket, key, seconds)
+        left = self.remaining(bucket, key)
+        if left:
+            return left
+        try:
+            left = await asyncio.to_thread(self._acquire_sync, bucket, key, seconds)
+        except sqlite3.Error:
+            logger.exception("Shared cooldown check failed, falling back to local state")
+            return self.hit(bucket, key, seconds)
+        # mirror the database locally so repeated checks stay O(1)
+        now = time.time()
+        expires = now + (left or seconds)
+        self._expires[(bucket, key)] = expires
+        heapq.heappush(self._heap, (expires, bucket, key))
+        return left
+
+    def reset(self, bucket: str, key: int) -> None:
+        if self._expires.pop((bucket, key), None) is not None:
+            self._dirty[(bucket, key)] = 0.0
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def _evict(self, now: float) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            expires, bucket, key = heapq.heappop(heap)
+            # a newer trigger leaves a stale heap entry behind; skip those
+            if self._expires.get((bucket, key)) == expires:
+                del self._expires[(bucket, key)]
+
+    # -------- app command integration --------
+    def check(
+        self,
+        bucket: str,
+        seconds: float,
+        key: Callable[[discord.Interaction], int] = lambda i: i.user.id,
+    ):
+        """`app_commands.check` that puts the command on cooldown per `key(interaction)`."""
+        cooldown = app_commands.Cooldown(1, seconds)
+
+        async def predicate(interaction: discord.Interaction) -> bool:
+            left = await self.acquire(bucket, key(interaction), seconds)
+            if left:
+                raise app_commands.CommandOnCooldown(cooldown, left)
+            return True
+
+        return app_commands.check(predicate)
+
+    # -------- persistence --------
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # autocommit mode: transactions are opened explicitly below
+            self._db = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cooldowns ("
+                " bucket TEXT NOT NULL, key INTEGER NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (bucket, key))"
+            )
+        return self._db
+
+    def _load_sync(self) -> List[Tuple[str, int, float]]:
+        with self._db_lock:
+            db = self._connect()
+            now = time.time()
+            db.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+            return db.execute("SELECT bucket, key, expires_at FROM cooldowns").fetchall()
+
+    def _write_sync(self, changes: Dict[Key, float]) -> None:
+        with self._db_lock:
+            db = self._connect()
+            now = time.time()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "INSERT INTO cooldowns (bucket, key, expires_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT(bucket, key) DO UPDATE SET expires_at = excluded.expires_at",
+                    [(b, k, e) for (b, k), e in changes.items() if e > now],
+                )
+                db.executemany(
+                    "DELETE FROM cooldowns WHERE bucket = ? AND key = ?",
+                    [(b, k) for (b, k), e in changes.items() if e <= now],
+                )
+                db.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _acquire_sync(self, bucket: str, key: int, seconds: float) -> float:
+        with self._db_lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")  # serializes concurrent writers across processes
+            try:
+                now = time.time()
+                row = db.execute(
+                    "SELECT expires_at FROM cooldowns WHERE bucket = ? AND key = ?", (bucket, key)
+                ).fetchone()
+                if row and row[0] > now:
+                    left = row[0] - now
+                else:
+                    left = 0.0
+                    db.execute(
+                        "INSERT INTO cooldowns (bucket, key, expires_at) VALUES (?, ?, ?)"
+                        " ON CONFLICT(bucket, key) DO UPDATE SET expires_at = excluded.expires_at",
+                        (bucket, key, now + seconds),
+                    )
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+            return left
+
+    async def open(self) -> None:
+        """Reload persisted cooldowns and start the write-behind task."""
+        if self.path is None or self._task is not None:
+            return
+        try:
+            rows = await asyncio.to_thread(self._load_sync)
+        except sqlite3.Error:
+            logger.exception("Could not load cooldowns from %s", self.path)
+            rows = []
+        for bucket, key, expires in rows:
+            if expires > self._expires.get((bucket, key), 0.0):
+                self._expires[(bucket, key)] = expires
+                heapq.heappush(self._heap, (expires, bucket, key))
+        logger.info("Loaded %d active cooldowns", len(rows))
+        self._task = asyncio.create_task(self._run(), name="cooldown-flush")
+
+    async def flush(self) -> None:
+        if not self._dirty or self.path is None:
+            return
+        changes, self._dirty = self._dirty, {}
+        try:
+            await asyncio.to_thread(self._write_sync, changes)
+        except sqlite3.Error:
+            logger.exception("Could not persist %d cooldowns", len(changes))
+            # keep them for the next attempt unless a newer value arrived
+            for k, v in changes.items():
+                self._dirty.setdefault(k, v)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._evict(time.time())
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,180 @@
+# diagnostics.py
+"""
+On-demand runtime diagnostics for the admin commands.
+- `profile_loop`: sampling CPU profiler of the event loop thread. A helper
+  thread reads the loop thread's stack every few milliseconds (no tracing
+  hooks, so the bot runs at normal speed) and reports the hottest functions
+  plus collapsed stacks ("a;b;c 42" lines, for flamegraph.pl / speedscope).
+- `MemoryTracker`: tracemalloc snapshots, top allocation sites and the diff
+  against the previous snapshot.
+- `task_report`: live asyncio tasks grouped by coroutine and by the line
+  they are suspended on, plus live discord.py views by class.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import discord
+
+# Frames of the loop waiting for I/O: samples ending here count as idle
+_IDLE_FUNCTIONS = frozenset({"select", "poll", "epoll", "_run_once"})
+_TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class ProfileResult(NamedTuple):
+    seconds: float
+    samples: int
+    idle: int
+    self_counts: Counter
+    total_counts: Counter
+    stacks: Counter
+
+    def report(self, top: int = 30) -> str:
+        busy = self.samples - self.idle
+        lines = [
+            f"Event loop profile: {self.seconds:.1f}s, {self.samples} samples, "
+            f"{busy} busy ({busy / self.samples:.0%} of the loop's time)" if self.samples else "No samples.",
+            "",
+            f"{'self':>7} {'total':>7}  function (busy samples only)",
+        ]
+        for label, count in self.total_counts.most_common(top):
+            lines.append(f"{self.self_counts[label]:>7} {count:>7}  {label}")
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+async def profile_loop(seconds: float, interval: float = 0.005, max_depth: int = 64) -> ProfileResult:
+    """Sample the stack of the thread running the current event loop for `seconds`."""
+    target = threading.get_ident()
+    stop = threading.Event()
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    stacks: Counter = Counter()
+    totals = [0, 0]  # samples, idle
+
+    def sample() -> None:
+        while not stop.wait(interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            totals[0] += 1
+            if frame.f_code.co_name in _IDLE_FUNCTIONS:
+                totals[1] += 1
+                continue
+            labels: List[str] = []
+            while frame is not None and len(labels) < max_depth:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self_counts[labels[0]] += 1
+            for label in set(labels):
+                total_counts[label] += 1
+            stacks[";".join(reversed(labels))] += 1
+
+    sampler = threading.Thread(target=sample, name="loop-profiler", daemon=True)
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        stop.set()
+        await asyncio.to_thread(sampler.join)
+    return ProfileResult(time.perf_counter() - start, totals[0], totals[1], self_counts, total_counts, stacks)
+
+
+class MemoryTracker:
+    """tracemalloc on demand; each snapshot is diffed against the previous one."""
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._previous = None
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._previous = None
+
+    def snapshot(self, top: int = 25) -> Tuple[str, Optional[str]]:
+        """(top allocation sites, diff against the previous snapshot or None)."""
+        if not tracemalloc.is_tracing():
+            self.start()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1024 ** 2:.1f} MiB (peak {peak / 1024 ** 2:.1f} MiB)", ""]
+        for stat in snapshot.statistics("lineno")[:top]:
+            lines.append(_format_stat(stat.traceback, stat.size, stat.count))
+
+        diff = None
+        if self._previous is not None:
+            diff_lines = ["Change since the previous snapshot", ""]
+            for stat in snapshot.compare_to(self._previous, "lineno")[:top]:
+                diff_lines.append(
+                    f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  "
+                    + _format_stat(stat.traceback, stat.size, stat.count)
+                )
+            diff = "\n".join(diff_lines)
+        self._previous = snapshot
+        return "\n".join(lines), diff
+
+
+def _format_stat(traceback: tracemalloc.Traceback, size: int, count: int) -> str:
+    frame = traceback[0]
+    source = linecache.getline(frame.filename, frame.lineno).strip()
+    return f"{size / 1024:10.1f} KiB {count:8d} blocks  {frame.filename}:{frame.lineno}  {source}"
+
+
+def _task_location(task: asyncio.Task) -> str:
+    stack = task.get_stack(limit=1)
+    if not stack:
+        return "<not started>"
+    frame = stack[-1]
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno}"
+
+
+def _coro_name(task: asyncio.Task) -> str:
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+
+def task_report(top: int = 40) -> Tuple[str, Dict[str, int]]:
+    """Text report and {coroutine: count} of the tasks alive on the running loop."""
+    tasks = asyncio.all_tasks()
+    by_coro = Counter(_coro_name(t) for t in tasks)
+    by_location = Counter((_coro_name(t), _task_location(t)) for t in tasks)
+    views = Counter(type(o).__name__ for o in gc.get_objects() if isinstance(o, discord.ui.View))
+
+    lines = [f"{len(tasks)} asyncio tasks", "", f"{'count':>7}  coroutine"]
+    lines += [f"{n:>7}  {name}" for name, n in by_coro.most_common(top)]
+    lines += ["", f"{'count':>7}  coroutine @ suspended at"]
+    lines += [f"{n:>7}  {name} @ {where}" for (name, where), n in by_location.most_common(top)]
+    lines += ["", f"{sum(views.values())} live views", f"{'count':>7}  view class"]
+    lines += [f"{n:>7}  {name}" for name, n in views.most_common(top)]
+    return "\n".join(lines), dict(by_coro)
@@ -0,0 +1,237 @@
+# invites.py
+"""
+Invite request queue behind the staff dashboard.
+Requests are kept per guild in click order and shown in a single dashboard
+message that is edited in place: the first change after a quiet period is
+published right away, later ones at most once every `debounce` seconds, so
+a burst of clicks costs one edit instead of one message each. Role pings
+are collapsed the same way, one per `ping_window` for all requests that came
+in meanwhile. Pending requests, recently handled ones and the dashboard and
+panel message IDs are kept in a small JSON file across restarts.
+Sending and rendering are left to the `publish`/`ping` callbacks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+from state_file import JsonState
+
+logger = logging.getLogger("bovary_bot.invites")
+
+MessageRef = Tuple[int, int]  # (channel_id, message_id)
+
+PENDING = "pending"
+ACCEPTED = "accepted"
+DENIED = "denied"
+
+
+class InviteRequest(NamedTuple):
+    user_id: int
+    name: str
+    requested_at: float
+    status: str = PENDING
+    handled_by: Optional[int] = None
+    handled_at: Optional[float] = None
+
+
+class GuildInvites:
+    __slots__ = ("pending", "history", "dashboard", "panel", "last_edit", "edit_due",
+                 "last_ping", "ping_due", "unpinged")
+
+    def __init__(self, history: int) -> None:
+        self.pending: "OrderedDict[int, InviteRequest]" = OrderedDict()
+        self.history: Deque[InviteRequest] = deque(maxlen=history)  # newest first
+        self.dashboard: Optional[MessageRef] = None
+        self.panel: Optional[MessageRef] = None
+        self.last_edit = 0.0
+        self.edit_due: Optional[float] = None
+        self.last_ping = 0.0
+        self.ping_due: Optional[float] = None
+        self.unpinged = 0
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "pending": [list(r) for r in self.pending.values()],
+            "history": [list(r) for r in self.history],
+            "dashboard": self.dashboard,
+            "panel": self.panel,
+            "last_ping": self.last_ping,
+        }
+
+    def load_json(self, data: Dict[str, Any]) -> None:
+        for row in data.get("pending", []):
+            request = InviteRequest(*row)
+            self.pending[request.user_id] = request
+        self.history.extend(InviteRequest(*row) for row in data.get("history", []))
+        self.dashboard = tuple(data["dashboard"]) if data.get("dashboard") else None
+        self.panel = tuple(data["panel"]) if data.get("panel") else None
+        self.last_ping = data.get("last_ping", 0.0)
+
+
+class InviteQueue(JsonState):
+    label = "invite queue"
+    task_name = "invite-dashboard"
+
+    def __init__(
+        self,
+        path: Optional[str],
+        *,
+        publish: Callable[[int, GuildInvites], Awaitable[Optional[MessageRef]]],
+        ping: Callable[[int, GuildInvites, int], Awaitable[None]],
+        debounce: float = 5.0,
+        ping_window: float = 300.0,
+        history: int = 10,
+    ):
+        super().__init__(path)
+        self._publish = publish
+        self._ping = ping
+        self.debounce = debounce
+        self.ping_window = ping_window
+        self.history = history
+        self._guilds: Dict[int, GuildInvites] = {}
+        self._wake = asyncio.Event()
+
+        # Counters
+        self.requests = 0
+        self.duplicates = 0
+        self.accepted = 0
+        self.denied = 0
+        self.edits = 0
+        self.pings = 0
+        self.errors = 0
+
+    def guild(self, guild_id: int) -> GuildInvites:
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = GuildInvites(self.history)
+        return state
+
+    # -------- queue --------
+    def is_pending(self, guild_id: int, user_id: int) -> bool:
+        state = self._guilds.get(guild_id)
+        return state is not None and user_id in state.pending
+
+    def add(self, guild_id: int, user_id: int, name: str) -> bool:
+        """Queue a request. Returns False if the user already has one pending."""
+        state = self.guild(guild_id)
+        if user_id in state.pending:
+            self.duplicates += 1
+            return False
+        now = time.time()
+        state.pending[user_id] = InviteRequest(user_id, name, now)
+        self.requests += 1
+
+        state.unpinged += 1
+        if state.ping_due is None:
+            state.ping_due = max(now, state.last_ping + self.ping_window)
+        self.mark_dirty(guild_id)
+        return True
+
+    def resolve(self, guild_id: int, user_id: int, status: str, staff_id: int) -> Optional[InviteRequest]:
+        """Accept or deny a pending request. Returns None if it was already handled."""
+        state = self._guilds.get(guild_id)
+        request = state.pending.pop(user_id, None) if state else None
+        if request is None:
+            return None
+        request = request._replace(status=status, handled_by=staff_id, handled_at=time.time())
+        state.history.appendleft(request)
+        if status == ACCEPTED:
+            self.accepted += 1
+        else:
+            self.denied += 1
+        self.mark_dirty(guild_id)
+        return request
+
+    def mark_dirty(self, guild_id: int) -> None:
+        """Schedule a dashboard edit, no sooner than `debounce` after the previous one."""
+        state = self.guild(guild_id)
+        if state.edit_due is None:
+            state.edit_due = max(time.time(), state.last_edit + self.debounce)
+        self._changed = True
+        self._wake.set()
+
+    def published(self, guild_id: int, message: Optional[MessageRef]) -> None:
+        """Record a dashboard edit made outside the worker (e.g. as an interaction response)."""
+        state = self.guild(guild_id)
+        state.dashboard = message
+        state.last_edit = time.time()
+        state.edit_due = None
+        self.edits += 1
+        self._changed = True
+
+    def set_panel(self, guild_id: int, message: MessageRef) -> None:
+        self.guild(guild_id).panel = message
+        self._changed = True
+        self._wake.set()
+
+    # -------- persistence --------
+    def _load(self, data: Dict[str, Any]) -> None:
+        for guild_id, guild_data in data.items():
+            self.guild(int(guild_id)).load_json(guild_data)
+
+    def _dump(self) -> Dict[str, Any]:
+        return {str(gid): s.to_json() for gid, s in self._guilds.items()}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": sum(len(s.pending) for s in self._guilds.values()),
+            "requests": self.requests,
+            "duplicates": self.duplicates,
+            "accepted": self.accepted,
+            "denied": self.denied,
+            "dashboard_edits": self.edits,
+            "pings": self.pings,
+            "errors": self.errors,
+        }
+
+    # -------- worker --------
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            await self._process_due()
+            await self._save()
+
+            due = [
+                t for s in self._guilds.values() for t in (s.edit_due, s.ping_due) if t is not None
+            ]
+            timeout = max(0.0, min(due) - time.time()) if due else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process_due(self) -> None:
+        now = time.time()
+        for guild_id, state in list(self._guilds.items()):
+            # dashboard first, so the ping can link to it
+            if state.edit_due is not None and state.edit_due <= now:
+                state.edit_due = None
+                state.last_edit = now
+                try:
+                    message = await self._publish(guild_id, state)
+                except Exception:
+                    self.errors += 1
+                    logger.exception("Could not update the invite dashboard of guild %s", guild_id)
+                else:
+                    if message != state.dashboard:
+                        state.dashboard = message
+                        self._changed = True
+                    self.edits += 1
+
+            if state.ping_due is not None and state.ping_due <= now:
+                count, state.unpinged = state.unpinged, 0
+                state.ping_due = None
+                state.last_ping = now
+                self._changed = True
+                try:
+                    await self._ping(guild_id, state, count)
+                    self.pings += 1
+                except Exception:
+                    self.errors += 1
+                    logger.exception("Could not ping staff for invite requests in guild %s", guild_id)
@@ -1,15 +1,107 @@
-from flask import Flask
-from threading import Thread
+"""
+Health server running on the bot's own asyncio loop (aiohttp, no threads).
 
-app = Flask('')
+/         — plain liveness string (for uptime pingers)
+/healthz  — gateway connected, heartbeat latency, age of the last event
+/readyz   — 200 once the bot is ready (guilds received), 503 before
+/metrics  — Prometheus text exposition (when a metrics source is given;
+            with `metrics_token`, only for `Authorization: Bearer <token>`)
+/attachments/<sha256>.<ext>?sig=<hmac> — archived media of deleted posts (when an archive is given)
+"""
 
-@app.route('/')
-def home():
-    return "🤖 O bot está ativo e rodando!"
+from __future__ import annotations
 
-def run():
-    app.run(host='0.0.0.0', port=8080)
+import hmac
+import logging
+import math
+import time
+from typing import Callable, Optional
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
+from aiohttp import web
+import discord
+
+logger = logging.getLogger("bovary_bot.health")
+
+
+class HealthServer:
+    def __init__(
+        self,
+        bot: discord.Client,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        last_event: Optional[Callable[[], Optional[float]]] = None,
+        max_event_age: float = 600.0,
+        metrics_text: Optional[Callable[[], str]] = None,
+        metrics_token: Optional[str] = None,
+        attachment_path: Optional[Callable[[str, str], Optional[str]]] = None,
+    ):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.last_event = last_event or (lambda: None)
+        self.max_event_age = max_event_age
+        self.app = web.Application()
+        self.app.router.add_get("/", self.home)
+        self.app.router.add_get("/healthz", self.healthz)
+        self.app.router.add_get("/readyz", self.readyz)
+        if metrics_text is not None:
+            self.metrics_text = metrics_text
+            self.metrics_token = metrics_token
+            self.app.router.add_get("/metrics", self.metrics)
+        if attachment_path is not None:
+            self.attachment_path = attachment_path
+            self.app.router.add_get("/attachments/{name}", self.attachment)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        logger.info("Health server listening on %s:%d", self.host, self.port)
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def home(self, request: web.Request) -> web.Response:
+        return web.Response(text="🤖 O bot está ativo e rodando!")
+
+    async def healthz(self, request: web.Request) -> web.Response:
+        latency = self.bot.latency
+        connected = not self.bot.is_closed() and math.isfinite(latency)
+        last = self.last_event()
+        event_age = None if last is None else round(time.monotonic() - last, 1)
+        healthy = connected and (event_age is None or event_age < self.max_event_age)
+        return web.json_response(
+            {
+                "status": "ok" if healthy else "unhealthy",
+                "gateway_connected": connected,
+                "heartbeat_latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+                "last_event_age_seconds": event_age,
+            },
+            status=200 if healthy else 503,
+        )
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        if self.metrics_token is not None:
+            given = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(given, f"Bearer {self.metrics_token}"):
+                raise web.HTTPUnauthorized(headers={"WWW-Authenticate": "Bearer"})
+        return web.Response(text=self.metrics_text(), content_type="text/plain", charset="utf-8")
+
+    async def attachment(self, request: web.Request) -> web.StreamResponse:
+        # (name, signature) -> file; a wrong signature looks the same as a missing file
+        path = self.attachment_path(request.match_info["name"], request.query.get("sig", ""))
+        if path is None:
+            raise web.HTTPNotFound()
+        return web.FileResponse(path, headers={"Cache-Control": "private, max-age=31536000, immutable"})
+
+    async def readyz(self, request: web.Request) -> web.Response:
+        ready = self.bot.is_ready() and not self.bot.is_closed()
+        return web.json_response(
+            {"ready": ready, "guilds": len(self.bot.guilds) if ready else 0},
+            status=200 if ready else 503,
+        )
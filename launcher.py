@@ -0,0 +1,214 @@
+# launcher.py
+"""
+Multi-process shard launcher.
+Splits the shard IDs into contiguous ranges, runs one AutoShardedBot worker
+process per range and supervises them: crashed workers are restarted with
+exponential backoff, and the per-shard reports the workers write to
+DATA_DIR/shards/ are aggregated into one log line per shard.
+
+Usage: python launcher.py [--shards N|auto] [--workers W]
+Shared state (cooldowns) goes through the SQLite store in DATA_DIR.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from sharding import shard_ranges
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+)
+logger = logging.getLogger("bovary_bot.launcher")
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+# Identify rate limit: one IDENTIFY per 5 seconds per max_concurrency bucket
+IDENTIFY_INTERVAL_SECONDS = 5.0
+
+RESTART_BACKOFF_MIN = 5.0
+RESTART_BACKOFF_MAX = 300.0
+STABLE_UPTIME_SECONDS = 600.0  # a worker up this long gets its backoff reset
+REPORT_INTERVAL_SECONDS = 60.0
+
+
+def recommended_shards(token: str) -> int:
+    """Ask Discord for the recommended shard count."""
+    request = urllib.request.Request(
+        GATEWAY_BOT_URL,
+        headers={"Authorization": f"Bot {token}", "User-Agent": "BovaryBot launcher"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        data = json.load(response)
+    return int(data["shards"])
+
+
+def run_worker(index: int, shard_ids: List[int], shard_count: int, workers: int) -> None:
+    """Entry point of a worker process: configure sharding, then start bot.py."""
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    os.environ["SHARD_IDS"] = ",".join(map(str, shard_ids))
+    os.environ["WORKER_INDEX"] = str(index)
+    os.environ["WORKER_COUNT"] = str(workers)
+    os.environ["SYNC_COMMANDS"] = "1" if index == 0 else "0"
+    os.environ["COOLDOWN_SHARED"] = "1" if workers > 1 else "0"
+
+    def terminate(*_args) -> None:
+        # let bot.run() close the client (and flush logs/cooldowns) on SIGTERM
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    import bot  # imported after the environment is set: config is read at import
+    bot.main()
+
+
+class Worker:
+    def __init__(self, index: int, shard_ids: List[int]):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF_MIN
+        self.restart_at: Optional[float] = None
+
+
+class Supervisor:
+    def __init__(self, shard_count: int, workers: int, data_dir: str):
+        self.shard_count = shard_count
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers = [Worker(i, ids) for i, ids in enumerate(shard_ranges(shard_count, workers))]
+        self.report_dir = os.path.join(data_dir, "shards")
+        self.stopping = False
+
+    def start_worker(self, worker: Worker) -> None:
+        worker.process = self.ctx.Process(
+            target=run_worker,
+            args=(worker.index, worker.shard_ids, self.shard_count, len(self.workers)),
+            name=f"bovary-worker-{worker.index}",
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        logger.info(
+            "Worker %d started (pid %s) with shards %s",
+            worker.index, worker.process.pid, worker.shard_ids
+        )
+
+    def check_workers(self) -> None:
+        now = time.monotonic()
+        for worker in self.workers:
+            process = worker.process
+            if process is None:
+                continue
+            if process.is_alive():
+                if now - worker.started_at > STABLE_UPTIME_SECONDS:
+                    worker.backoff = RESTART_BACKOFF_MIN
+                continue
+
+            if worker.restart_at is None:
+                if process.exitcode == 0:
+                    logger.info("Worker %d exited cleanly, not restarting", worker.index)
+                    worker.process = None
+                    continue
+                worker.restart_at = now + worker.backoff
+                logger.warning(
+                    "Worker %d (shards %s) died with exit code %s, restarting in %.0fs",
+                    worker.index, worker.shard_ids, process.exitcode, worker.backoff
+                )
+                worker.backoff = min(worker.backoff * 2, RESTART_BACKOFF_MAX)
+            elif now >= worker.restart_at:
+                worker.restarts += 1
+                self.start_worker(worker)
+
+    def report(self) -> None:
+        rows: Dict[int, dict] = {}
+        for path in glob.glob(os.path.join(self.report_dir, "worker-*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for row in data.get("shards", []):
+                rows[row["shard_id"]] = row
+        for shard_id in sorted(rows):
+            row = rows[shard_id]
+            logger.info(
+                "shard %s | latency %s ms | %d events (%.2f/s)",
+                shard_id, row.get("latency_ms"), row.get("events", 0), row.get("events_per_sec", 0.0)
+            )
+        restarts = {w.index: w.restarts for w in self.workers if w.restarts}
+        if restarts:
+            logger.info("worker restarts: %s", restarts)
+
+    def stop(self, *_args) -> None:
+        self.stopping = True
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        for worker in self.workers:
+            if self.stopping:
+                break
+            self.start_worker(worker)
+            # stagger logins so the workers do not fight over IDENTIFY
+            time.sleep(IDENTIFY_INTERVAL_SECONDS * len(worker.shard_ids))
+
+        next_report = time.monotonic() + REPORT_INTERVAL_SECONDS
+        while not self.stopping and any(w.process for w in self.workers):
+            self.check_workers()
+            if time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + REPORT_INTERVAL_SECONDS
+            time.sleep(1.0)
+
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        alive = [w.process for w in self.workers if w.process and w.process.is_alive()]
+        for process in alive:
+            process.terminate()
+        for process in alive:
+            process.join(timeout=15)
+            if process.is_alive():
+                process.kill()
+        logger.info("All workers stopped")
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run the bot across several shard worker processes.")
+    parser.add_argument("--shards", default="auto", help="total shard count, or 'auto' (Discord's recommendation)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    args = parser.parse_args()
+
+    token = os.getenv("TOKEN")
+    if not token:
+        logger.critical("TOKEN not found. Configure it in your environment (.env).")
+        sys.exit(1)
+
+    if args.shards == "auto":
+        shard_count = recommended_shards(token)
+        logger.info("Discord recommends %d shards", shard_count)
+    else:
+        shard_count = int(args.shards)
+
+    Supervisor(shard_count, args.workers, os.getenv("DATA_DIR", "data")).run()
+
+
+if __name__ == "__main__":
+    main()
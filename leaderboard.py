@@ -0,0 +1,210 @@
+# leaderboard.py
+"""
+Reaction leaderboard for the media channels, kept up to date from gateway
+events instead of scanning channel history.
+Media posts are registered from `on_message`; raw reaction add/remove
+events then move two counters per reaction: the post's and its author's,
+both in the bucket of the week (Monday 00:00 UTC) and channel the post
+belongs to. Each post also keeps its count per emoji, so a moderator
+clearing one emoji subtracts exactly what it had added. Posts that were never registered, e.g. older than the index,
+are ignored. `top` answers from these buckets with a heap
+(`heapq.nlargest`), so a query costs O(n log k) over one week and never
+touches the API. Only the posts are saved to a JSON file (periodically and
+on close); the buckets are rebuilt from them on load. Weeks past
+`retention_weeks` are dropped.
+"""
+
+from __future__ import annotations
+
+import heapq
+import time
+from collections import Counter
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from state_file import JsonState
+
+WEEK_SECONDS = 7 * 86400
+_DISCORD_EPOCH_MS = 1420070400000
+# 1970-01-01 was a Thursday: shift so weeks start on Monday
+_WEEK_OFFSET = 3 * 86400
+
+
+def week_of(timestamp: float) -> int:
+    return int((timestamp + _WEEK_OFFSET) // WEEK_SECONDS)
+
+
+def week_start(week: int) -> float:
+    return week * WEEK_SECONDS - _WEEK_OFFSET
+
+
+def snowflake_week(snowflake: int) -> int:
+    return week_of(((snowflake >> 22) + _DISCORD_EPOCH_MS) / 1000)
+
+
+class _Post:
+    __slots__ = ("channel_id", "author_id", "week", "emojis")
+
+    def __init__(self, channel_id: int, author_id: int, week: int) -> None:
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.week = week
+        self.emojis: Optional[Dict[str, int]] = None  # per emoji, for "clear emoji" events
+
+
+class _Bucket:
+    """Counters of one channel in one week."""
+    __slots__ = ("posts", "authors")
+
+    def __init__(self) -> None:
+        self.posts: Dict[int, int] = {}      # message_id -> reactions
+        self.authors: Counter = Counter()    # author_id -> reactions
+
+
+class ReactionLeaderboard(JsonState):
+    label = "reaction leaderboard"
+    task_name = "reaction-leaderboard"
+
+    def __init__(
+        self,
+        path: Optional[str],
+        *,
+        retention_weeks: int = 8,
+        save_interval: float = 60.0,
+    ):
+        super().__init__(path, save_interval=save_interval)
+        self.retention_weeks = retention_weeks
+        self._posts: Dict[int, _Post] = {}
+        self._buckets: Dict[Tuple[int, int], _Bucket] = {}  # (week, channel_id)
+
+        # Counters
+        self.reactions = 0
+        self.ignored = 0
+
+    def _bucket(self, post: _Post) -> _Bucket:
+        key = (post.week, post.channel_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        return bucket
+
+    # -------- updates (gateway handlers) --------
+    def track(self, message_id: int, channel_id: int, author_id: int) -> None:
+        """Register a media post; its reactions are counted from now on."""
+        if message_id in self._posts:
+            return
+        post = self._posts[message_id] = _Post(channel_id, author_id, snowflake_week(message_id))
+        self._bucket(post).posts[message_id] = 0
+        self._changed = True
+
+    def add(self, message_id: int, emoji: str, count: int = 1) -> bool:
+        """Count `count` reactions of `emoji` (negative to remove). Returns False for unknown posts."""
+        post = self._posts.get(message_id)
+        if post is None:
+            self.ignored += 1
+            return False
+        if post.emojis is None:
+            post.emojis = {}
+        current = post.emojis.get(emoji, 0)
+        count = max(-current, count)
+        if current + count:
+            post.emojis[emoji] = current + count
+        else:
+            post.emojis.pop(emoji, None)
+        self._count(post, message_id, count)
+        self.reactions += 1
+        return True
+
+    def _count(self, post: _Post, message_id: int, count: int) -> None:
+        bucket = self._bucket(post)
+        current = bucket.posts.get(message_id, 0)
+        new = max(0, current + count)
+        bucket.posts[message_id] = new
+        bucket.authors[post.author_id] += new - current
+        if bucket.authors[post.author_id] <= 0:
+            del bucket.authors[post.author_id]
+        self._changed = True
+
+    def clear(self, message_id: int, emoji: Optional[str] = None) -> None:
+        """All reactions (or all of one emoji) removed from a post."""
+        post = self._posts.get(message_id)
+        if post is None or not post.emojis:
+            return
+        if emoji is None:
+            removed = sum(post.emojis.values())
+            post.emojis = None
+        else:
+            removed = post.emojis.pop(emoji, 0)
+        if removed:
+            self._count(post, message_id, -removed)
+
+    def discard(self, message_id: int) -> None:
+        """Forget a deleted post."""
+        if message_id not in self._posts:
+            return
+        self.clear(message_id)
+        post = self._posts.pop(message_id)
+        self._bucket(post).posts.pop(message_id, None)
+
+    # -------- queries --------
+    def top(
+        self, channel_ids: Iterable[int], week: int, k: int = 10
+    ) -> Tuple[List[Tuple[int, int, int, int]], List[Tuple[int, int]]]:
+        """(top posts as (message_id, channel_id, author_id, reactions), top authors as (author_id, reactions))."""
+        buckets = [b for b in (self._buckets.get((week, cid)) for cid in channel_ids) if b is not None]
+        posts = heapq.nlargest(
+            k, ((mid, n) for b in buckets for mid, n in b.posts.items() if n > 0), key=itemgetter(1)
+        )
+        if len(buckets) == 1:
+            authors = buckets[0].authors
+        else:
+            authors = Counter()
+            for b in buckets:
+                authors.update(b.authors)
+        top_authors = heapq.nlargest(k, authors.items(), key=itemgetter(1))
+        return [
+            (mid, self._posts[mid].channel_id, self._posts[mid].author_id, n) for mid, n in posts
+        ], top_authors
+
+    def current_week(self) -> int:
+        return week_of(time.time())
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "posts": len(self._posts),
+            "buckets": len(self._buckets),
+            "reaction_events": self.reactions,
+            "ignored_events": self.ignored,
+        }
+
+    # -------- persistence --------
+    def _load(self, data: Dict[str, Any]) -> None:
+        for message_id, channel_id, author_id, emojis in data.get("posts", []):
+            self.track(message_id, channel_id, author_id)
+            if emojis:
+                post = self._posts[message_id]
+                post.emojis = emojis
+                self._count(post, message_id, sum(emojis.values()))
+        self._expire()
+
+    def _dump(self) -> Dict[str, Any]:
+        rows = []
+        for (_, channel_id), bucket in self._buckets.items():
+            for message_id in bucket.posts:
+                post = self._posts[message_id]
+                rows.append((message_id, channel_id, post.author_id, post.emojis))
+        return {"posts": rows}
+
+    async def _save(self) -> None:
+        self._expire()
+        await super()._save()
+
+    def _expire(self) -> None:
+        oldest = self.current_week() - self.retention_weeks + 1
+        expired = [key for key in self._buckets if key[0] < oldest]
+        for key in expired:
+            for message_id in self._buckets.pop(key).posts:
+                self._posts.pop(message_id, None)
+        if expired:
+            self._changed = True
@@ -0,0 +1,242 @@
+# log_dispatcher.py
+"""
+Batched log dispatcher.
+Gateway handlers hand their embeds (or short text lines) to
+`LogDispatcher.submit` and return immediately; a single background worker
+packs them into messages of up to 10 embeds / 6000 characters (text lines
+joined up to 2000 characters) per destination channel and sends them on a
+short timer or as soon as a batch is full.
+With a `LogSpool`, every entry is written ahead to disk and acknowledged
+once Discord accepted it, so entries lost to a restart are resent at the
+next start before anything new.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import discord
+
+from spool import LogSpool
+
+logger = logging.getLogger("bovary_bot.log_dispatcher")
+
+# Discord hard limits for a single message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_CONTENT_CHARS = 2000
+
+LogItem = Union[discord.Embed, str]
+
+
+class _Batch:
+    __slots__ = ("embeds", "lines", "seqs", "embed_chars", "text_chars")
+
+    def __init__(self) -> None:
+        self.embeds: List[discord.Embed] = []
+        self.lines: List[str] = []
+        self.seqs: List[int] = []
+        self.embed_chars = 0
+        self.text_chars = 0
+
+    def __len__(self) -> int:
+        return len(self.embeds) + len(self.lines)
+
+
+class LogDispatcher:
+    """Bounded, batching queue in front of one or more log channels."""
+
+    def __init__(
+        self,
+        channel_getter: Callable[[int], discord.abc.Messageable],
+        *,
+        max_queue: int = 1000,
+        flush_interval: float = 2.0,
+        max_embeds: int = MAX_EMBEDS_PER_MESSAGE,
+        max_chars: int = MAX_EMBED_CHARS_PER_MESSAGE,
+        max_retries: int = 3,
+        spool: Optional[LogSpool] = None,
+    ):
+        self._get_channel = channel_getter
+        self._queue: asyncio.Queue[Tuple[int, LogItem, Optional[int]]] = asyncio.Queue(maxsize=max_queue)
+        self.flush_interval = flush_interval
+        self.max_embeds = max_embeds
+        self.max_chars = max_chars
+        self.max_retries = max_retries
+        self.spool = spool
+        self._pending: Dict[int, _Batch] = {}
+        self._replay: List[Tuple[int, LogItem, Optional[int]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.submitted = 0
+        self.dropped = 0
+        self.sent_embeds = 0
+        self.sent_messages = 0
+        self.failed_embeds = 0
+        self.oversized = 0
+        self.replayed = 0
+
+    # -------- producer side --------
+    def _spool(self, channel_id: int, item: LogItem) -> Optional[int]:
+        if self.spool is None:
+            return None
+        if isinstance(item, str):
+            return self.spool.append(channel_id, text=item)
+        return self.spool.append(channel_id, embed=item.to_dict())
+
+    def submit(self, channel_id: Optional[int], item: LogItem) -> bool:
+        """Queue an embed or a text line without waiting. Returns False (and counts a drop) when full."""
+        if not channel_id:
+            return False
+        if self._queue.full():
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning("Log queue full, %d entries dropped so far", self.dropped)
+            return False
+        self._queue.put_nowait((channel_id, item, self._spool(channel_id, item)))
+        self.submitted += 1
+        return True
+
+    # -------- lifecycle --------
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.is_running():
+            return
+        if self.spool is not None and not self._replay:
+            # entries of a previous run go out first, in their original order
+            for entry in await self.spool.open():
+                item = entry.text if entry.text is not None else discord.Embed.from_dict(entry.embed or {})
+                self._replay.append((entry.channel_id, item, entry.seq))
+            self.spool.start()
+        self._task = asyncio.create_task(self._run(), name="log-dispatcher")
+
+    async def close(self) -> None:
+        """Stop the worker and flush whatever is still queued."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            await self._add_and_maybe_flush(*self._queue.get_nowait())
+        await self._flush_all()
+        if self.spool is not None:
+            await self.spool.close()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() + len(self._replay),
+            "pending": sum(len(b) for b in self._pending.values()),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "sent_embeds": self.sent_embeds,
+            "sent_messages": self.sent_messages,
+            "failed_embeds": self.failed_embeds,
+            "oversized": self.oversized,
+            "replayed": self.replayed,
+        }
+
+    # -------- worker --------
+    async def _run(self) -> None:
+        while self._replay:
+            await self._add_and_maybe_flush(*self._replay.pop(0))
+            self.replayed += 1
+        await self._flush_all()
+
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._add_and_maybe_flush(*await self._queue.get())
+
+            deadline = loop.time() + self.flush_interval
+            while self._pending:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                await self._add_and_maybe_flush(*entry)
+
+            await self._flush_all()
+
+    def _add(self, channel_id: int, item: LogItem, seq: Optional[int]) -> bool:
+        """Append to the channel batch. Returns True if the batch must be flushed first."""
+        batch = self._pending.get(channel_id)
+        if batch is None:
+            batch = self._pending[channel_id] = _Batch()
+        if isinstance(item, str):
+            size = len(item) + 1
+            if batch.lines and batch.text_chars + size > MAX_CONTENT_CHARS:
+                return True
+            batch.lines.append(item[:MAX_CONTENT_CHARS])
+            batch.text_chars += size
+        else:
+            size = len(item)
+            if size > self.max_chars:
+                self.oversized += 1
+            if batch.embeds and (
+                len(batch.embeds) >= self.max_embeds
+                or batch.embed_chars + size > self.max_chars
+            ):
+                return True
+            batch.embeds.append(item)
+            batch.embed_chars += size
+        if seq is not None:
+            batch.seqs.append(seq)
+        return False
+
+    async def _add_and_maybe_flush(self, channel_id: int, item: LogItem, seq: Optional[int]) -> None:
+        if self._add(channel_id, item, seq):
+            await self._flush(channel_id)
+            self._add(channel_id, item, seq)
+        if len(self._pending[channel_id].embeds) >= self.max_embeds:
+            await self._flush(channel_id)
+
+    async def _flush_all(self) -> None:
+        for channel_id in list(self._pending):
+            await self._flush(channel_id)
+
+    def _ack(self, batch: _Batch) -> None:
+        if self.spool is not None and batch.seqs:
+            self.spool.ack(batch.seqs)
+
+    async def _flush(self, channel_id: int) -> None:
+        batch = self._pending.pop(channel_id, None)
+        if not batch:
+            return
+
+        channel = self._get_channel(channel_id)
+        content = "\n".join(batch.lines) or None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await channel.send(content=content, embeds=batch.embeds)
+            except discord.HTTPException as e:
+                # 429s are retried by discord.py itself; anything reaching here
+                # is a real failure or a server error worth one more try.
+                if e.status >= 500 and attempt < self.max_retries:
+                    await asyncio.sleep(attempt)
+                    continue
+                self.failed_embeds += len(batch)
+                if e.status < 500:
+                    self._ack(batch)  # rejected for good; server errors stay spooled for the next start
+                logger.warning("Failed to send %d log entries to %s: %s", len(batch), channel_id, e)
+                return
+            except Exception:
+                # connection lost and the like: stays in the spool and is resent at the next start
+                self.failed_embeds += len(batch)
+                logger.exception("Unexpected error sending log batch to %s", channel_id)
+                return
+            else:
+                self._ack(batch)
+                self.sent_embeds += len(batch)
+                self.sent_messages += 1
+                return
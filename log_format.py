@@ -0,0 +1,200 @@
+# log_format.py
+"""
+Rendering helpers for the message logs.
+- `render_diff`: word-level diff of an edit that shows only the changed
+  regions (~~removed~~ / **added**) with a few words of context. The common
+  prefix/suffix is stripped in linear time and the remaining middle is only
+  word-diffed when it is small; larger middles fall back to a line diff and
+  then to a single replacement, so huge messages cost bounded time.
+- `pack_chunks` / `add_chunked_fields`: split rendered text into field
+  values of at most 1024 characters and spread the fields over as many
+  embeds as needed to respect the 6000-character / 25-field embed limits.
+"""
+
+from __future__ import annotations
+
+import difflib
+import re
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import discord
+
+# Discord embed limits
+FIELD_VALUE_LIMIT = 1024
+EMBED_TOTAL_LIMIT = 6000
+MAX_FIELDS = 25
+
+# Fields per log entry before the rest is summarized (Discord messages are
+# at most 4000 characters, so real edits stay far below this)
+MAX_CHUNKS = 12
+
+# Word diffs above this many changed tokens (before + after) use the fallbacks
+DIFF_TOKEN_BUDGET = 2000
+CONTEXT_WORDS = 6
+CONTEXT_MAX_CHARS = 120
+
+_TOKEN_RE = re.compile(r"\s+|\S+\s*")
+_MARKDOWN_RE = re.compile(r"([*_~`|>\\])")
+
+Segment = Tuple[str, str, str]  # (tag, before text, after text); "equal" carries the after text twice
+
+
+def _escape(text: str) -> str:
+    return _MARKDOWN_RE.sub(r"\\\1", text)
+
+
+def _keys(tokens: Sequence[str]) -> List[str]:
+    # words are compared without their trailing whitespace (reflowed lines are not edits)
+    return [t.rstrip() for t in tokens]
+
+
+def _common_affixes(a: Sequence[str], b: Sequence[str]) -> Tuple[int, int]:
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def _opcodes(a: Sequence[str], b: Sequence[str], key_a: Sequence[str], key_b: Sequence[str]) -> List[Segment]:
+    return [
+        (tag, "".join(b[j1:j2] if tag == "equal" else a[i1:i2]), "".join(b[j1:j2]))
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, key_a, key_b).get_opcodes()
+    ]
+
+
+def diff_segments(before: str, after: str, budget: int = DIFF_TOKEN_BUDGET) -> List[Segment]:
+    a = _TOKEN_RE.findall(before)
+    b = _TOKEN_RE.findall(after)
+    key_a, key_b = _keys(a), _keys(b)
+    prefix, suffix = _common_affixes(key_a, key_b)
+    mid_a = a[prefix:len(a) - suffix]
+    mid_b = b[prefix:len(b) - suffix]
+
+    segments: List[Segment] = []
+    if prefix:
+        text = "".join(b[:prefix])
+        segments.append(("equal", text, text))
+    if len(mid_a) + len(mid_b) <= budget:
+        segments.extend(_opcodes(mid_a, mid_b, _keys(mid_a), _keys(mid_b)))
+    else:
+        lines_a = "".join(mid_a).splitlines(keepends=True)
+        lines_b = "".join(mid_b).splitlines(keepends=True)
+        if len(lines_a) + len(lines_b) <= budget:
+            segments.extend(_opcodes(lines_a, lines_b, _keys(lines_a), _keys(lines_b)))
+        else:
+            segments.append(("replace", "".join(mid_a), "".join(mid_b)))
+    if suffix:
+        text = "".join(b[len(b) - suffix:])
+        segments.append(("equal", text, text))
+    return segments
+
+
+def _mark(text: str, marker: str, limit: int) -> List[str]:
+    """Wrap `text` in a markdown marker line by line, in pieces no longer than `limit`."""
+    pieces: List[str] = []
+    step = max(1, (limit - 2 * len(marker) - 1) // 2)  # escaping can double the length
+    for line in text.split("\n"):
+        core = line.strip()
+        if not core:
+            pieces.append("\n")
+            continue
+        for i in range(0, len(core), step):
+            pieces.append(f"{marker}{_escape(core[i:i + step])}{marker} ")
+        pieces.append("\n")
+    if pieces:
+        pieces.pop()  # no newline after the last line
+    return pieces
+
+
+def _context(text: str, head: bool, tail: bool) -> str:
+    """Escaped context around a change: trailing words of the part before, leading words after."""
+    words = _TOKEN_RE.findall(text)
+    if len(words) <= CONTEXT_WORDS * (head + tail):
+        kept = text
+    elif head and tail:
+        kept = "".join(words[:CONTEXT_WORDS]) + "… " + "".join(words[-CONTEXT_WORDS:])
+    elif tail:
+        kept = "…" + "".join(words[-CONTEXT_WORDS:])
+    else:
+        kept = "".join(words[:CONTEXT_WORDS]) + "…"
+    if len(kept) > CONTEXT_MAX_CHARS:
+        half = CONTEXT_MAX_CHARS // 2
+        kept = kept[:half] + "…" + kept[-half:]
+    return _escape(kept)
+
+
+def render_diff(before: str, after: str, limit: int = FIELD_VALUE_LIMIT) -> List[str]:
+    """Diff as markdown pieces, each at most `limit` characters (feed to `pack_chunks`)."""
+    segments = diff_segments(before, after)
+    pieces: List[str] = []
+    last = len(segments) - 1
+    for index, (tag, old, new) in enumerate(segments):
+        if tag == "equal":
+            # context only next to changes: leading words after one, trailing words before one
+            pieces.append(_context(old, head=index > 0, tail=index < last))
+            continue
+        if tag == "replace":
+            old = old.rstrip()  # the line break, if any, is shown after the replacement
+        if old and tag in ("delete", "replace"):
+            pieces.extend(_mark(old, "~~", limit))
+        if new and tag in ("insert", "replace"):
+            pieces.extend(_mark(new, "**", limit))
+    return pieces
+
+
+def pack_chunks(pieces: Sequence[str], limit: int = FIELD_VALUE_LIMIT) -> List[str]:
+    """Greedily join pieces into strings of at most `limit` characters."""
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if len(piece) > limit:
+            piece = piece[:limit - 1] + "…"
+        if len(current) + len(piece) > limit:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return [c.strip() or "\u200b" for c in chunks]
+
+
+def chunk_text(text: str, limit: int = FIELD_VALUE_LIMIT) -> List[str]:
+    """Split plain text at line/word boundaries into values of at most `limit` characters."""
+    pieces = [
+        token[i:i + limit]
+        for token in _TOKEN_RE.findall(text)
+        for i in range(0, len(token), limit)
+    ]
+    return pack_chunks(pieces, limit) or ["\u200b"]
+
+
+def add_chunked_fields(
+    embed: discord.Embed,
+    name: str,
+    chunks: Sequence[str],
+    continuation: Callable[[], discord.Embed],
+    max_chunks: Optional[int] = MAX_CHUNKS,
+) -> List[discord.Embed]:
+    """Add one field per chunk, starting new embeds (from `continuation()`) when a limit is hit.
+
+    Returns every embed used, `embed` first.
+    """
+    if max_chunks and len(chunks) > max_chunks:
+        omitted = len(chunks) - max_chunks + 1
+        chunks = [*chunks[:max_chunks - 1], f"… {omitted} more part(s) not shown"]
+    embeds = [embed]
+    for i, chunk in enumerate(chunks):
+        field_name = name if i == 0 else f"{name} ({i + 1}/{len(chunks)})"
+        current = embeds[-1]
+        if (
+            len(current.fields) >= MAX_FIELDS
+            or len(current) + len(field_name) + len(chunk) > EMBED_TOTAL_LIMIT
+        ):
+            current = continuation()
+            embeds.append(current)
+        current.add_field(name=field_name, value=chunk, inline=False)
+    return embeds
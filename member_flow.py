@@ -0,0 +1,200 @@
+# member_flow.py
+"""
+Join/leave burst detection.
+Joins and leaves are counted per guild in a sliding window. While the window
+stays below `threshold` every member is still logged on its own; once it is
+crossed the guild switches to burst mode: members are only counted (rate,
+account-age distribution, latest names) and a single summary message is
+published through `publish` and edited at most every `edit_interval`
+seconds. The burst ends after a full quiet window and gets one last edit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("bovary_bot.member_flow")
+
+JOIN = "join"
+LEAVE = "leave"
+
+# Account age buckets for the raid summary (upper bound in seconds)
+ACCOUNT_AGE_BUCKETS: Tuple[Tuple[str, float], ...] = (
+    ("< 1 day", 86400.0),
+    ("< 1 week", 7 * 86400.0),
+    ("< 1 month", 30 * 86400.0),
+    ("< 1 year", 365 * 86400.0),
+    ("older", float("inf")),
+)
+
+MessageRef = Tuple[int, int]  # (channel_id, message_id)
+
+
+def age_bucket(age_seconds: float) -> int:
+    for index, (_, limit) in enumerate(ACCOUNT_AGE_BUCKETS):
+        if age_seconds < limit:
+            return index
+    return len(ACCOUNT_AGE_BUCKETS) - 1
+
+
+class Burst:
+    __slots__ = ("kind", "started_at", "last_at", "count", "ages", "peak", "latest",
+                 "message", "dirty", "ended")
+
+    def __init__(self, kind: str, started_at: float, latest: int) -> None:
+        self.kind = kind
+        self.started_at = started_at
+        self.last_at = started_at
+        self.count = 0
+        self.ages: List[int] = [0] * len(ACCOUNT_AGE_BUCKETS)
+        self.peak = 0                               # most events seen in one window
+        self.latest: Deque[str] = deque(maxlen=latest)
+        self.message: Optional[MessageRef] = None
+        self.dirty = True
+        self.ended = False
+
+    def add(self, at: float, name: str, account_age: Optional[float]) -> None:
+        self.count += 1
+        self.last_at = at
+        if account_age is not None:
+            self.ages[age_bucket(account_age)] += 1
+        self.latest.appendleft(name)
+        self.dirty = True
+
+    @property
+    def young_share(self) -> float:
+        """Share of accounts younger than a week (the usual raid signature)."""
+        known = sum(self.ages)
+        return (self.ages[0] + self.ages[1]) / known if known else 0.0
+
+
+class _Flow:
+    __slots__ = ("events", "burst")
+
+    def __init__(self) -> None:
+        self.events: Deque[Tuple[float, str, Optional[float]]] = deque()  # (at, name, account age)
+        self.burst: Optional[Burst] = None
+
+
+class MemberFlowMonitor:
+    def __init__(
+        self,
+        publish: Callable[[int, Burst, float], Awaitable[Optional[MessageRef]]],
+        *,
+        window: float = 60.0,
+        threshold: int = 10,
+        edit_interval: float = 10.0,
+        latest: int = 10,
+    ):
+        self._publish = publish
+        self.window = window
+        self.threshold = threshold
+        self.edit_interval = edit_interval
+        self.latest = latest
+        self._flows: Dict[Tuple[int, str], _Flow] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.logged = 0
+        self.absorbed = 0
+        self.bursts = 0
+        self.edits = 0
+        self.errors = 0
+
+    # -------- hot path --------
+    def record(self, guild_id: int, kind: str, name: str, created_at: Optional[float] = None) -> bool:
+        """Count a join/leave. Returns True if it should be logged on its own (quiet period)."""
+        now = time.time()
+        flow = self._flows.get((guild_id, kind))
+        if flow is None:
+            flow = self._flows[(guild_id, kind)] = _Flow()
+        self._trim(flow, now)
+        account_age = now - created_at if created_at is not None else None
+        flow.events.append((now, name, account_age))
+
+        burst = flow.burst
+        if burst is None:
+            if len(flow.events) < self.threshold:
+                self.logged += 1
+                return True
+            # the burst summary also covers the events that were already logged one by one
+            burst = flow.burst = Burst(kind, flow.events[0][0], self.latest)
+            for at, earlier, age in flow.events:
+                burst.add(at, earlier, age)
+            self.bursts += 1
+            logger.warning("%s burst in guild %s: %d in %.0fs", kind, guild_id, len(flow.events), self.window)
+            self._wake.set()
+        else:
+            burst.add(now, name, account_age)
+        burst.peak = max(burst.peak, len(flow.events))
+        self.absorbed += 1
+        return False
+
+    def _trim(self, flow: _Flow, now: float) -> None:
+        cutoff = now - self.window
+        events = flow.events
+        while events and events[0][0] < cutoff:
+            events.popleft()
+
+    # -------- lifecycle --------
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="member-flow")
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_bursts": sum(1 for f in self._flows.values() if f.burst is not None),
+            "logged": self.logged,
+            "absorbed": self.absorbed,
+            "bursts": self.bursts,
+            "summary_edits": self.edits,
+            "errors": self.errors,
+        }
+
+    # -------- worker --------
+    async def _run(self) -> None:
+        while True:
+            if not any(f.burst is not None for f in self._flows.values()):
+                self._wake.clear()
+                await self._wake.wait()
+            await self._tick()
+            await asyncio.sleep(self.edit_interval)
+
+    async def _tick(self) -> None:
+        now = time.time()
+        for (guild_id, kind), flow in list(self._flows.items()):
+            self._trim(flow, now)
+            burst = flow.burst
+            if burst is None:
+                if not flow.events:
+                    del self._flows[(guild_id, kind)]
+                continue
+            if now - burst.last_at >= self.window:
+                burst.ended = True
+                burst.dirty = True
+                flow.burst = None
+            if not burst.dirty:
+                continue
+            burst.dirty = False
+            try:
+                burst.message = await self._publish(guild_id, burst, len(flow.events) * 60.0 / self.window)
+                self.edits += 1
+            except Exception:
+                self.errors += 1
+                burst.dirty = not burst.ended
+                logger.exception("Could not publish the %s burst summary of guild %s", kind, guild_id)
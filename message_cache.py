@@ -0,0 +1,137 @@
+# message_cache.py
+"""
+Compact message content cache for the edit/delete logs.
+Keeps only what the logs render (author, channel, content, attachment URLs)
+keyed by message ID, and evicts the oldest entries once the total estimated
+size goes over a byte budget instead of capping the entry count.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import AbstractSet, Iterable, List, Optional, Tuple
+
+# Rough per-entry cost of the object, its slots and the dict slot holding it
+ENTRY_OVERHEAD_BYTES = 240
+
+
+class CachedMessage:
+    __slots__ = (
+        "id", "channel_id", "guild_id", "author_id", "author_name",
+        "avatar_url", "content", "attachments", "size",
+    )
+
+    def __init__(
+        self,
+        id: int,
+        channel_id: int,
+        guild_id: Optional[int],
+        author_id: int,
+        author_name: str,
+        avatar_url: Optional[str],
+        content: str,
+        attachments: Tuple[str, ...] = (),
+    ):
+        self.id = id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.author_name = author_name
+        self.avatar_url = avatar_url
+        self.content = content
+        self.attachments = attachments
+        self.size = self._estimate_size()
+
+    def _estimate_size(self) -> int:
+        size = ENTRY_OVERHEAD_BYTES + len(self.content) + len(self.author_name)
+        if self.avatar_url:
+            size += len(self.avatar_url)
+        for url in self.attachments:
+            size += len(url) + 8
+        return size
+
+    @classmethod
+    def from_message(cls, message) -> "CachedMessage":
+        author = message.author
+        avatar = getattr(author, "display_avatar", None)
+        return cls(
+            id=message.id,
+            channel_id=message.channel.id,
+            guild_id=message.guild.id if message.guild else None,
+            author_id=author.id,
+            author_name=str(author),
+            avatar_url=avatar.url if avatar else None,
+            content=message.content or "",
+            attachments=tuple(a.url for a in message.attachments),
+        )
+
+
+class MessageContentCache:
+    """Insertion-ordered cache bounded by total estimated bytes."""
+
+    def __init__(self, max_bytes: int, ignored_channels: AbstractSet[int] = frozenset()):
+        self.max_bytes = max_bytes
+        self.ignored_channels = ignored_channels
+        self._entries: "OrderedDict[int, CachedMessage]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._entries
+
+    def add(self, entry: CachedMessage) -> None:
+        if entry.channel_id in self.ignored_channels:
+            return
+        old = self._entries.pop(entry.id, None)
+        if old is not None:
+            self.total_bytes -= old.size
+        self._entries[entry.id] = entry
+        self.total_bytes += entry.size
+        self._evict()
+
+    def store(self, message) -> None:
+        """Cache a discord.Message (ignored channels are skipped)."""
+        if message.channel.id in self.ignored_channels:
+            return
+        self.add(CachedMessage.from_message(message))
+
+    def get(self, message_id: int) -> Optional[CachedMessage]:
+        entry = self._entries.get(message_id)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def update_content(self, message_id: int, content: str) -> None:
+        entry = self._entries.get(message_id)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+        entry.content = content
+        entry.size = entry._estimate_size()
+        self.total_bytes += entry.size
+        self._evict()
+
+    def pop(self, message_id: int) -> Optional[CachedMessage]:
+        entry = self._entries.pop(message_id, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.total_bytes -= entry.size
+        return entry
+
+    def pop_many(self, message_ids: Iterable[int]) -> List[CachedMessage]:
+        return [e for e in map(self.pop, message_ids) if e is not None]
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            self.evictions += 1
@@ -0,0 +1,264 @@
+# metrics.py
+"""
+In-process metrics with Prometheus text export.
+- latency histograms and error counters for gateway event handlers, app
+  commands and view callbacks
+- REST instrumentation through an aiohttp TraceConfig (requests, status
+  codes, 429s, network time per route) plus a wrapper around
+  `HTTPClient.request` that measures the time spent waiting on discord.py's
+  rate-limit buckets
+- gauges pulled from other components (`add_collector`)
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextvars
+import functools
+import re
+import time
+import urllib.parse
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import aiohttp
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _labels(labels: Mapping[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (coarse, but cheap)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = defaultdict(dict)
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Tuple[str, Callable[[], Mapping[str, Any]]]] = []
+
+    def describe(self, metric: str, text: str) -> None:
+        self._help[metric] = text
+
+    def inc(self, metric: str, value: float = 1.0, /, **labels: str) -> None:
+        self._counters[metric][_labels(labels)] += value
+
+    def observe(self, metric: str, value: float, /, **labels: str) -> None:
+        series = self._histograms[metric]
+        key = _labels(labels)
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = Histogram()
+        hist.observe(value)
+
+    def add_collector(self, prefix: str, collect: Callable[[], Mapping[str, Any]]) -> None:
+        """Numeric values of `collect()` are exported as gauges named `<prefix>_<key>`."""
+        self._collectors.append((prefix, collect))
+
+    def histograms(self, metric: str) -> Dict[LabelKey, Histogram]:
+        return self._histograms.get(metric, {})
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for name, series in sorted(self._counters.items()):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+        for name, series in sorted(self._histograms.items()):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in series.items():
+                cumulative = 0
+                for bound, n in zip(hist.buckets, hist.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {hist.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+
+        for prefix, collect in self._collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauge = f"{prefix}_{key}"
+                    lines.append(f"# TYPE {gauge} gauge")
+                    lines.append(f"{gauge} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("bovary_handler_latency_seconds", "Handler latency by kind (event/command/view) and name")
+metrics.describe("bovary_handler_errors_total", "Exceptions raised by handlers")
+metrics.describe("discord_http_requests_total", "REST requests by route, method and status")
+metrics.describe("discord_http_rate_limited_total", "429 responses by route")
+metrics.describe("discord_http_retries_total", "Responses discord.py retries (429/5xx) by route")
+metrics.describe("discord_http_request_seconds", "Network time per REST request by route")
+metrics.describe("discord_http_bucket_wait_seconds_total", "Time spent waiting on rate-limit buckets by route")
+
+
+# -------- handler instrumentation --------
+async def _timed(kind: str, name: str, coro: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    start = time.perf_counter()
+    try:
+        return await coro(*args, **kwargs)
+    except Exception:
+        metrics.inc("bovary_handler_errors_total", kind=kind, name=name)
+        raise
+    finally:
+        metrics.observe("bovary_handler_latency_seconds", time.perf_counter() - start, kind=kind, name=name)
+
+
+def instrument_event(coro: Callable[..., Any], event_name: str) -> Callable[..., Any]:
+    """Wrap an event handler coroutine function (used from `Client._run_event`)."""
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await _timed("event", event_name, coro, *args, **kwargs)
+    return wrapper
+
+
+def instrumented(name: str, kind: str = "view") -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator for view/button callbacks (apply below `@discord.ui.button`)."""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await _timed(kind, name, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def timed_command(name: str, coro: Callable[..., Any], /, *args: Any) -> Any:
+    return await _timed("command", name, coro, *args)
+
+
+# -------- REST instrumentation --------
+_SNOWFLAKE_RE = re.compile(r"/\d{15,21}(?=/|$)")
+_TOKEN_RE = re.compile(r"/[A-Za-z0-9_\-.]{60,}(?=/|$)")
+_REACTION_RE = re.compile(r"/reactions/[^/]+")
+
+# seconds of network time for the REST call running in the current task
+_network_time: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "discord_http_network_time", default=None
+)
+
+
+def route_label(path: str) -> str:
+    """/api/v10/channels/123/messages/456 -> /channels/{id}/messages/{id}"""
+    if path.startswith("/api/v"):
+        path = path[path.find("/", 5):]
+    path = _REACTION_RE.sub("/reactions/{emoji}", path)
+    path = _TOKEN_RE.sub("/{token}", path)
+    return _SNOWFLAKE_RE.sub("/{id}", path)
+
+
+def make_http_trace() -> aiohttp.TraceConfig:
+    """TraceConfig for `Client(http_trace=...)`: counts every HTTP attempt, retries included."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_start(session, ctx, params) -> None:
+        ctx.start = time.perf_counter()
+
+    async def on_end(session, ctx, params) -> None:
+        elapsed = time.perf_counter() - ctx.start
+        route = route_label(params.url.path)
+        status = params.response.status
+        metrics.inc("discord_http_requests_total", route=route, method=params.method, status=str(status))
+        metrics.observe("discord_http_request_seconds", elapsed, route=route)
+        if status == 429:
+            metrics.inc("discord_http_rate_limited_total", route=route)
+        if status == 429 or status >= 500:
+            metrics.inc("discord_http_retries_total", route=route)
+        acc = _network_time.get()
+        if acc is not None:
+            acc[0] += elapsed
+
+    async def on_exception(session, ctx, params) -> None:
+        route = route_label(params.url.path)
+        metrics.inc("discord_http_requests_total", route=route, method=params.method, status="error")
+        acc = _network_time.get()
+        if acc is not None:
+            acc[0] += time.perf_counter() - ctx.start
+
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    trace.on_request_exception.append(on_exception)
+    return trace
+
+
+def instrument_http_request(request: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap `HTTPClient.request`: total time minus network time = bucket wait."""
+    @functools.wraps(request)
+    async def wrapper(route: Any, **kwargs: Any) -> Any:
+        acc = [0.0]
+        token = _network_time.set(acc)
+        start = time.perf_counter()
+        try:
+            return await request(route, **kwargs)
+        finally:
+            _network_time.reset(token)
+            waited = time.perf_counter() - start - acc[0]
+            if waited > 0.001:
+                metrics.inc(
+                    "discord_http_bucket_wait_seconds_total", waited,
+                    route=route_label(urllib.parse.urlsplit(route.url).path)
+                )
+    return wrapper
+
+
+def summary_lines(limit: int = 15) -> Iterable[str]:
+    """Human-readable p50/p99 per handler for the admin command."""
+    rows = []
+    for key, hist in metrics.histograms("bovary_handler_latency_seconds").items():
+        labels = dict(key)
+        rows.append((hist.quantile(0.99), f"{labels['kind']}:{labels['name']}", hist))
+    rows.sort(key=lambda r: (r[0], r[2].count), reverse=True)
+    for p99, name, hist in rows[:limit]:
+        yield f"{name:<32} n={hist.count:<7} p50≤{hist.quantile(0.5) * 1000:g}ms p99≤{p99 * 1000:g}ms"
@@ -0,0 +1,219 @@
+# reaction_scheduler.py
+"""
+Auto-reaction scheduler.
+`on_message` only enqueues the message; one short-lived worker per channel
+adds the reactions at most one every `min_interval` seconds, waiting out
+the Retry-After of a 429 before retrying, so channels run in parallel and
+the gateway handler never waits on the REST API. The X-RateLimit bucket
+headers themselves are handled inside discord.py's HTTP client.
+Messages deleted before their turn are dropped from the queue.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import discord
+
+logger = logging.getLogger("bovary_bot.reactions")
+
+
+def _percentile(samples: Sequence[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class _ChannelBucket:
+    __slots__ = ("pending", "current", "current_cancelled", "next_allowed", "worker")
+
+    def __init__(self) -> None:
+        self.pending: "OrderedDict[int, Tuple[discord.Message, Tuple[str, ...], float]]" = OrderedDict()
+        self.current: Optional[int] = None
+        self.current_cancelled = False
+        self.next_allowed = 0.0
+        self.worker: Optional[asyncio.Task] = None
+
+
+class ReactionScheduler:
+    """Per-channel reaction queues drained concurrently across channels."""
+
+    def __init__(
+        self,
+        emojis: Iterable[str],
+        *,
+        min_interval: float = 0.25,
+        max_pending_per_channel: int = 200,
+        max_retries: int = 3,
+        latency_samples: int = 512,
+    ):
+        self.emojis: Tuple[str, ...] = tuple(emojis)
+        self.min_interval = min_interval
+        self.max_pending_per_channel = max_pending_per_channel
+        self.max_retries = max_retries
+        self._buckets: Dict[int, _ChannelBucket] = {}
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self._closed = False
+
+        # Counters
+        self.scheduled = 0
+        self.coalesced = 0
+        self.skipped_deleted = 0
+        self.dropped = 0
+        self.reactions_added = 0
+        self.reaction_errors = 0
+        self.rate_limited = 0
+
+    # -------- producer side --------
+    def schedule(self, message: discord.Message, emojis: Optional[Iterable[str]] = None) -> bool:
+        """Queue reactions for a message. Returns False if dropped or already queued."""
+        if self._closed:
+            return False
+        bucket = self._buckets.get(message.channel.id)
+        if bucket is None:
+            bucket = self._buckets[message.channel.id] = _ChannelBucket()
+
+        if message.id in bucket.pending or message.id == bucket.current:
+            self.coalesced += 1
+            return False
+        if len(bucket.pending) >= self.max_pending_per_channel:
+            self.dropped += 1
+            return False
+
+        # `emojis` overrides the default set (e.g. to add only the missing ones)
+        bucket.pending[message.id] = (
+            message,
+            self.emojis if emojis is None else tuple(emojis),
+            time.monotonic(),
+        )
+        self.scheduled += 1
+
+        if bucket.worker is None or bucket.worker.done():
+            bucket.worker = asyncio.create_task(
+                self._drain(message.channel.id, bucket),
+                name=f"reactions-{message.channel.id}"
+            )
+        return True
+
+    def discard(self, channel_id: int, message_id: int) -> None:
+        """Forget a message that was deleted before (or while) being reacted to."""
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            return
+        if bucket.pending.pop(message_id, None) is not None:
+            self.skipped_deleted += 1
+        elif bucket.current == message_id:
+            bucket.current_cancelled = True
+
+    # -------- lifecycle --------
+    async def close(self) -> None:
+        self._closed = True
+        workers = [b.worker for b in self._buckets.values() if b.worker and not b.worker.done()]
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        latencies = list(self._latencies)
+        return {
+            "queue_depth": sum(len(b.pending) for b in self._buckets.values()),
+            "active_channels": sum(1 for b in self._buckets.values() if b.worker and not b.worker.done()),
+            "scheduled": self.scheduled,
+            "coalesced": self.coalesced,
+            "skipped_deleted": self.skipped_deleted,
+            "dropped": self.dropped,
+            "reactions_added": self.reactions_added,
+            "reaction_errors": self.reaction_errors,
+            "rate_limited": self.rate_limited,
+            "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+            "latency_p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        }
+
+    def depth(self, channel_id: int) -> int:
+        bucket = self._buckets.get(channel_id)
+        return len(bucket.pending) if bucket else 0
+
+    def pending_ids(self, channel_id: int) -> List[int]:
+        """Messages of a channel not fully reacted to yet (queued or in progress)."""
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            return []
+        ids = list(bucket.pending)
+        if bucket.current is not None:
+            ids.append(bucket.current)
+        return ids
+
+    # -------- worker --------
+    async def _drain(self, channel_id: int, bucket: _ChannelBucket) -> None:
+        try:
+            while bucket.pending:
+                message_id, (message, emojis, enqueued) = bucket.pending.popitem(last=False)
+                bucket.current = message_id
+                bucket.current_cancelled = False
+                await self._react(bucket, message, emojis)
+                bucket.current = None
+                self._latencies.append(time.monotonic() - enqueued)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Reaction worker for channel %s crashed", channel_id)
+        finally:
+            bucket.current = None
+
+    async def _react(
+        self,
+        bucket: _ChannelBucket,
+        message: discord.Message,
+        emojis: Tuple[str, ...]
+    ) -> None:
+        for emoji in emojis:
+            attempt = 0
+            while True:
+                if bucket.current_cancelled:
+                    self.skipped_deleted += 1
+                    return
+
+                delay = bucket.next_allowed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                attempt += 1
+                try:
+                    await message.add_reaction(emoji)
+                except discord.NotFound:
+                    # message deleted (or emoji gone): nothing left to do for it
+                    self.skipped_deleted += 1
+                    return
+                except discord.Forbidden:
+                    self.reaction_errors += 1
+                    return
+                except discord.HTTPException as e:
+                    if e.status == 429:
+                        self.rate_limited += 1
+                        # wait out the bucket, then try the same emoji again
+                        bucket.next_allowed = time.monotonic() + _retry_after(e)
+                        if attempt <= self.max_retries:
+                            continue
+                    else:
+                        bucket.next_allowed = time.monotonic() + self.min_interval
+                    self.reaction_errors += 1
+                    break
+                else:
+                    self.reactions_added += 1
+                    bucket.next_allowed = time.monotonic() + self.min_interval
+                    break
+
+def _retry_after(error: discord.HTTPException) -> float:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After", 1.0))
+    except (TypeError, ValueError):
+        return 1.0
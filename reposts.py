@@ -0,0 +1,337 @@
+# reposts.py
+"""
+Repost index for the media channels.
+Every media post is reduced to cheap fingerprints. For attachments that is
+size, dimensions and the normalized filename (lowercase, no "(1)" / "copy"
+suffixes, jpeg == jpg). For linked media it is the URL without its query.
+The fingerprints are looked up in a bounded LRU dict, so a repost of the
+same file is found in O(1) from the gateway payload alone.
+Optionally (Pillow installed, `perceptual=True`) a small thumbnail of each
+image is fetched from the media proxy and a 64-bit difference hash is
+computed in a process pool, off the event loop. Hashes are indexed in
+four 16-bit bands: a hash within Hamming distance 3 shares at least one
+band, so near-duplicates (resized, re-encoded) are also found without a
+scan. Those matches arrive later, through `on_repost`.
+Originals and flagged reposts are saved to a JSON file periodically and on
+close.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from state_file import JsonState
+
+try:
+    from PIL import Image
+except ImportError:  # perceptual hashing is optional
+    Image = None
+
+logger = logging.getLogger("bovary_bot.reposts")
+
+HASH_BANDS = 4
+_BAND_BITS = 64 // HASH_BANDS
+_THUMBNAIL_SIZE = 64
+_MAX_THUMBNAIL_BYTES = 512 * 1024
+
+_COPY_SUFFIX_RE = re.compile(r"(?:[\s_-]*(?:\(\d+\)|copy|copia|c[oó]pia))+$", re.IGNORECASE)
+_EXT_ALIASES = {"jpeg": "jpg", "jpe": "jpg", "gifv": "gif", "m4v": "mp4"}
+
+
+class Post(NamedTuple):
+    message_id: int
+    channel_id: int
+    guild_id: int
+    author_id: int
+
+
+class MediaFile(NamedTuple):
+    """What the gateway tells us about one attachment."""
+    filename: str
+    size: int
+    width: Optional[int]
+    height: Optional[int]
+    proxy_url: Optional[str] = None   # set for images, used for the perceptual hash
+
+
+def normalize_filename(filename: str) -> str:
+    stem, dot, ext = filename.lower().rpartition(".")
+    if not dot:
+        stem, ext = ext, ""
+    stem = _COPY_SUFFIX_RE.sub("", stem.replace(" ", "_")) or stem
+    return f"{stem}.{_EXT_ALIASES.get(ext, ext)}" if ext else stem
+
+
+def file_fingerprint(media: MediaFile) -> str:
+    return f"f:{media.size}:{media.width or 0}x{media.height or 0}:{normalize_filename(media.filename)}"
+
+
+def url_fingerprint(url: str) -> str:
+    parts = urlsplit(url)
+    return f"u:{(parts.hostname or '').lower()}{parts.path}"
+
+
+def difference_hash(data: bytes) -> int:
+    """64-bit dHash of an image (runs in the process pool)."""
+    with Image.open(io.BytesIO(data)) as image:
+        pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def _bands(value: int) -> List[int]:
+    mask = (1 << _BAND_BITS) - 1
+    return [(value >> (i * _BAND_BITS)) & mask for i in range(HASH_BANDS)]
+
+
+def _thumbnail_url(proxy_url: str) -> str:
+    separator = "&" if "?" in proxy_url else "?"
+    return f"{proxy_url}{separator}width={_THUMBNAIL_SIZE}&height={_THUMBNAIL_SIZE}"
+
+
+class RepostIndex(JsonState):
+    label = "repost index"
+    task_name = "repost-index"
+
+    def __init__(
+        self,
+        path: Optional[str],
+        *,
+        on_repost: Callable[[Post, Post, int], Awaitable[None]],
+        max_entries: int = 50000,
+        perceptual: bool = False,
+        processes: int = 1,
+        max_distance: int = 3,
+        max_queue: int = 200,
+        allowed_hosts: Optional[Iterable[str]] = None,
+        save_interval: float = 60.0,
+    ):
+        super().__init__(path, save_interval=save_interval)
+        self._on_repost = on_repost
+        self.max_entries = max_entries
+        self.perceptual = perceptual and Image is not None
+        self.processes = processes
+        self.max_distance = min(max_distance, HASH_BANDS - 1)  # what the bands can guarantee
+        self.allowed_hosts = frozenset(allowed_hosts) if allowed_hosts is not None else None
+        if perceptual and Image is None:
+            logger.warning("Pillow is not installed: repost detection uses file metadata only")
+
+        self._keys: "OrderedDict[str, Post]" = OrderedDict()     # fingerprint -> original, LRU first
+        self._hashes: "OrderedDict[int, Post]" = OrderedDict()   # dHash -> original, LRU first
+        self._bands: List[Dict[int, Set[int]]] = [{} for _ in range(HASH_BANDS)]
+        self._flagged: "OrderedDict[int, Post]" = OrderedDict()  # repost message_id -> original
+        self._owned: "OrderedDict[int, List[Any]]" = OrderedDict()  # original message_id -> its keys/hashes
+        self._queue: asyncio.Queue[Tuple[Post, str]] = asyncio.Queue(maxsize=max_queue)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._workers: List[asyncio.Task] = []
+
+        # Counters
+        self.checked = 0
+        self.reposts = 0
+        self.perceptual_reposts = 0
+        self.hashed = 0
+        self.hash_errors = 0
+        self.dropped = 0
+
+    # -------- lookups (gateway handlers) --------
+    def flagged(self, message_id: int) -> Optional[Post]:
+        """Original of a message already flagged as a repost."""
+        return self._flagged.get(message_id)
+
+    def check(self, post: Post, files: Iterable[MediaFile], urls: Iterable[str] = ()) -> Optional[Post]:
+        """Original of `post` if one of its fingerprints was seen before, else index them."""
+        self.checked += 1
+        keys = [file_fingerprint(f) for f in files if f.size] + [url_fingerprint(u) for u in urls]
+        for key in keys:
+            original = self._keys.get(key)
+            if original is not None and original.message_id != post.message_id:
+                self._keys.move_to_end(key)
+                self._flag(post, original)
+                return original
+        for key in keys:
+            if key not in self._keys:
+                self._own(post.message_id, key)
+            self._keys[key] = post
+            self._keys.move_to_end(key)
+        while len(self._keys) > self.max_entries:
+            self._keys.popitem(last=False)
+        if keys:
+            self._changed = True
+        return None
+
+    def submit_hash(self, post: Post, files: Iterable[MediaFile]) -> int:
+        """Queue images for the perceptual hash. Returns how many were queued."""
+        if not self.perceptual:
+            return 0
+        queued = 0
+        for media in files:
+            if not media.proxy_url or not self._allowed(media.proxy_url):
+                continue
+            try:
+                self._queue.put_nowait((post, _thumbnail_url(media.proxy_url)))
+                queued += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+        return queued
+
+    def discard(self, message_id: int) -> None:
+        """A deleted original no longer makes later posts reposts."""
+        self._flagged.pop(message_id, None)
+        for key in self._owned.pop(message_id, ()):
+            index = self._hashes if isinstance(key, int) else self._keys
+            post = index.get(key)
+            if post is not None and post.message_id == message_id:
+                del index[key]
+                if index is self._hashes:
+                    self._unband(key)
+
+    def _own(self, message_id: int, key: Any) -> None:
+        # entries evicted from the LRU dicts may stay listed here; discard() checks
+        keys = self._owned.get(message_id)
+        if keys is None:
+            keys = self._owned[message_id] = []
+            while len(self._owned) > self.max_entries:
+                self._owned.popitem(last=False)
+        keys.append(key)
+
+    def _allowed(self, url: str) -> bool:
+        return self.allowed_hosts is None or urlsplit(url).hostname in self.allowed_hosts
+
+    def _flag(self, post: Post, original: Post) -> None:
+        self.reposts += 1
+        self._flagged[post.message_id] = original
+        while len(self._flagged) > self.max_entries:
+            self._flagged.popitem(last=False)
+        self._changed = True
+
+    # -------- perceptual hashes --------
+    def _nearest(self, value: int) -> Optional[Tuple[Post, int]]:
+        best: Optional[Tuple[Post, int]] = None
+        candidates: Set[int] = set()
+        for band, part in zip(self._bands, _bands(value)):
+            candidates |= band.get(part, set())
+        for candidate in candidates:
+            distance = bin(candidate ^ value).count("1")
+            if distance <= self.max_distance and (best is None or distance < best[1]):
+                best = (self._hashes[candidate], distance)
+        return best
+
+    def _add_hash(self, value: int, post: Post) -> None:
+        if value not in self._hashes:
+            for band, part in zip(self._bands, _bands(value)):
+                band.setdefault(part, set()).add(value)
+        self._hashes[value] = post
+        self._hashes.move_to_end(value)
+        self._own(post.message_id, value)
+        while len(self._hashes) > self.max_entries:
+            old, _ = self._hashes.popitem(last=False)
+            self._unband(old)
+        self._changed = True
+
+    def _unband(self, value: int) -> None:
+        for band, part in zip(self._bands, _bands(value)):
+            members = band.get(part)
+            if members is not None:
+                members.discard(value)
+                if not members:
+                    del band[part]
+
+    async def _hash_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            post, url = await self._queue.get()
+            try:
+                async with self._session.get(url) as response:
+                    if response.status != 200 or (response.content_length or 0) > _MAX_THUMBNAIL_BYTES:
+                        self.hash_errors += 1
+                        continue
+                    data = await response.read()
+                value = await loop.run_in_executor(self._pool, difference_hash, data)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+                self.hash_errors += 1
+                logger.debug("Could not hash %s: %s", url, e)
+                continue
+            except Exception:
+                self.hash_errors += 1
+                logger.exception("Unexpected error hashing %s", url)
+                continue
+            self.hashed += 1
+            if post.message_id in self._flagged:
+                continue
+            match = self._nearest(value)
+            if match is None or match[0].message_id == post.message_id:
+                self._add_hash(value, post)
+                continue
+            original, distance = match
+            self.perceptual_reposts += 1
+            self._flag(post, original)
+            try:
+                await self._on_repost(post, original, distance)
+            except Exception:
+                logger.exception("Repost callback failed for message %s", post.message_id)
+
+    # -------- lifecycle --------
+    def start(self) -> None:
+        super().start()
+        if self.perceptual and not self._workers:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+            for i in range(self.processes * 2):
+                self._workers.append(asyncio.create_task(self._hash_worker(), name=f"repost-hash-{i}"))
+
+    async def close(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._session:
+            await self._session.close()
+            self._session = None
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        await super().close()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "fingerprints": len(self._keys),
+            "hashes": len(self._hashes),
+            "hash_queue": self._queue.qsize(),
+            "checked": self.checked,
+            "reposts": self.reposts,
+            "perceptual_reposts": self.perceptual_reposts,
+            "hashed": self.hashed,
+            "hash_errors": self.hash_errors,
+            "dropped": self.dropped,
+        }
+
+    # -------- persistence --------
+    def _load(self, data: Dict[str, Any]) -> None:
+        for key, *post in data.get("keys", []):
+            self._keys[key] = Post(*post)
+            self._own(post[0], key)
+        for value, *post in data.get("hashes", []):
+            self._add_hash(value, Post(*post))
+        for message_id, *post in data.get("flagged", []):
+            self._flagged[message_id] = Post(*post)
+
+    def _dump(self) -> Dict[str, Any]:
+        return {
+            "keys": [[key, *post] for key, post in self._keys.items()],
+            "hashes": [[value, *post] for value, post in self._hashes.items()],
+            "flagged": [[message_id, *post] for message_id, post in self._flagged.items()],
+        }
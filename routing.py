@@ -0,0 +1,182 @@
+# routing.py
+"""
+Per-guild routing configuration.
+The JSON file is compiled into an immutable `RoutingTable` (frozensets and
+read-only dicts keyed by channel/guild ID) so handlers route in O(1).
+`RoutingConfig` polls the file and swaps in a new table atomically when it
+changes; a broken file is logged and the previous table kept.
+
+File format (all keys optional; "default" applies to unlisted guilds):
+{
+  "default": {"media_channels": [...], "log_channel": 1, ...},
+  "guilds": {"<guild id>": {"media_channels": [...], "message_log_channel": 2, ...}}
+}
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("bovary_bot.routing")
+
+
+class GuildRoutes(NamedTuple):
+    log_channel: Optional[int] = None           # join/leave/channel logs
+    message_log_channel: Optional[int] = None   # message delete/edit logs
+    staff_log_channel: Optional[int] = None     # invite requests
+    invite_channel: Optional[int] = None        # where /invitepanel may be used
+    crew_leader_role: Optional[int] = None      # pinged on invite requests
+
+
+def _id(value: Any) -> Optional[int]:
+    return int(value) if value not in (None, "", 0, "0") else None
+
+
+def _ids(values: Any) -> Tuple[int, ...]:
+    return tuple(int(v) for v in (values or ()))
+
+
+class RoutingTable:
+    """Immutable lookup tables compiled from the routing config."""
+
+    __slots__ = ("media_channels", "ignored_channels", "log_channels", "guilds", "default", "source")
+
+    def __init__(
+        self,
+        media_channels: frozenset,
+        ignored_channels: frozenset,
+        guilds: Mapping[int, GuildRoutes],
+        default: GuildRoutes,
+        source: str = "<defaults>",
+    ):
+        self.media_channels = media_channels
+        self.ignored_channels = ignored_channels
+        self.guilds = MappingProxyType(dict(guilds))
+        self.default = default
+        self.source = source
+        self.log_channels = frozenset(
+            c for r in (default, *self.guilds.values())
+            for c in (r.log_channel, r.message_log_channel, r.staff_log_channel) if c
+        )
+
+    @classmethod
+    def compile(cls, config: Mapping[str, Any], source: str = "<defaults>") -> "RoutingTable":
+        media: List[int] = []
+        ignored: List[int] = []
+
+        def routes(section: Mapping[str, Any]) -> GuildRoutes:
+            media.extend(_ids(section.get("media_channels")))
+            ignored.extend(_ids(section.get("ignore_channels")))
+            return GuildRoutes(*(_id(section.get(field)) for field in GuildRoutes._fields))
+
+        default = routes(config.get("default") or {})
+        guilds: Dict[int, GuildRoutes] = {}
+        for guild_id, section in (config.get("guilds") or {}).items():
+            merged = {**(config.get("default") or {}), **section}
+            guilds[int(guild_id)] = routes(merged)
+        return cls(frozenset(media), frozenset(ignored), guilds, default, source)
+
+    def routes_for(self, guild_id: Optional[int]) -> GuildRoutes:
+        return self.guilds.get(guild_id, self.default) if guild_id else self.default
+
+    def is_media_channel(self, channel_id: int) -> bool:
+        return channel_id in self.media_channels
+
+    def is_ignored(self, channel_id: int) -> bool:
+        return channel_id in self.ignored_channels
+
+    def log_channel(self, guild_id: Optional[int]) -> Optional[int]:
+        return self.routes_for(guild_id).log_channel
+
+    def message_log_channel(self, guild_id: Optional[int]) -> Optional[int]:
+        return self.routes_for(guild_id).message_log_channel
+
+    def staff_log_channel(self, guild_id: Optional[int]) -> Optional[int]:
+        return self.routes_for(guild_id).staff_log_channel
+
+
+class RoutingConfig:
+    """Holds the current table and hot-reloads it from `path`."""
+
+    def __init__(self, path: Optional[str], defaults: Mapping[str, Any]):
+        self.path = path
+        self.defaults = defaults
+        self.table = RoutingTable.compile(defaults)
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._listeners: List[Callable[[RoutingTable], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def on_reload(self, listener: Callable[[RoutingTable], None]) -> None:
+        self._listeners.append(listener)
+        listener(self.table)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read(self) -> RoutingTable:
+        with open(self.path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return RoutingTable.compile(config, source=self.path)
+
+    def _swap(self, table: RoutingTable) -> None:
+        self.table = table  # single reference assignment: handlers see old or new, never half
+        for listener in self._listeners:
+            listener(table)
+        logger.info(
+            "Routing loaded from %s: %d guilds, %d media channels",
+            table.source, len(table.guilds), len(table.media_channels)
+        )
+
+    def _load_if_changed(self) -> Optional[RoutingTable]:
+        stamp = self._stat() if self.path else None
+        if stamp is None or stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            return self._read()
+        except (OSError, ValueError, TypeError) as e:
+            logger.error("Invalid routing config %s, keeping previous table: %s", self.path, e)
+            return None
+
+    def load(self) -> bool:
+        """Synchronous load, used at import time. Returns True if a new table was swapped in."""
+        table = self._load_if_changed()
+        if table is not None:
+            self._swap(table)
+        return table is not None
+
+    async def reload(self) -> bool:
+        table = await asyncio.to_thread(self._load_if_changed)
+        if table is not None:
+            self._swap(table)
+        return table is not None
+
+    def start(self, interval: float = 5.0) -> None:
+        if self.path and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._watch(interval), name="routing-watch")
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Routing reload failed")
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,119 @@
+# sharding.py
+"""
+Per-shard runtime statistics and shard-range helpers.
+Each worker process counts the events it dispatches per shard (attributed
+through the event's guild ID) and periodically logs them together with the
+shard heartbeat latency; the report is also written to a small JSON file so
+the launcher's supervisor can aggregate every worker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import discord
+
+from state_file import write_json
+
+logger = logging.getLogger("bovary_bot.sharding")
+
+
+def shard_for_guild(guild_id: Optional[int], shard_count: int) -> int:
+    """Discord's routing formula; DMs (no guild) always go to shard 0."""
+    if not guild_id or shard_count <= 1:
+        return 0
+    return (guild_id >> 22) % shard_count
+
+
+def shard_ranges(shard_count: int, workers: int) -> List[List[int]]:
+    """Split shard IDs into `workers` contiguous, near-equal ranges."""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def _event_guild_id(obj: Any) -> Optional[int]:
+    guild_id = getattr(obj, "guild_id", None)
+    if guild_id is not None:
+        return guild_id
+    guild = getattr(obj, "guild", None)
+    return getattr(guild, "id", None)
+
+
+class ShardStats:
+    """Event counters per shard for one worker process."""
+
+    def __init__(self, shard_count: int = 1):
+        self.shard_count = shard_count
+        self.gateway_events = 0
+        self.last_event_at: Optional[float] = None
+        self._events: Counter = Counter()
+        self._last_events: Counter = Counter()
+        self._last_report = time.monotonic()
+
+    def record(self, event_name: str, args: tuple) -> None:
+        if event_name == "socket_event_type":
+            self.gateway_events += 1
+            self.last_event_at = time.monotonic()
+            return
+        guild_id = _event_guild_id(args[0]) if args else None
+        self._events[shard_for_guild(guild_id, self.shard_count)] += 1
+
+    def snapshot(self, bot: discord.Client) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        elapsed = max(now - self._last_report, 1e-6)
+        if isinstance(bot, discord.AutoShardedClient):
+            latencies = dict(bot.latencies)
+        else:
+            latencies = {bot.shard_id or 0: bot.latency}
+
+        rows = []
+        for shard_id in sorted(set(latencies) | set(self._events)):
+            total = self._events[shard_id]
+            latency = latencies.get(shard_id)
+            rows.append({
+                "shard_id": shard_id,
+                "latency_ms": round(latency * 1000, 1) if latency and latency != float("inf") else None,
+                "events": total,
+                "events_per_sec": round((total - self._last_events[shard_id]) / elapsed, 2),
+            })
+        self._last_events = self._events.copy()
+        self._last_report = now
+        return rows
+
+
+async def run_shard_reporter(
+    bot: discord.Client,
+    stats: ShardStats,
+    interval: float,
+    report_path: Optional[str] = None,
+) -> None:
+    """Log (and optionally write to `report_path`) the per-shard stats every `interval` seconds."""
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        await asyncio.sleep(interval)
+        rows = stats.snapshot(bot)
+        for row in rows:
+            logger.info(
+                "shard %s | latency %s ms | %d events (%.2f/s)",
+                row["shard_id"], row["latency_ms"], row["events"], row["events_per_sec"]
+            )
+        if report_path:
+            try:
+                await asyncio.to_thread(_write_report, report_path, rows, stats.gateway_events)
+            except OSError:
+                logger.warning("Could not write shard report to %s", report_path)
+
+
+def _write_report(path: str, rows: List[Dict[str, Any]], gateway_events: int) -> None:
+    write_json(path, {"pid": os.getpid(), "time": time.time(), "gateway_events": gateway_events, "shards": rows})
@@ -0,0 +1,195 @@
+# spool.py
+"""
+Write-ahead spool for outbound log messages.
+Every log entry is appended to a local JSON-lines file before it is queued
+for sending and acknowledged once Discord accepted it; entries still
+unacknowledged at startup (crash, restart, lost connection) are replayed in
+their original order. Appends and acks only touch an in-memory buffer on the
+event loop; a background task writes the buffer and fsyncs it in one batch
+every `fsync_interval` seconds from a worker thread, and rewrites the file
+with just the pending entries once it has grown past `compact_bytes`.
+
+Line format: {"s": seq, "c": channel_id, "t": text} or {"s": seq, "c": channel_id, "e": embed}
+for entries, {"a": [seq, ...]} for acknowledgements.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, TextIO, Tuple
+
+logger = logging.getLogger("bovary_bot.spool")
+
+
+class SpoolEntry(NamedTuple):
+    seq: int
+    channel_id: int
+    text: Optional[str]
+    embed: Optional[Dict[str, Any]]
+
+
+class LogSpool:
+    def __init__(self, path: str, *, fsync_interval: float = 0.5, compact_bytes: int = 4 * 1024 * 1024):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.compact_bytes = compact_bytes
+        self._seq = 0
+        self._pending: Dict[int, str] = {}   # unacknowledged seq -> its line, in append order
+        self._buffer: List[str] = []         # lines not yet written
+        self._file: Optional[TextIO] = None
+        self._file_bytes = 0
+        self._io_lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.appended = 0
+        self.acked = 0
+        self.fsyncs = 0
+        self.compactions = 0
+
+    # -------- startup --------
+    async def open(self) -> List[SpoolEntry]:
+        """Load the spool, compact it, and return the unacknowledged entries in order."""
+        # reads, rewrites and fsyncs the whole file: kept off the event loop like the flushes
+        entries, lines, seq = await asyncio.to_thread(self._open_sync)
+        self._seq = max(self._seq, seq)
+        self._pending = lines
+        if entries:
+            logger.info("Replaying %d spooled log messages", len(entries))
+        return list(entries.values())
+
+    def _open_sync(self) -> Tuple[Dict[int, SpoolEntry], Dict[int, str], int]:
+        entries: Dict[int, SpoolEntry] = {}
+        lines: Dict[int, str] = {}
+        last_seq = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn write at the end of the file
+                    if "a" in record:
+                        for seq in record["a"]:
+                            entries.pop(seq, None)
+                            lines.pop(seq, None)
+                    else:
+                        seq = record["s"]
+                        entries[seq] = SpoolEntry(seq, record["c"], record.get("t"), record.get("e"))
+                        lines[seq] = line.rstrip("\n")
+                        last_seq = max(last_seq, seq)
+        except FileNotFoundError:
+            pass
+
+        with self._io_lock:
+            self._rewrite(list(lines.values()))
+        return entries, lines, last_seq
+
+    # -------- hot path --------
+    def append(self, channel_id: int, *, text: Optional[str] = None, embed: Optional[Dict[str, Any]] = None) -> int:
+        self._seq += 1
+        record: Dict[str, Any] = {"s": self._seq, "c": channel_id}
+        if text is not None:
+            record["t"] = text
+        if embed is not None:
+            record["e"] = embed
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        self._pending[self._seq] = line
+        self._buffer.append(line)
+        self.appended += 1
+        return self._seq
+
+    def ack(self, seqs: Iterable[int]) -> None:
+        acked = [seq for seq in seqs if self._pending.pop(seq, None) is not None]
+        if acked:
+            self._buffer.append(json.dumps({"a": acked}, separators=(",", ":")))
+            self.acked += len(acked)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # -------- disk --------
+    def _write(self, lines: List[str]) -> None:
+        data = "\n".join(lines) + "\n"
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file_bytes += len(data.encode("utf-8"))
+
+    def _rewrite(self, lines: List[str]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            if lines:
+                f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._file_bytes = os.path.getsize(self.path)
+
+    def _sync(self, lines: List[str], snapshot: Optional[List[str]]) -> None:
+        with self._io_lock:
+            if snapshot is not None:
+                self._rewrite(snapshot)  # the snapshot already reflects the buffered lines
+            else:
+                self._write(lines)
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._buffer or self._file is None:
+                return
+            lines, self._buffer = self._buffer, []
+            snapshot = list(self._pending.values()) if self._file_bytes > self.compact_bytes else None
+            try:
+                await asyncio.to_thread(self._sync, lines, snapshot)
+            except OSError:
+                logger.exception("Could not write the log spool %s", self.path)
+                self._buffer[:0] = lines
+                return
+            self.fsyncs += 1
+            if snapshot is not None:
+                self.compactions += 1
+
+    # -------- lifecycle --------
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="log-spool")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "buffered": len(self._buffer),
+            "appended": self.appended,
+            "acked": self.acked,
+            "fsyncs": self.fsyncs,
+            "compactions": self.compactions,
+        }
@@ -0,0 +1,133 @@
+# startup_trace.py
+"""
+Startup phase tracing.
+Imported first thing in bot.py, so its clock starts before discord.py and
+the helper modules are loaded. Phases are monotonic (perf_counter) spans,
+either as `with startup.phase("name"):` blocks or `begin`/`end` pairs for
+phases that start in one callback and end in another (login -> READY).
+When the bot becomes ready the breakdown is logged once and can be written
+as a Chrome trace (chrome://tracing, Perfetto) to compare releases.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from state_file import write_json
+
+logger = logging.getLogger("bovary_bot.startup")
+
+
+class Span(NamedTuple):
+    name: str
+    start: float
+    end: float
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+
+class StartupTracer:
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.wall_origin = time.time()
+        self.spans: List[Span] = []
+        self._open: Dict[str, float] = {}
+        self.ready_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.ready_at is not None
+
+    # -------- recording --------
+    def begin(self, name: str, at: Optional[float] = None) -> None:
+        if not self.finished and name not in self._open:
+            self._open[name] = time.perf_counter() if at is None else at
+
+    def end(self, name: str) -> Optional[float]:
+        start = self._open.pop(name, None)
+        if start is None:
+            return None
+        span = Span(name, start, time.perf_counter())
+        self.spans.append(span)
+        return span.seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def finish(self) -> float:
+        """Close the trace at the first READY. Returns the time to ready in seconds."""
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+            for name in list(self._open):
+                self.end(name)
+        return self.ready_at - self.origin
+
+    # -------- reporting --------
+    def _depths(self) -> List[Tuple[int, Span]]:
+        ordered = sorted(self.spans, key=lambda s: (s.start, -s.end))
+        result: List[Tuple[int, Span]] = []
+        stack: List[Span] = []
+        for span in ordered:
+            while stack and span.start >= stack[-1].end:
+                stack.pop()
+            result.append((len(stack), span))
+            stack.append(span)
+        return result
+
+    def report_lines(self) -> List[str]:
+        total = (self.ready_at or time.perf_counter()) - self.origin
+        lines = [f"Time to ready: {total:.3f}s"]
+        for depth, span in self._depths():
+            offset = span.start - self.origin
+            lines.append(
+                f"{'  ' * (depth + 1)}{span.name:<{28 - 2 * depth}} {span.seconds * 1000:9.1f} ms"
+                f"  (+{offset:.3f}s, {span.seconds / total:5.1%})"
+            )
+        return lines
+
+    def summary(self) -> Dict[str, float]:
+        """Seconds per phase (longest instance) plus time_to_ready, for logs and /metrics."""
+        result: Dict[str, float] = {}
+        for span in self.spans:
+            result[span.name] = max(result.get(span.name, 0.0), round(span.seconds, 4))
+        if self.ready_at is not None:
+            result["time_to_ready"] = round(self.ready_at - self.origin, 4)
+        return result
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+
+        def us(t: float) -> float:
+            return round((t - self.origin) * 1e6, 1)
+
+        events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "bovary-bot"}},
+        ]
+        events.extend(
+            {"name": s.name, "cat": "startup", "ph": "X", "ts": us(s.start),
+             "dur": round(s.seconds * 1e6, 1), "pid": pid, "tid": 0}
+            for s in self.spans
+        )
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"started_at": self.wall_origin, "summary": self.summary()},
+        }
+
+    def write_chrome_trace(self, path: str) -> None:
+        write_json(path, self.chrome_trace())
+
+
+# Process-wide tracer; its clock starts when this module is first imported
+startup = StartupTracer()
@@ -0,0 +1,108 @@
+# state_file.py
+"""
+Small JSON state files shared by the bot's in-memory indexes (reaction
+checkpoints, leaderboard, repost index, invite queue).
+`JsonState` holds the common lifecycle: `load()` reads the file once at
+startup, `start()` runs a background task that saves every `save_interval`
+seconds while something changed, and `close()` stops it and saves one last
+time. Files are written from a worker thread to a temporary file that then
+replaces the old one, so a crash mid-write never leaves a truncated file.
+Subclasses fill in `_load`/`_dump` and set `_changed` on every update.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+logger = logging.getLogger("bovary_bot.state")
+
+
+def read_json(path: str, label: str) -> Optional[Any]:
+    """Contents of `path`, or None if it does not exist or cannot be read."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read %s %s: %s", label, path, e)
+        return None
+
+
+def write_json(path: str, data: Any) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class JsonState(ABC):
+    label = "state"        # for log messages
+    task_name = "state"
+
+    def __init__(self, path: Optional[str], *, save_interval: float = 60.0):
+        self.path = path
+        self.save_interval = save_interval
+        self._changed = False
+        self._task: Optional[asyncio.Task] = None
+
+    # -------- hooks --------
+    @abstractmethod
+    def _load(self, data: Any) -> None:
+        """Restore the state from the file's contents."""
+
+    @abstractmethod
+    def _dump(self) -> Any:
+        """The state to write, as JSON-serializable data."""
+
+    # -------- lifecycle --------
+    def load(self) -> None:
+        if not self.path:
+            return
+        data = read_json(self.path, self.label)
+        if data is not None:
+            self._load(data)
+            self._changed = False
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=self.task_name)
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._save()
+
+    # -------- persistence --------
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await self._save()
+
+    async def _save(self) -> None:
+        if not self._changed or not self.path:
+            return
+        self._changed = False
+        if not await self._write(self._dump()):
+            self._changed = True
+
+    async def _write(self, data: Any) -> bool:
+        try:
+            await asyncio.to_thread(write_json, self.path, data)
+        except OSError:
+            logger.exception("Could not write %s %s", self.label, self.path)
+            return False
+        return True
@@ -0,0 +1,33 @@
+import asyncio
+
+from audit import AuditArchive, AuditQuery, fts_query
+
+
+def test_fts_query_quotes_words_and_prefixes_the_last():
+    assert fts_query('say "hi" there') == '"say" """hi""" "there"*'
+
+
+def test_fts_query_is_empty_without_searchable_words():
+    assert fts_query("   ") == ""
+    assert fts_query("!!! ...") == ""
+    assert fts_query("hello !!!") == '"hello"*'
+
+
+def test_search_with_blank_or_punctuation_text(tmp_path):
+    async def run():
+        archive = AuditArchive(str(tmp_path / "audit.db"))
+        await archive.open()
+        try:
+            archive.record("delete", guild_id=1, channel_id=2, message_id=3, content="hello world")
+            archive.record("delete", guild_id=1, channel_id=2, message_id=4, content="wow!!!")
+            blank = await archive.search(AuditQuery(text="   "))
+            bangs = await archive.search(AuditQuery(text="!!!"))
+            words = await archive.search(AuditQuery(text="hel"))
+        finally:
+            await archive.close()
+        return blank, bangs, words
+
+    blank, bangs, words = asyncio.run(run())
+    assert [r.message_id for r in blank] == [4, 3]
+    assert [r.message_id for r in bangs] == [4]
+    assert [r.message_id for r in words] == [3]
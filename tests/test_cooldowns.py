@@ -0,0 +1,103 @@
+# tests/test_cooldowns.py
+import asyncio
+import importlib
+import os
+
+import pytest
+from discord import app_commands
+
+from cooldowns import CooldownStore
+
+
+class _Response:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+
+class _Interaction:
+    def __init__(self, channel_id=1, user_id=2):
+        self.channel_id = channel_id
+        self.user = type("User", (), {"id": user_id})()
+        self.response = _Response()
+        self.command = None
+
+
+@pytest.fixture(scope="module")
+def bot(tmp_path_factory):
+    data = tmp_path_factory.mktemp("data")
+    os.environ.update(DATA_DIR=str(data), ROUTING_CONFIG=str(data / "routing.json"), SYNC_COMMANDS="0")
+    return importlib.import_module("bot")
+
+
+def test_top_is_on_cooldown_per_channel(bot):
+    async def run():
+        check = bot.top.checks[0]
+        assert await check(_Interaction(channel_id=10))
+        with pytest.raises(app_commands.CommandOnCooldown) as info:
+            await check(_Interaction(channel_id=10, user_id=3))
+        assert 0 < info.value.retry_after <= bot.TOP_COOLDOWN_SECONDS
+        assert await check(_Interaction(channel_id=11))  # other channels are not affected
+        return info.value
+
+    error = asyncio.run(run())
+    interaction = _Interaction(channel_id=10)
+    asyncio.run(bot.on_app_command_error(interaction, error))
+    content, kwargs = interaction.response.sent[0]
+    assert content.startswith(f"⏳ {bot.MESSAGES.COOLDOWN}")
+    assert kwargs == {"ephemeral": True}
+
+
+def test_cooldown_expires_and_is_evicted():
+    store = CooldownStore(None)
+    store.trigger("rank", 1, 10, now=100.0)
+    assert store.remaining("rank", 1, now=104.0) == 6.0
+    assert store.remaining("rank", 2, now=104.0) == 0.0
+    assert store.remaining("rank", 1, now=110.0) == 0.0
+    store.trigger("rank", 2, 1, now=120.0)  # evicts everything that has expired
+    assert len(store) == 1
+
+
+def test_retrigger_survives_its_stale_heap_entry():
+    store = CooldownStore(None)
+    store.trigger("rank", 1, 10, now=100.0)
+    store.trigger("rank", 1, 30, now=105.0)
+    store._evict(111.0)
+    assert store.remaining("rank", 1, now=111.0) == 24.0
+
+
+def test_hit_allows_once_per_cooldown():
+    store = CooldownStore(None)
+    assert store.hit("daily", 7, 60) == 0.0
+    assert 0 < store.hit("daily", 7, 60) <= 60
+    store.reset("daily", 7)
+    assert store.hit("daily", 7, 60) == 0.0
+
+
+def test_cooldowns_persist_across_restarts(tmp_path):
+    path = str(tmp_path / "cooldowns.db")
+
+    async def first():
+        store = CooldownStore(path)
+        await store.open()
+        store.trigger("daily", 7, 3600)
+        store.trigger("daily", 8, 3600)
+        store.trigger("rank", 9, -1)  # already expired: never written
+        store.reset("daily", 8)
+        await store.close()
+
+    async def second():
+        store = CooldownStore(path)
+        await store.open()
+        try:
+            return len(store), store.remaining("daily", 7), store.remaining("daily", 8)
+        finally:
+            await store.close()
+
+    asyncio.run(first())
+    count, left, reset = asyncio.run(second())
+    assert count == 1
+    assert 3590 < left <= 3600
+    assert reset == 0.0
@@ -0,0 +1,65 @@
+import discord
+
+from log_format import (
+    EMBED_TOTAL_LIMIT, FIELD_VALUE_LIMIT, MAX_FIELDS,
+    add_chunked_fields, chunk_text, pack_chunks, render_diff,
+)
+
+
+def test_render_diff_marks_only_the_changed_words():
+    assert render_diff("the quick brown fox", "the quick red fox") == [
+        "the quick ", "~~brown~~ ", "**red** ", "fox",
+    ]
+
+
+def test_render_diff_escapes_markdown_in_changes():
+    assert "**a\\*b** " in render_diff("x", "x a*b")
+
+
+def test_render_diff_pieces_respect_the_limit():
+    before = "start " + "word " * 50
+    after = "start " + "x" * 5000 + " *_~`|>" * 300
+    pieces = render_diff(before, after, limit=200)
+    assert len(pieces) > 1
+    assert max(len(p) for p in pieces) <= 200
+
+
+def test_render_diff_of_huge_messages_stays_bounded():
+    before = "\n".join(f"line {i}" for i in range(20000))
+    after = "\n".join(f"line {i} edited" for i in range(20000))
+    chunks = pack_chunks(render_diff(before, after))
+    assert all(len(c) <= FIELD_VALUE_LIMIT for c in chunks)
+
+
+def test_pack_chunks_joins_greedily_and_truncates_oversized_pieces():
+    chunks = pack_chunks(["a" * 600, "b" * 400, "c" * 10, "d" * 2000])
+    assert chunks == ["a" * 600 + "b" * 400 + "c" * 10, "d" * (FIELD_VALUE_LIMIT - 1) + "…"]
+
+
+def test_pack_chunks_never_emits_an_empty_value():
+    assert pack_chunks([]) == []
+    assert pack_chunks(["x" * 10, " " * 20], limit=20) == ["x" * 10]
+    assert pack_chunks([" " * 5, "y"], limit=5) == ["\u200b", "y"]
+
+
+def test_chunk_text_splits_long_words():
+    chunks = chunk_text("z" * 2500)
+    assert [len(c) for c in chunks] == [FIELD_VALUE_LIMIT, FIELD_VALUE_LIMIT, 2500 - 2 * FIELD_VALUE_LIMIT]
+    assert chunk_text("") == ["\u200b"]
+
+
+def test_add_chunked_fields_respects_embed_limits():
+    chunks = chunk_text("w" * FIELD_VALUE_LIMIT * 30)
+    embeds = add_chunked_fields(discord.Embed(title="edit"), "After", chunks, discord.Embed, max_chunks=None)
+    assert sum(len(e.fields) for e in embeds) == 30
+    for embed in embeds:
+        assert len(embed.fields) <= MAX_FIELDS
+        assert len(embed) <= EMBED_TOTAL_LIMIT
+
+
+def test_add_chunked_fields_summarizes_past_max_chunks():
+    embeds = add_chunked_fields(discord.Embed(), "After", ["x"] * 20, discord.Embed, max_chunks=5)
+    fields = [f for e in embeds for f in e.fields]
+    assert len(fields) == 5
+    assert fields[-1].value == "… 16 more part(s) not shown"
+    assert fields[1].name == "After (2/5)"
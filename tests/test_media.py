@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+from media import HOST_EXTENSION, HOST_MEDIA, MediaClassifier
+
+_NO_IMAGE = SimpleNamespace(url=None)
+
+
+def _message(content="", attachments=(), embeds=()):
+    return SimpleNamespace(content=content, attachments=list(attachments), embeds=list(embeds))
+
+
+def _attachment(filename, content_type=None):
+    return SimpleNamespace(filename=filename, content_type=content_type)
+
+
+def _embed(type="rich", image=None, thumbnail=None):
+    return SimpleNamespace(
+        type=type,
+        image=SimpleNamespace(url=image) if image else _NO_IMAGE,
+        thumbnail=SimpleNamespace(url=thumbnail) if thumbnail else _NO_IMAGE,
+    )
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return MediaClassifier()
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("photo.png", True),
+    ("PHOTO.JPEG", True),
+    ("clip.final.MOV", True),
+    ("gif", False),              # no dot: not an extension
+    ("png.", False),
+    ("scan.tiff", False),
+    ("notes.txt", False),
+    ("archive.png.zip", False),
+])
+def test_is_media_filename(classifier, filename, expected):
+    assert classifier.is_media_filename(filename) is expected
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("look https://example.com/a/b.PNG", True),
+    ("https://example.com/v.mp4?width=10#t=3", True),
+    ("<https://example.com/x.webm>", True),
+    ("(https://example.com/x.gif)", True),
+    ("https://example.com/x.png.html", False),
+    ("https://example.com/page", False),
+    ("example.com/x.png", False),    # no scheme
+    ("https://i.imgur.com/abc", True),
+    ("https://media1.tenor.com/m/xyz", True),  # parent domain rule
+    ("https://user@I.IMGUR.COM:443/abc", True),
+    ("https://cdn.discordapp.com/attachments/1/2/file.pdf", False),
+    ("", False),
+])
+def test_content_has_media(classifier, content, expected):
+    assert classifier.content_has_media(content) is expected
+
+
+def test_host_rules_can_be_replaced():
+    classifier = MediaClassifier(host_rules={"example.com": HOST_MEDIA, "i.imgur.com": HOST_EXTENSION})
+    assert classifier.content_has_media("https://sub.example.com/page")
+    assert not classifier.content_has_media("https://i.imgur.com/abc")
+    assert not MediaClassifier(host_rules={}).content_has_media("https://i.imgur.com/abc")
+
+
+def test_custom_extensions():
+    classifier = MediaClassifier(extensions={"tiff"})
+    assert classifier.is_media_filename("scan.TIFF")
+    assert not classifier.is_media_filename("photo.png")
+    assert classifier.content_has_media("https://example.com/scan.tiff")
+
+
+def test_is_media_sources(classifier):
+    assert classifier.is_media(_message(attachments=[_attachment("a.bin", "image/png")]))
+    assert classifier.is_media(_message(attachments=[_attachment("a.gif", None)]))
+    assert not classifier.is_media(_message(attachments=[_attachment("a.tiff", "image/tiff")]))
+    assert classifier.is_media(_message(embeds=[_embed("gifv")]))
+    assert classifier.is_media(_message(embeds=[_embed(thumbnail="https://x/t.jpg")]))
+    assert not classifier.is_media(_message(embeds=[_embed("link")]))
+    assert classifier.is_media(_message("https://i.redd.it/abc"))
+    assert not classifier.is_media(_message("no links here"))
+    assert not classifier.is_media(_message())
@@ -0,0 +1,79 @@
+import random
+
+from reposts import MediaFile, Post, RepostIndex, normalize_filename
+
+
+async def _ignore(*args):
+    pass
+
+
+def _post(message_id):
+    return Post(message_id, 10, 20, 30)
+
+
+def _flip(value, *bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def test_normalize_filename():
+    assert normalize_filename("My Cat (1).JPEG") == "my_cat.jpg"
+    assert normalize_filename("clip - copy.m4v") == "clip.mp4"
+    assert normalize_filename("README") == "readme"
+    assert normalize_filename("(1).png") == "(1).png"
+
+
+def test_check_finds_reposts_by_fingerprint():
+    index = RepostIndex(None, on_repost=_ignore)
+    original = _post(1)
+    assert index.check(original, [MediaFile("cat.jpg", 1000, 64, 64)], ["https://x.com/a.gif?w=1"]) is None
+    assert index.check(_post(2), [MediaFile("Cat (2).jpeg", 1000, 64, 64)]) == original
+    assert index.check(_post(3), [], ["https://X.com/a.gif"]) == original
+    assert index.check(_post(4), [MediaFile("cat.jpg", 1001, 64, 64)]) is None
+    assert index.flagged(2) == original and index.flagged(4) is None
+
+
+def test_band_lookup_finds_hashes_within_the_distance():
+    index = RepostIndex(None, on_repost=_ignore)
+    value = random.Random(1).getrandbits(64)
+    index._add_hash(value, _post(1))
+    assert index._nearest(value) == (_post(1), 0)
+    assert index._nearest(_flip(value, 0, 16, 32)) == (_post(1), 3)  # three bands differ, one matches
+    assert index._nearest(_flip(value, 0, 16, 32, 48)) is None       # every band differs
+    assert index._nearest(_flip(value, 0, 1, 2, 3)) is None          # shares bands, but too far
+
+
+def test_band_lookup_prefers_the_closest_hash():
+    index = RepostIndex(None, on_repost=_ignore)
+    value = random.Random(2).getrandbits(64)
+    index._add_hash(_flip(value, 5, 6), _post(1))
+    index._add_hash(_flip(value, 5), _post(2))
+    assert index._nearest(value) == (_post(2), 1)
+
+
+def test_evicted_and_discarded_hashes_leave_the_bands():
+    index = RepostIndex(None, on_repost=_ignore, max_entries=2)
+    values = [random.Random(seed).getrandbits(64) for seed in range(3)]
+    for message_id, value in enumerate(values):
+        index._add_hash(value, _post(message_id))
+    assert index._nearest(values[0]) is None
+    index.discard(1)
+    assert index._nearest(values[1]) is None
+    assert index._nearest(values[2]) == (_post(2), 0)
+    members = set().union(*(m for band in index._bands for m in band.values()))
+    assert members == {values[2]}
+
+
+def test_state_round_trip():
+    index = RepostIndex(None, on_repost=_ignore)
+    index.check(_post(1), [MediaFile("a.png", 5, 1, 1)])
+    index.check(_post(2), [MediaFile("a.png", 5, 1, 1)])
+    index._add_hash(12345, _post(1))
+
+    restored = RepostIndex(None, on_repost=_ignore)
+    restored._load(index._dump())
+    assert restored._dump() == index._dump()
+    assert restored._nearest(12345) == (_post(1), 0)
+    restored.discard(1)
+    assert restored.check(_post(3), [MediaFile("a.png", 5, 1, 1)]) is None
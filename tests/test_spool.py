@@ -0,0 +1,73 @@
+import asyncio
+
+from spool import LogSpool, SpoolEntry
+
+
+def test_pending_entries_are_replayed_in_order(tmp_path):
+    path = str(tmp_path / "spool.jsonl")
+
+    async def first():
+        spool = LogSpool(path)
+        await spool.open()
+        a = spool.append(1, text="one")
+        b = spool.append(2, embed={"title": "two"})
+        c = spool.append(1, text="three")
+        spool.ack([b])
+        await spool.close()
+        return a, c
+
+    async def second():
+        spool = LogSpool(path)
+        entries = await spool.open()
+        seq = spool.append(1, text="four")
+        await spool.close()
+        return entries, seq
+
+    a, c = asyncio.run(first())
+    entries, seq = asyncio.run(second())
+    assert entries == [SpoolEntry(a, 1, "one", None), SpoolEntry(c, 1, "three", None)]
+    assert seq == c + 1  # sequence numbers keep growing across restarts
+
+
+def test_torn_last_line_is_skipped_and_compacted_away(tmp_path):
+    path = tmp_path / "spool.jsonl"
+    path.write_text(
+        '{"s":1,"c":5,"t":"kept"}\n'
+        '{"s":2,"c":5,"t":"acked"}\n'
+        '{"a":[2]}\n'
+        '{"s":3,"c":5,"t":"torn',
+        encoding="utf-8",
+    )
+
+    async def replay():
+        spool = LogSpool(str(path))
+        entries = await spool.open()
+        seq = spool.append(5, text="next")
+        await spool.close()
+        return entries, seq, len(spool)
+
+    entries, seq, pending = asyncio.run(replay())
+    assert entries == [SpoolEntry(1, 5, "kept", None)]
+    assert seq == 3  # after the highest sequence seen, acknowledged or not
+    assert pending == 2
+    assert path.read_text(encoding="utf-8") == '{"s":1,"c":5,"t":"kept"}\n{"s":3,"c":5,"t":"next"}\n'
+
+
+def test_flush_compacts_past_the_size_limit(tmp_path):
+    path = tmp_path / "spool.jsonl"
+
+    async def run():
+        spool = LogSpool(str(path), compact_bytes=200)
+        await spool.open()
+        for i in range(20):
+            spool.ack([spool.append(1, text=f"message {i}")])
+            await spool.flush()
+        keep = spool.append(1, text="pending")
+        await spool.flush()
+        await spool.close()
+        return spool.compactions, keep
+
+    compactions, keep = asyncio.run(run())
+    assert compactions > 0
+    assert path.stat().st_size < 400
+    assert f'"s":{keep}' in path.read_text(encoding="utf-8")
@@ -0,0 +1,72 @@
+# tree_sync.py
+"""
+Command tree sync fingerprinting.
+`tree.sync()` is slow and shares the global app-command rate limit, so the
+payload of the tree is hashed and compared to the last synced hash stored in
+a small JSON file; the sync only runs when the commands actually changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from discord import app_commands
+
+from state_file import read_json, write_json
+
+logger = logging.getLogger("bovary_bot.tree_sync")
+
+
+def _command_payload(command: Any, tree: app_commands.CommandTree) -> Dict[str, Any]:
+    try:
+        return command.to_dict(tree)  # discord.py >= 2.4
+    except TypeError:
+        return command.to_dict()
+
+
+def command_tree_fingerprint(tree: app_commands.CommandTree, application_id: Optional[int]) -> str:
+    """Stable hash of everything `tree.sync()` would upload (global commands)."""
+    payload: List[Dict[str, Any]] = [_command_payload(c, tree) for c in tree.get_commands()]
+    payload.sort(key=lambda p: (p.get("type", 1), p["name"]))
+    blob = json.dumps(
+        {"application_id": application_id, "commands": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+async def sync_if_changed(
+    tree: app_commands.CommandTree,
+    application_id: Optional[int],
+    state_path: str,
+    *,
+    force: bool = False,
+) -> bool:
+    """Sync the tree only if its fingerprint changed. Returns True if a sync ran."""
+    fingerprint = command_tree_fingerprint(tree, application_id)
+    state = read_json(state_path, "command sync state") or {}
+
+    if not force and state.get("fingerprint") == fingerprint:
+        logger.info(
+            "Command tree unchanged (%s…), skipped sync — saved ~%.2fs to ready",
+            fingerprint[:12], state.get("sync_seconds", 0.0)
+        )
+        return False
+
+    start = time.perf_counter()
+    synced = await tree.sync()
+    elapsed = time.perf_counter() - start
+    write_json(state_path, {
+        "fingerprint": fingerprint,
+        "sync_seconds": round(elapsed, 3),
+        "synced_at": time.time(),
+        "commands": len(synced),
+    })
+    logger.info("Synced %d slash commands in %.2fs", len(synced), elapsed)
+    return True